@@ -1,12 +1,12 @@
 import logging
 from uuid import uuid4
-from datetime import datetime
-from openai import AsyncOpenAI
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from app.services.usage_service import current_period
+from app.ai.llm_gateway import get_client
+from app.utils.rate_limiter import llm_slot
 
-client = AsyncOpenAI()
 logger = logging.getLogger(__name__)
 
 def get_assistant_id(project_id: str, role: str, db: Session) -> str | None:
@@ -39,17 +39,17 @@ def store_assistant_id(project_id: str, role: str, assistant_id: str, db: Sessio
     db.commit()
 
 def get_token_limit_and_usage(user, db: Session):
-    start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     result = db.execute(
         text("""
-        SELECT p.max_tokens, COALESCE(SUM(t.tokens_used), 0) as tokens_used
+        SELECT p.max_tokens, COALESCE(c.tokens_used, 0) as tokens_used
         FROM subscriptions s
         JOIN user_plans p ON s.plan_id = p.id
-        LEFT JOIN token_usage t ON s.tenant_id = t.user_id AND t.created_at >= :start
+        LEFT JOIN token_usage_counters c
+            ON c.scope = 'tenant' AND c.scope_id = CAST(s.tenant_id AS TEXT) AND c.period = :period
         WHERE s.tenant_id = :tenant_id
-        GROUP BY p.max_tokens
+        LIMIT 1
         """),
-        {"tenant_id": user["tenant_id"], "start": start_of_month}
+        {"tenant_id": user["tenant_id"], "period": current_period()}
     ).fetchone()
 
     if not result:
@@ -74,19 +74,21 @@ async def create_dynamic_assistant(project_id: str, role: str, fallback_response
     with open(file_path, "w") as f:
         f.write(fallback_response)
 
-    file = await client.files.create(file=open(file_path, "rb"), purpose="assistants")
+    client = get_client()
+    async with llm_slot("openai", None, model="assistants"):
+        file = await client.files.create(file=open(file_path, "rb"), purpose="assistants")
 
-    assistant = await client.beta.assistants.create(
-        name=name,
-        instructions=instructions,
-        model="gpt-4o"
-    )
+        assistant = await client.beta.assistants.create(
+            name=name,
+            instructions=instructions,
+            model="gpt-4o"
+        )
 
-    # Attach the fallback file to this assistant
-    await client.beta.assistants.files.create(
-        assistant_id=assistant.id,
-        file_id=file.id
-    )
+        # Attach the fallback file to this assistant
+        await client.beta.assistants.files.create(
+            assistant_id=assistant.id,
+            file_id=file.id
+        )
 
     store_assistant_id(project_id, role, assistant.id, db)
     logger.info(f"✅ Created assistant for {project_id} [{role}]: {assistant.id}")
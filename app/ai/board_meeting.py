@@ -0,0 +1,184 @@
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.ai.llm_gateway import complete
+from app.utils.rate_limiter import LimiterRejected
+
+logger = logging.getLogger(__name__)
+
+# === Board meeting settings
+BOARD_MODEL = os.getenv("BOARD_MODEL", "gpt-4o")
+BOARD_REBUTTAL_ROUNDS = int(os.getenv("BOARD_REBUTTAL_ROUNDS", 1))
+# Rebuttals in flight at once; openings always run all together.
+BOARD_REBUTTAL_CONCURRENCY = int(os.getenv("BOARD_REBUTTAL_CONCURRENCY", 3))
+BOARD_TURN_MAX_TOKENS = int(os.getenv("BOARD_TURN_MAX_TOKENS", 400))
+BOARD_TURN_DEADLINE = float(os.getenv("BOARD_TURN_DEADLINE_SECONDS", 45))
+BOARD_CHAIR_MAX_TOKENS = int(os.getenv("BOARD_CHAIR_MAX_TOKENS", 700))
+
+BOARD_MEMBERS: Dict[str, str] = {
+    "CEO": "You are the CEO. You own the vision, priorities and trade-offs, and you push for focus.",
+    "CFO": "You are the CFO. You test every plan against cash, unit economics, runway and risk.",
+    "COO": "You are the COO. You turn plans into processes, owners, hiring and timelines.",
+    "CTO": "You are the CTO. You judge technical feasibility, architecture, build-vs-buy and delivery risk.",
+    "Visionary": "You are the Visionary board member. You look 3-5 years out and argue for bold, category-defining bets.",
+}
+
+
+@dataclass
+class BoardTurn:
+    round: int
+    speaker: str
+    text: str = ""
+    error: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return "Opening" if self.round == 0 else f"Rebuttal {self.round}"
+
+    def render(self) -> str:
+        return f"**{self.speaker}** ({self.label}): {self.text}"
+
+
+def _briefing(topic: str, blueprint: str, direction: str) -> str:
+    briefing = f"Board meeting topic: '{topic}'.\n"
+    if blueprint:
+        briefing += f"\nLatest business blueprint:\n{blueprint}\n"
+    if direction:
+        briefing += f"\nHuman direction for this meeting:\n{direction}\n"
+    return briefing
+
+
+async def _speak(
+    turn: BoardTurn, briefing: str, instructions: str, tenant_id: str, cache: bool,
+    semaphore: Optional[asyncio.Semaphore] = None
+) -> BoardTurn:
+    """
+    One executive's turn, bounded by BOARD_TURN_DEADLINE. A member that times out
+    or fails is recorded with its error; the meeting goes on without it.
+    """
+    system = (
+        f"{BOARD_MEMBERS[turn.speaker]} You sit on the startup's executive board "
+        "(CEO, CFO, COO, CTO, Visionary). Speak in the first person, be concrete and concise."
+    )
+    try:
+        if semaphore:
+            await semaphore.acquire()
+        try:
+            response = await asyncio.wait_for(
+                complete(
+                    f"{briefing}\n{instructions}",
+                    system=system,
+                    model=BOARD_MODEL,
+                    temperature=0.7,
+                    max_tokens=BOARD_TURN_MAX_TOKENS,
+                    tenant_id=tenant_id,
+                    cache=cache
+                ),
+                timeout=BOARD_TURN_DEADLINE
+            )
+        finally:
+            if semaphore:
+                semaphore.release()
+        turn.text = response.content
+    except LimiterRejected:
+        raise
+    except asyncio.TimeoutError:
+        turn.error = f"no answer within {BOARD_TURN_DEADLINE:.0f}s"
+    except Exception as e:
+        logger.warning(f"⚠️ Board turn {turn.speaker} ({turn.label}) failed: {e}")
+        turn.error = str(e)
+    return turn
+
+
+def _rebuttal_instructions(speaker: str, previous: List[BoardTurn]) -> str:
+    others = "\n\n".join(t.render() for t in previous if t.speaker != speaker and not t.error)
+    own = next((t.text for t in previous if t.speaker == speaker and not t.error), "")
+    return (
+        f"Your last position:\n{own or '(you did not speak)'}\n\n"
+        f"What the other executives said:\n{others}\n\n"
+        "Respond to them: challenge what you disagree with, build on what is strong, and "
+        "state your updated recommendation in a few sentences."
+    )
+
+
+async def _round(turns: List[BoardTurn], speak):
+    # Yields each turn as it finishes, in completion order. Turns still running are
+    # cancelled if the consumer goes away (client disconnect) or a turn raises.
+    tasks = [asyncio.ensure_future(speak(turn)) for turn in turns]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_board_meeting(
+    topic: str,
+    blueprint: str,
+    direction: str,
+    tenant_id: str,
+    rounds: int = BOARD_REBUTTAL_ROUNDS,
+    cache: bool = True,
+):
+    """
+    Runs the meeting and yields events as it progresses:
+
+        ("meeting", {...})       members and number of rebuttal rounds
+        ("turn", {...})          one executive's turn, as soon as it is ready
+        ("round", {...})         a round has finished
+        ("action_items", {...})  the chair's summary
+        ("done", {...})          the full transcript
+
+    Opening positions are generated concurrently. Each rebuttal round also runs in
+    parallel (at most BOARD_REBUTTAL_CONCURRENCY at a time) and sees the round
+    before it. A chair agent writes the action items from the whole transcript.
+    """
+    briefing = _briefing(topic, blueprint, direction)
+    members = list(BOARD_MEMBERS)
+    yield "meeting", {"members": members, "rounds": rounds}
+
+    transcript: List[List[BoardTurn]] = []
+    opening = (
+        "Give your opening position on the topic: what you would do, why, and the biggest risk you see. "
+        "Keep it to one short paragraph."
+    )
+    semaphore = asyncio.Semaphore(BOARD_REBUTTAL_CONCURRENCY)
+
+    for round_no in range(rounds + 1):
+        previous = transcript[-1] if transcript else []
+        turns = [BoardTurn(round_no, speaker) for speaker in members]
+
+        def speak(turn: BoardTurn):
+            if turn.round == 0:
+                return _speak(turn, briefing, opening, tenant_id, cache)
+            return _speak(
+                turn, briefing, _rebuttal_instructions(turn.speaker, previous), tenant_id, cache, semaphore
+            )
+
+        async for turn in _round(turns, speak):
+            yield "turn", {"round": turn.round, "label": turn.label, "speaker": turn.speaker,
+                           "text": turn.text, "error": turn.error}
+        transcript.append(turns)
+        yield "round", {"round": round_no, "answered": sum(1 for t in turns if not t.error)}
+
+        if not any(not t.error for t in turns):
+            raise RuntimeError(f"No board member answered in round {round_no}")
+
+    body = "\n\n".join(t.render() for turns in transcript for t in turns if not t.error)
+    chair = await complete(
+        f"{briefing}\nMeeting transcript:\n{body}\n\n"
+        "As chair, close the meeting: list the agreed action items, each with an owner "
+        "(CEO, CFO, COO, CTO or Visionary) and a deadline, then note any open disagreements.",
+        system="You are the chair of a startup's executive board. You are neutral, precise and brief.",
+        model=BOARD_MODEL,
+        temperature=0.3,
+        max_tokens=BOARD_CHAIR_MAX_TOKENS,
+        tenant_id=tenant_id,
+        cache=cache
+    )
+    yield "action_items", {"text": chair.content}
+    yield "done", {"transcript": f"{body}\n\n**Chair** (Action Items):\n{chair.content}"}
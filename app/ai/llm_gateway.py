@@ -0,0 +1,223 @@
+import os
+import time
+import logging
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+
+from app.utils.http_clients import get_http_client
+from app.utils.rate_limiter import llm_slot
+from app.ai.response_cache import response_cache, cache_key, RESPONSE_CACHE_ENABLED
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# === Gateway settings
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", 5))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+
+# Each provider is an OpenAI-compatible endpoint. "openai" reads
+# OPENAI_API_KEY / OPENAI_BASE_URL; others are added with configure_provider().
+_provider_settings: Dict[str, dict] = {
+    "openai": {
+        "api_key": os.getenv("OPENAI_API_KEY"),
+        "base_url": os.getenv("OPENAI_BASE_URL"),
+    },
+}
+_clients: Dict[str, AsyncOpenAI] = {}
+_metrics: Dict[str, dict] = {}
+
+
+@dataclass
+class LLMResult:
+    content: str
+    model: str
+    provider: str
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    latency: float
+    cached: bool = False
+
+
+def configure_provider(provider: str, api_key: Optional[str] = None, base_url: Optional[str] = None):
+    """
+    Sets (or replaces) a provider's credentials, e.g. a key loaded from system_config.
+    The cached client is dropped so the next call picks up the new settings.
+    """
+    settings = _provider_settings.setdefault(provider, {"api_key": None, "base_url": None})
+    if api_key:
+        settings["api_key"] = api_key
+    if base_url:
+        settings["base_url"] = base_url
+    _clients.pop(provider, None)
+
+
+def get_client(provider: str = "openai") -> AsyncOpenAI:
+    if provider not in _provider_settings:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+    if provider not in _clients:
+        settings = _provider_settings[provider]
+        if not settings["api_key"]:
+            raise RuntimeError(f"❌ No API key configured for LLM provider '{provider}'")
+        _clients[provider] = AsyncOpenAI(
+            api_key=settings["api_key"],
+            base_url=settings["base_url"],
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            max_retries=LLM_MAX_RETRIES,  # exponential backoff on 429/5xx/connection errors
+            http_client=get_http_client(provider),
+        )
+    return _clients[provider]
+
+
+def _record(provider: str, latency: float, tokens: int = 0, failed: bool = False):
+    stats = _metrics.setdefault(provider, {
+        "calls": 0, "errors": 0, "tokens": 0, "latency_seconds_total": 0.0, "latency_seconds_max": 0.0
+    })
+    stats["calls"] += 1
+    stats["errors"] += int(failed)
+    stats["tokens"] += tokens
+    stats["latency_seconds_total"] += latency
+    stats["latency_seconds_max"] = max(stats["latency_seconds_max"], latency)
+
+
+async def chat(
+    messages: List[dict],
+    model: str = "gpt-4o",
+    provider: str = "openai",
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    tenant_id: Optional[str] = None,
+    cache: bool = False,
+    cache_ttl: Optional[float] = None,
+    **kwargs
+) -> LLMResult:
+    """
+    Non-streaming chat completion through the shared client for `provider`,
+    queued fairly per tenant behind the provider/model rate limits.
+
+    With `cache=True` an identical earlier request from the same tenant is answered
+    from the response cache: no upstream call, no limiter slot, and zero tokens on
+    the result (`cached=True`) so nothing is charged against quota.
+
+    Usage:
+        result = await chat([{"role": "user", "content": prompt}], max_tokens=800, tenant_id=tid)
+        print(result.content, result.total_tokens)
+    """
+    key = None
+    if cache and RESPONSE_CACHE_ENABLED:
+        started = time.perf_counter()
+        key = cache_key(f"{provider}/{model}", temperature, messages, max_tokens=max_tokens, **kwargs)
+        hit = response_cache.get(tenant_id, key)
+        if hit is not None:
+            return replace(
+                hit, prompt_tokens=0, completion_tokens=0, total_tokens=0,
+                latency=time.perf_counter() - started, cached=True
+            )
+
+    client = get_client(provider)
+    estimate = sum(len(m.get("content") or "") for m in messages) // 4 + (max_tokens or 1000)
+
+    async with llm_slot(provider, tenant_id, tokens=estimate, model=model) as permit:
+        started = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **kwargs
+            )
+        except Exception as e:
+            _record(provider, time.perf_counter() - started, failed=True)
+            logger.error(f"❌ LLM call failed [{provider}/{model}]: {e}")
+            raise
+
+        latency = time.perf_counter() - started
+        usage = response.usage
+        permit.settle(usage.total_tokens if usage else 0)
+
+    result = LLMResult(
+        content=(response.choices[0].message.content or "").strip(),
+        model=response.model or model,
+        provider=provider,
+        prompt_tokens=usage.prompt_tokens if usage else 0,
+        completion_tokens=usage.completion_tokens if usage else 0,
+        total_tokens=usage.total_tokens if usage else 0,
+        latency=latency,
+    )
+    _record(provider, latency, result.total_tokens)
+    if key and result.content:
+        response_cache.put(tenant_id, key, result, ttl=cache_ttl)
+    return result
+
+
+async def stream_chat(
+    messages: List[dict],
+    model: str = "gpt-4o",
+    provider: str = "openai",
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    tenant_id: Optional[str] = None,
+    **kwargs
+):
+    """
+    Streaming chat completion, queued like chat(). Yields ("delta", text) for each
+    fragment as it arrives, then one ("done", total_tokens); total_tokens is 0 if
+    the provider reported no usage.
+
+    Usage:
+        async for kind, value in stream_chat(messages, tenant_id=tid):
+            ...
+    """
+    client = get_client(provider)
+    estimate = sum(len(m.get("content") or "") for m in messages) // 4 + (max_tokens or 1000)
+    if provider == "openai":
+        kwargs.setdefault("stream_options", {"include_usage": True})
+
+    async with llm_slot(provider, tenant_id, tokens=estimate, model=model) as permit:
+        started = time.perf_counter()
+        total_tokens = 0
+        try:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                **kwargs
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    total_tokens = chunk.usage.total_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield "delta", chunk.choices[0].delta.content
+        except Exception as e:
+            _record(provider, time.perf_counter() - started, failed=True)
+            logger.error(f"❌ LLM stream failed [{provider}/{model}]: {e}")
+            raise
+
+        permit.settle(total_tokens)
+        _record(provider, time.perf_counter() - started, total_tokens)
+    yield "done", total_tokens
+
+
+async def complete(prompt: str, system: str = "", **kwargs) -> LLMResult:
+    # Single-prompt shorthand for the common "one user message" call.
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    return await chat(messages, **kwargs)
+
+
+async def close_clients():
+    # Transports belong to app.utils.http_clients and are closed there.
+    _clients.clear()
+
+
+def gateway_metrics() -> dict:
+    return {provider: dict(stats) for provider, stats in _metrics.items()}
@@ -1,24 +1,50 @@
-from sqlalchemy.orm import Session
+import os
+import time
+import asyncio
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db import AsyncSessionLocal
 from app.services.assistant_service import ensure_assistant_for_role
-from app.stella_sdk.runner import run_assistant
+from app.stella_sdk.runner import run_assistant, AssistantRunTimeout
 from app.models.idea import Idea
+from app.services.usage_service import estimate_tokens
 
+logger = logging.getLogger(__name__)
 
-# 🔍 Analyze an idea from the AI’s point of view (CEO or critic role)
-async def analyze_with_ai(idea: Idea, token_limit: int, used: int, user: dict, db: Session):
-    base_text = f"""
+# === Panel analysis settings
+ANALYSIS_PANEL_ROLES = [r.strip() for r in os.getenv("ANALYSIS_PANEL_ROLES", "startup_critic,cfo,cmo,cto").split(",") if r.strip()]
+ANALYSIS_ROLE_DEADLINE = float(os.getenv("ANALYSIS_ROLE_DEADLINE_SECONDS", 45))
+
+
+def _run_usage(run, message: str) -> int:
+    # Tokens the run reported; estimated from the text only when it reported none.
+    return run.total_tokens or estimate_tokens(message + run[0], completion_tokens=0)
+
+
+def _analysis_message(idea: Idea, role: str) -> str:
+    message = f"""
 Title: {idea.title}
 Problem: {idea.problem}
 Audience: {idea.audience}
 Solution: {idea.solution}
 Notes: {idea.notes or "N/A"}
 """
+    if role != "startup_critic":
+        message += (
+            f"\nAs the {role.upper()}, assess this idea from your function's point of view: "
+            "the biggest risks, what must be true for it to work, and a viability score out of 100."
+        )
+    return message
+
 
+# 🔍 Analyze an idea from the AI’s point of view (CEO or critic role)
+async def analyze_with_ai(idea: Idea, token_limit: int, used: int, user: dict, db: AsyncSession):
     role = "startup_critic"
+    base_text = _analysis_message(idea, role)
     assistant_id = await ensure_assistant_for_role(str(idea.id), role, user, db)
 
     # ✅ Await assistant execution
-    gpt_reply, thread_id = await run_assistant(
+    run = await run_assistant(
         project_id=str(idea.id),
         role=role,
         message=base_text,
@@ -28,27 +54,66 @@ Notes: {idea.notes or "N/A"}
         db=db
     )
 
-    tokens = 800  # This is your estimated usage
-    return gpt_reply, tokens
+    gpt_reply, _ = run
+    return gpt_reply, _run_usage(run, base_text)
+
+
+async def _panel_member(idea: Idea, role: str, user: dict, deadline: float) -> dict:
+    message = _analysis_message(idea, role)
+    started = time.perf_counter()
+    try:
+        # Each panel member gets its own session; AsyncSession is not safe to share across tasks.
+        async with AsyncSessionLocal() as db:
+            assistant_id = await ensure_assistant_for_role(str(idea.id), role, user, db)
+            # The runner enforces the deadline and cancels the run on the thread when it passes
+            result = await run_assistant(
+                project_id=str(idea.id),
+                role=role,
+                message=message,
+                assistant_id=assistant_id,
+                tenant_id=user["tenant_id"],
+                user_id=user["id"],
+                db=db,
+                deadline=deadline
+            )
+        return {
+            "status": "ok",
+            "reply": result[0],
+            "tokens": _run_usage(result, message),
+            "seconds": round(time.perf_counter() - started, 1)
+        }
+    except AssistantRunTimeout:
+        logger.warning(f"⏱️ Panel role {role} missed its {deadline:.0f}s deadline")
+        return {"status": "timeout", "seconds": round(time.perf_counter() - started, 1)}
+    except Exception as e:
+        logger.warning(f"⚠️ Panel role {role} failed: {e}")
+        return {"status": "failed", "error": str(e), "seconds": round(time.perf_counter() - started, 1)}
+
+
+# 👥 Analyze an idea with several roles at once; wall-clock ≈ the slowest role
+async def analyze_with_panel(idea: Idea, user: dict, roles: list[str] = None, deadline: float = None) -> dict:
+    """
+    Returns {role: {"status": "ok" | "timeout" | "failed", "reply"?, "tokens"?, "seconds"}}
+    in panel order. A role that misses its deadline is reported, not awaited.
+    """
+    roles = roles or ANALYSIS_PANEL_ROLES
+    results = await asyncio.gather(*(
+        _panel_member(idea, role, user, deadline or ANALYSIS_ROLE_DEADLINE) for role in roles
+    ))
+    return dict(zip(roles, results))
 
 
 # 🧠 Summarize a transcript of chat messages about the startup
 async def summarize_with_ai(
     idea: Idea,
-    chat_messages: list[dict],  # Must be a list of dicts: [{ role, message }]
+    transcript: str,  # chat context: rolling summary + recent turns (see chat_context.assemble_context)
     score: int | None,
     user: dict,
-    db: Session
+    db: AsyncSession
 ):
     role = "summarizer"
     project_id = str(idea.id)
 
-    # ✅ Build conversation transcript cleanly
-    transcript = "\n".join([
-        f"{m['role'].title()}: {m['message']}"
-        for m in chat_messages if isinstance(m, dict) and 'role' in m and 'message' in m
-    ])
-
     prompt = f"""You are a strategic product consultant AI.
 Your job is to analyze the conversation below and return a clear, structured startup summary.
 
@@ -0,0 +1,96 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# === Response cache settings
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES_PER_TENANT", 200))
+
+
+def _normalize(text: str) -> str:
+    # Whitespace-only differences (trailing newlines, double spaces) hit the same entry.
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def cache_key(model: str, temperature: float, messages: List[dict], **params) -> str:
+    """
+    Hash of the normalized request: model, temperature (2 dp), messages and any
+    extra params that change the output (e.g. max_tokens).
+    """
+    payload = {
+        "model": model,
+        "temperature": round(float(temperature or 0), 2),
+        "messages": [
+            {"role": m.get("role"), "content": _normalize(m.get("content"))} for m in messages
+        ],
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    In-process exact-match cache, one LRU per tenant so a busy tenant can only
+    evict its own entries. Entries expire after their TTL.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._tenants: Dict[str, OrderedDict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, tenant_id: Optional[str], key: str) -> Optional[Any]:
+        entries = self._tenants.get(tenant_id or "system")
+        entry = entries.get(key) if entries else None
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del entries[key]
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, tenant_id: Optional[str], key: str, value: Any, ttl: Optional[float] = None):
+        entries = self._tenants.setdefault(tenant_id or "system", OrderedDict())
+        entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, tenant_id: Optional[str], key: str):
+        entries = self._tenants.get(tenant_id or "system")
+        if entries:
+            entries.pop(key, None)
+
+    def clear(self, tenant_id: Optional[str] = None):
+        if tenant_id is None:
+            self._tenants.clear()
+        else:
+            self._tenants.pop(tenant_id, None)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "tenants": len(self._tenants),
+            "entries": sum(len(entries) for entries in self._tenants.values()),
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,116 @@
+import os
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.ai.role_router import ALIAS_WEIGHT, get_role_router
+from app.ai.semantic_cache import HashedTfidfEmbedder, OpenAIEmbedder
+
+logger = logging.getLogger(__name__)
+
+# === Role classifier settings
+ROLE_CLASSIFIER_EMBEDDER = os.getenv("ROLE_CLASSIFIER_EMBEDDER", "hashed")  # "hashed" (offline) or "openai"
+# The embedding step only sees messages no role name, alias or topic keyword
+# claimed ("kubernetes", "runway" never get this far). Hashed n-grams are
+# lexical, so they only place messages that share words with a role's prompt
+# ("onboarding screens"); everything else falls below the cut-off.
+ROLE_CLASSIFIER_ENABLED = os.getenv("ROLE_CLASSIFIER_ENABLED", "1") == "1"
+# Below this cosine a message is treated as off-topic (hashed vectors score lower than dense ones).
+ROLE_CLASSIFIER_MIN_SCORE = float(os.getenv(
+    "ROLE_CLASSIFIER_MIN_SCORE", 0.3 if ROLE_CLASSIFIER_EMBEDDER == "openai" else 0.15
+))
+ROLE_AUTO_DEFAULT = os.getenv("ROLE_AUTO_DEFAULT", "ceo")
+
+
+class RoleClassifier:
+    """
+    Semantic role scorer. Every catalog role (name, aliases and prompt) is embedded
+    once into a row-normalised matrix; a message is scored against all roles with
+    one matrix-vector product, a batch of messages with one matrix product.
+    """
+
+    def __init__(self, embedder, roles: List[str], matrix: np.ndarray):
+        self.embedder = embedder
+        self.roles = roles
+        self.matrix = matrix
+
+    @classmethod
+    async def build(cls, embedder=None) -> "RoleClassifier":
+        embedder = embedder or (OpenAIEmbedder() if ROLE_CLASSIFIER_EMBEDDER == "openai" else HashedTfidfEmbedder())
+        catalog = get_role_router().catalog
+        roles = list(catalog)
+        documents = [
+            " ".join([entry.role, *entry.aliases, entry.prompt]) for entry in catalog.values()
+        ]
+        matrix = await embedder.embed(documents)
+        for row in matrix:
+            embedder.observe(row)
+
+        weights = embedder.weights()
+        if weights is not None:
+            matrix = matrix * weights
+        matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-9)
+        logger.info(f"✅ Role classifier built: {len(roles)} roles, {matrix.shape[1]} dims")
+        return cls(embedder, roles, matrix.astype(np.float32))
+
+    async def _queries(self, texts: List[str]) -> np.ndarray:
+        queries = await self.embedder.embed(texts)
+        weights = self.embedder.weights()
+        if weights is not None:
+            queries = queries * weights
+        return queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-9)
+
+    async def classify_many(self, texts: List[str], k: int = 3) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k (role, cosine score) per text, all texts scored in one product.
+        """
+        if not texts:
+            return []
+        scores = self.matrix @ (await self._queries(texts)).T  # roles x texts
+        k = min(k, len(self.roles))
+        top = np.argsort(-scores, axis=0)[:k]
+        return [
+            [(self.roles[row], round(float(scores[row, col]), 4)) for row in top[:, col]]
+            for col in range(len(texts))
+        ]
+
+    async def classify(self, text: str, k: int = 3) -> List[Tuple[str, float]]:
+        return (await self.classify_many([text], k=k))[0]
+
+
+_classifier: Optional[RoleClassifier] = None
+_build_lock = asyncio.Lock()
+
+
+async def get_role_classifier() -> RoleClassifier:
+    # Built at startup; built here on first use if startup didn't.
+    global _classifier
+    if _classifier is None:
+        async with _build_lock:
+            if _classifier is None:
+                _classifier = await RoleClassifier.build()
+    return _classifier
+
+
+async def resolve_role(text: str) -> str:
+    """
+    Picks a role for an "auto" chat: a role name, alias or topic keyword in the text
+    wins outright; otherwise the closest role by embedding (when ROLE_CLASSIFIER_ENABLED),
+    else the best category match, else ROLE_AUTO_DEFAULT.
+    """
+    keyword = get_role_router().best(text)
+    if keyword and keyword.score >= ALIAS_WEIGHT:
+        return keyword.role
+    if not ROLE_CLASSIFIER_ENABLED:
+        return keyword.role if keyword else ROLE_AUTO_DEFAULT
+
+    try:
+        ranked = await (await get_role_classifier()).classify(text, k=1)
+    except Exception as e:
+        logger.warning(f"⚠️ Role classification failed: {e}")
+        ranked = []
+    if ranked and ranked[0][1] >= ROLE_CLASSIFIER_MIN_SCORE:
+        return ranked[0][0]
+    return keyword.role if keyword else ROLE_AUTO_DEFAULT
@@ -0,0 +1,241 @@
+import re
+import logging
+import pkgutil
+import importlib
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import app.assistants_prompt as assistants_prompt
+
+logger = logging.getLogger(__name__)
+
+# Category keyword per prompt module; a module not listed uses its own name.
+CATEGORY_KEYWORDS = {
+    "ai_prompts": "ai",
+    "compliance_prompt": "compliance",
+    "ecommerce_prompts": "ecommerce",
+    "finance_prompt": "finance",
+    "leadership": "leadership",
+    "legal": "legal",
+    "marketing": "marketing",
+    "operations": "operations",
+    "platform_prompt": "platform",
+    "product": "product",
+    "research": "research",
+    "retail_prompts": "retail",
+    "saas_prompt": "saas",
+    "strategy_prompts": "strategy",
+    "support_prompt": "support",
+    "technical_prompt": "technical",
+}
+
+# Extra ways people name a role that the prompts themselves don't spell out.
+EXTRA_ALIASES = {
+    "ceo": ["chief executive", "founder"],
+    "cfo": ["chief financial officer", "finance chief"],
+    "cto": ["chief technology officer", "tech lead"],
+    "coo": ["chief operating officer"],
+    "cpo": ["chief product officer"],
+    "cmo": ["chief marketing officer", "head of marketing"],
+    "growth hacker": ["growth hacking", "growth"],
+    "ui/ux designer": ["ux designer", "ui designer", "designer"],
+    "ml ops engineer": ["mlops", "mlops engineer"],
+    "site reliability engineer": ["sre"],
+    "fp&a analyst": ["fp&a", "financial planning"],
+    "okr strategist": ["okr", "okrs"],
+    "data protection officer": ["dpo", "gdpr"],
+}
+
+# Subjects that clearly belong to one role even when no role is named. They count
+# as aliases, so "what runway do we have at this burn?" goes to the CFO.
+TOPIC_KEYWORDS = {
+    "cfo": ["runway", "burn", "burn rate", "cash flow", "unit economics", "margins", "valuation", "fundraising"],
+    "cto": ["kubernetes", "tech stack", "architecture", "infrastructure", "scalability", "database"],
+    "cmo": ["marketing plan", "positioning", "go-to-market"],
+    "coo": ["hiring plan", "operations plan"],
+    "pricing strategist": ["pricing", "price"],
+    "brand strategist": ["brand", "branding"],
+    "content strategist": ["blog", "seo", "content calendar"],
+    "product manager": ["roadmap", "feature"],
+}
+
+# Match weights: an exact role name beats an alias, which beats a category keyword.
+ROLE_WEIGHT, ALIAS_WEIGHT, CATEGORY_WEIGHT = 3.0, 2.0, 1.0
+
+# "You are the Chief Marketing Officer (CMO) of ..." → "chief marketing officer", "cmo"
+_TITLE_RE = re.compile(r"You are (?:the |a |an )?([A-Z][\w&/-]*(?: [A-Z&][\w&/-]*)*)(?: \(([^)]+)\))?")
+
+
+@dataclass
+class RoleEntry:
+    role: str
+    category: str
+    module: str
+    prompt: str
+    aliases: List[str] = field(default_factory=list)
+
+
+@dataclass
+class RoleCandidate:
+    role: str
+    category: str
+    score: float
+    matched: List[str]
+    prompt: str
+
+
+def _aliases_for(role: str, prompt: str) -> List[str]:
+    aliases = set(EXTRA_ALIASES.get(role, []))
+    title = _TITLE_RE.search(prompt.strip().splitlines()[0] if prompt.strip() else "")
+    if title:
+        if " " in title.group(1):  # a lone capitalised word is too generic to route on
+            aliases.add(title.group(1).lower())
+        if title.group(2):
+            aliases.add(title.group(2).lower())
+    if " & " in role:
+        aliases.add(role.replace(" & ", " and "))
+    aliases.discard(role)
+    return sorted(a for a in aliases if a)
+
+
+def load_catalog() -> Dict[str, RoleEntry]:
+    """
+    Imports every module in app/assistants_prompt once and collects the roles
+    its get_prompts() returns. Modules without get_prompts() are skipped.
+    """
+    catalog: Dict[str, RoleEntry] = {}
+    for module_info in pkgutil.iter_modules(assistants_prompt.__path__):
+        try:
+            module = importlib.import_module(f"{assistants_prompt.__name__}.{module_info.name}")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not import prompt module {module_info.name}: {e}")
+            continue
+        if not hasattr(module, "get_prompts"):
+            continue
+
+        category = CATEGORY_KEYWORDS.get(module_info.name, module_info.name)
+        for role, prompt in module.get_prompts().items():
+            role = role.lower().strip()
+            catalog[role] = RoleEntry(
+                role=role,
+                category=category,
+                module=module_info.name,
+                prompt=prompt.strip(),
+                aliases=_aliases_for(role, prompt),
+            )
+    return catalog
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: all patterns are found in one left-to-right pass over
+    the text, whatever their number. Matches must sit on word boundaries.
+    """
+
+    def __init__(self, patterns: Dict[str, object]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[str, object]]] = [[]]
+
+        for pattern, payload in patterns.items():
+            node = 0
+            for char in pattern:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node].append((pattern, payload))
+
+        # Breadth-first failure links; each node inherits its fallback's outputs.
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text: str):
+        """
+        Yields (pattern, payload) for each whole-word occurrence in `text` (already lower-cased).
+        """
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for pattern, payload in self.output[node]:
+                start = end - len(pattern) + 1
+                before = text[start - 1] if start > 0 else " "
+                after = text[end + 1] if end + 1 < len(text) else " "
+                if not before.isalnum() and not after.isalnum():
+                    yield pattern, payload
+
+
+class RoleRouter:
+    """
+    Ranks catalog roles for a piece of text: role names, aliases, topic keywords
+    and category keywords are compiled into one Aho-Corasick automaton at build time, so a
+    lookup is a single pass over the text.
+    """
+
+    def __init__(self, catalog: Dict[str, RoleEntry]):
+        self.catalog = catalog
+        patterns: Dict[str, List[Tuple[str, float]]] = {}
+
+        def add(pattern: str, role: str, weight: float):
+            targets = patterns.setdefault(pattern.lower(), [])
+            if all(existing != role for existing, _ in targets):
+                targets.append((role, weight))
+
+        for entry in catalog.values():
+            add(entry.role, entry.role, ROLE_WEIGHT)
+            for alias in entry.aliases:
+                add(alias, entry.role, ALIAS_WEIGHT)
+            add(entry.category, entry.role, CATEGORY_WEIGHT)
+        for role, topics in TOPIC_KEYWORDS.items():
+            if role in catalog:
+                for topic in topics:
+                    add(topic, role, ALIAS_WEIGHT)
+
+        self.matcher = AhoCorasick(patterns)
+        logger.info(f"✅ Role router built: {len(catalog)} roles, {len(patterns)} patterns")
+
+    def route(self, text: str, limit: int = 3) -> List[RoleCandidate]:
+        scores: Dict[str, float] = {}
+        matched: Dict[str, List[str]] = {}
+        for pattern, targets in self.matcher.find(text.lower()):
+            # A category keyword is shared by the whole category; split its weight.
+            sharing = sum(1 for _, weight in targets if weight == CATEGORY_WEIGHT) or 1
+            for role, weight in targets:
+                scores[role] = scores.get(role, 0.0) + (weight / sharing if weight == CATEGORY_WEIGHT else weight)
+                matched.setdefault(role, []).append(pattern)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [
+            RoleCandidate(
+                role=role,
+                category=self.catalog[role].category,
+                score=round(score, 3),
+                matched=matched[role],
+                prompt=self.catalog[role].prompt,
+            )
+            for role, score in ranked
+        ]
+
+    def best(self, text: str) -> Optional[RoleCandidate]:
+        candidates = self.route(text, limit=1)
+        return candidates[0] if candidates else None
+
+
+@lru_cache(maxsize=1)
+def get_role_router() -> RoleRouter:
+    # Built once per process (warmed at startup).
+    return RoleRouter(load_catalog())
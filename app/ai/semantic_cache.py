@@ -0,0 +1,313 @@
+import os
+import re
+import time
+import zlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.ai.llm_gateway import get_client
+from app.utils.rate_limiter import llm_slot
+
+logger = logging.getLogger(__name__)
+
+# === Semantic cache settings
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_EMBEDDER = os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashed")  # "hashed" (offline) or "openai"
+SEMANTIC_CACHE_EMBEDDING_MODEL = os.getenv("SEMANTIC_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+# Hashed n-gram vectors score near-duplicates lower than dense embeddings do.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv(
+    "SEMANTIC_CACHE_THRESHOLD", 0.9 if SEMANTIC_CACHE_EMBEDDER == "openai" else 0.7
+))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", 6 * 3600))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES_PER_TENANT", 500))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_HASH_DIM", 4096))
+SEMANTIC_CACHE_INITIAL_ROWS = 16
+# Two differing key terms still count as the same term at this trigram overlap
+# ("marketting" / "marketing"), but not "plan" / "plant" or "B2B" / "B2C".
+SEMANTIC_CACHE_TERM_SIMILARITY = 0.6
+
+# Words that may differ between two prompts without changing what is asked: function
+# words and the phrasing of the request itself ("write me a good ...").
+STOPWORDS = frozenset("""
+a an and are as at be by can could do does for from how i in is it me my of on or our should so
+some that the this to we what when where which who why will with would you your
+best create draft explain generate give good great help make need please provide suggest tell want write
+""".split())
+SUFFIXES = ("ing", "ies", "es", "ed", "s", "e")
+
+
+def _stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def key_terms(text: str) -> frozenset:
+    """
+    The (crudely stemmed) words that carry a prompt's meaning: stopwords dropped,
+    so "marketing plan for my SaaS" and "SaaS marketing plans" have the same terms.
+    """
+    return frozenset(_stem(w) for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS)
+
+
+def _trigrams(term: str) -> set:
+    padded = f"#{term}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _same_term(a: str, b: str) -> bool:
+    # Spelling variants only; anything with a digit (B2B, 2025, 10k) must match exactly
+    if any(c.isdigit() for c in a + b):
+        return False
+    ta, tb = _trigrams(a), _trigrams(b)
+    return len(ta & tb) / len(ta | tb) >= SEMANTIC_CACHE_TERM_SIMILARITY
+
+
+def terms_agree(stored: frozenset, query: frozenset) -> bool:
+    """
+    Whether two prompts ask about the same things. Every key term has to be present
+    on both sides, up to spelling ("marketting"), so a reworded, reordered or
+    inflected prompt can reuse an answer, but "... in Paris" never answers
+    "... in Berlin" and an extra qualifier ("... for hospitals") is a miss.
+    """
+    missing, extra = list(stored - query), list(query - stored)
+    if len(missing) != len(extra):
+        return False
+    for term in extra:
+        match = next((m for m in missing if _same_term(m, term)), None)
+        if match is None:
+            return False
+        missing.remove(match)
+    return True
+
+
+class HashedTfidfEmbedder:
+    """
+    Offline embedder: words and character trigrams hashed into SEMANTIC_CACHE_DIM
+    buckets with sublinear term frequency. Order-insensitive on purpose, so
+    "SaaS marketing plan" lands close to "marketing plan for my SaaS". IDF comes
+    from the documents stored so far and is applied at search time through
+    weights(), so rows never need re-embedding as the statistics shift.
+    """
+
+    def __init__(self, dim: int = SEMANTIC_CACHE_DIM):
+        self.dim = dim
+        self.doc_freq = np.zeros(dim, dtype=np.float32)
+        self.docs = 0
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features = list(words)
+        for word in words:
+            padded = f"#{word}#"
+            features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return features
+
+    def _vector(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        buckets = [zlib.crc32(f.encode()) % self.dim for f in self._features(text)]
+        if buckets:
+            np.add.at(vec, buckets, 1.0)
+            nonzero = vec > 0
+            vec[nonzero] = 1.0 + np.log(vec[nonzero])
+        return vec
+
+    async def embed(self, texts: List[str], tenant_id: Optional[str] = None) -> np.ndarray:
+        return np.stack([self._vector(text) for text in texts])
+
+    def observe(self, vector: np.ndarray):
+        self.doc_freq += vector > 0
+        self.docs += 1
+
+    def weights(self) -> np.ndarray:
+        return np.log((1.0 + self.docs) / (1.0 + self.doc_freq)) + 1.0
+
+
+class OpenAIEmbedder:
+    def __init__(self, model: str = SEMANTIC_CACHE_EMBEDDING_MODEL):
+        self.model = model
+
+    async def embed(self, texts: List[str], tenant_id: Optional[str] = None) -> np.ndarray:
+        tokens = sum(len(text) for text in texts) // 4
+        async with llm_slot("openai", tenant_id, tokens=tokens, model=self.model):
+            response = await get_client().embeddings.create(model=self.model, input=texts)
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+    def observe(self, vector: np.ndarray):
+        pass
+
+    def weights(self) -> Optional[np.ndarray]:
+        return None
+
+
+class _TenantIndex:
+    """
+    Matrix of one tenant's cached prompts. It starts small and doubles as rows are
+    added, up to `capacity`; from then on rows are reused in place on eviction.
+    """
+
+    def __init__(self, capacity: int, dim: int):
+        self.capacity = capacity
+        rows = min(capacity, SEMANTIC_CACHE_INITIAL_ROWS)
+        self.vectors = np.zeros((rows, dim), dtype=np.float32)
+        self.namespaces = np.full(rows, -1, dtype=np.int32)
+        self.expires = np.zeros(rows, dtype=np.float64)
+        self.last_used = np.zeros(rows, dtype=np.float64)
+        self.values: List[Any] = [None] * rows
+        self.terms: List[frozenset] = [frozenset()] * rows
+        self.size = 0
+
+    def _grow(self):
+        rows = min(self.capacity, len(self.values) * 2)
+        extra = rows - len(self.values)
+        self.vectors = np.vstack([self.vectors, np.zeros((extra, self.vectors.shape[1]), dtype=np.float32)])
+        self.namespaces = np.concatenate([self.namespaces, np.full(extra, -1, dtype=np.int32)])
+        self.expires = np.concatenate([self.expires, np.zeros(extra, dtype=np.float64)])
+        self.last_used = np.concatenate([self.last_used, np.zeros(extra, dtype=np.float64)])
+        self.values += [None] * extra
+        self.terms += [frozenset()] * extra
+
+    def free_row(self, now: float) -> Tuple[int, bool]:
+        # Returns (row, evicted): an unused row, else an expired one, else the least recently used.
+        if self.size == len(self.values) and self.size < self.capacity:
+            self._grow()
+        if self.size < len(self.values):
+            self.size += 1
+            return self.size - 1, False
+        expired = np.flatnonzero(self.expires[:self.size] <= now)
+        if expired.size:
+            return int(expired[0]), False
+        return int(np.argmin(self.last_used[:self.size])), True
+
+
+class SemanticCache:
+    """
+    Near-duplicate prompt cache. Each tenant has a NumPy matrix of prompt embeddings;
+    lookups are one matrix product against every live row in the same namespace,
+    and the best row counts as a hit when its cosine similarity reaches the threshold.
+
+    Namespaces keep different request kinds apart (e.g. "research:paper review"),
+    so only comparable prompts are ever matched. With `same_terms` (the default for
+    the hashed embedder, whose lexical scores can't tell "Paris" from "Berlin") a
+    row above the threshold is only a hit if terms_agree() with the query; the best
+    such row wins.
+    """
+
+    def __init__(self, embedder=None, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl: float = SEMANTIC_CACHE_TTL, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 same_terms: Optional[bool] = None):
+        self.embedder = embedder or (
+            OpenAIEmbedder() if SEMANTIC_CACHE_EMBEDDER == "openai" else HashedTfidfEmbedder()
+        )
+        self.same_terms = isinstance(self.embedder, HashedTfidfEmbedder) if same_terms is None else same_terms
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._tenants: Dict[str, _TenantIndex] = {}
+        self._namespace_ids: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hit_similarity_total = 0.0
+
+    def _namespace_id(self, namespace: str) -> int:
+        return self._namespace_ids.setdefault(namespace, len(self._namespace_ids))
+
+    def _scores(self, index: _TenantIndex, namespace: str, queries: np.ndarray) -> np.ndarray:
+        # Cosine similarity of every query against every row: (rows x queries).
+        rows = index.vectors[:index.size]
+        weights = self.embedder.weights()
+        if weights is not None:
+            rows = rows * weights
+            queries = queries * weights
+        norms = np.linalg.norm(rows, axis=1)[:, None] * np.linalg.norm(queries, axis=1)[None, :]
+        scores = (rows @ queries.T) / np.maximum(norms, 1e-9)
+
+        live = (index.namespaces[:index.size] == self._namespace_ids.get(namespace, -2)) \
+            & (index.expires[:index.size] > time.time())
+        scores[~live] = -1.0
+        return scores
+
+    async def lookup_many(self, tenant_id: Optional[str], namespace: str, texts: List[str]) -> List[Optional[Any]]:
+        """
+        Batched lookup: embeds all texts at once and scores them in a single matrix product.
+        """
+        index = self._tenants.get(tenant_id or "system")
+        if index is None or index.size == 0:
+            self.misses += len(texts)
+            return [None] * len(texts)
+
+        scores = self._scores(index, namespace, await self.embedder.embed(texts, tenant_id))
+        results = []
+        for col, text in enumerate(texts):
+            row = self._best_row(index, scores[:, col], text)
+            if row is None:
+                self.misses += 1
+                results.append(None)
+                continue
+            index.last_used[row] = time.time()
+            self.hits += 1
+            self.hit_similarity_total += float(scores[row, col])
+            results.append(index.values[row])
+        return results
+
+    def _best_row(self, index: _TenantIndex, scores: np.ndarray, text: str) -> Optional[int]:
+        candidates = np.flatnonzero(scores >= self.threshold)
+        if not self.same_terms:
+            return int(candidates[np.argmax(scores[candidates])]) if candidates.size else None
+        terms = key_terms(text)
+        for row in candidates[np.argsort(-scores[candidates])]:
+            if terms_agree(index.terms[row], terms):
+                return int(row)
+        return None
+
+    async def get(self, tenant_id: Optional[str], namespace: str, text: str) -> Optional[Any]:
+        # A cache problem (e.g. the embedding call failing) is only ever a miss.
+        try:
+            return (await self.lookup_many(tenant_id, namespace, [text]))[0]
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic cache lookup failed: {e}")
+            return None
+
+    async def put(self, tenant_id: Optional[str], namespace: str, text: str, value: Any, ttl: Optional[float] = None):
+        try:
+            await self._store(tenant_id, namespace, text, value, ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic cache store failed: {e}")
+
+    async def _store(self, tenant_id: Optional[str], namespace: str, text: str, value: Any, ttl: Optional[float]):
+        vector = (await self.embedder.embed([text], tenant_id))[0]
+        tenant = tenant_id or "system"
+        index = self._tenants.get(tenant)
+        if index is None:
+            index = self._tenants[tenant] = _TenantIndex(self.max_entries, vector.shape[0])
+
+        now = time.time()
+        row, evicted = index.free_row(now)
+        self.evictions += int(evicted)
+        index.vectors[row] = vector
+        index.namespaces[row] = self._namespace_id(namespace)
+        index.expires[row] = now + (ttl or self.ttl)
+        index.last_used[row] = now
+        index.values[row] = value
+        index.terms[row] = key_terms(text)
+        self.embedder.observe(vector)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "embedder": type(self.embedder).__name__,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "avg_hit_similarity": round(self.hit_similarity_total / self.hits, 3) if self.hits else None,
+            "evictions": self.evictions,
+            "entries": sum(index.size for index in self._tenants.values()),
+        }
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,90 @@
+-- Tables behind token budgets, pooled assistants, chat state and cross-worker
+-- single-flight. Matches the models in app/models; the keys below are the ones
+-- the ON CONFLICT upserts in the services rely on. Safe to re-run.
+
+BEGIN;
+
+-- === Token budgets (app/services/usage_service.py)
+
+CREATE TABLE IF NOT EXISTS token_usage_counters (
+    scope           VARCHAR(16) NOT NULL,            -- 'user' or 'tenant'
+    scope_id        VARCHAR(36) NOT NULL,
+    period          DATE        NOT NULL,            -- first day of the billing month (UTC)
+    tokens_used     BIGINT      NOT NULL DEFAULT 0,
+    reserved_tokens BIGINT      NOT NULL DEFAULT 0,
+    updated_at      TIMESTAMP            DEFAULT NOW(),
+    PRIMARY KEY (scope, scope_id, period)            -- ON CONFLICT (scope, scope_id, period)
+);
+
+CREATE TABLE IF NOT EXISTS token_reservations (
+    id         UUID        PRIMARY KEY,
+    user_id    VARCHAR(36) NOT NULL,
+    period     DATE        NOT NULL,
+    tokens     INTEGER     NOT NULL,
+    created_at TIMESTAMP            DEFAULT NOW()
+);
+-- Reconciliation sums live reservations per period and expires old ones
+CREATE INDEX IF NOT EXISTS token_reservations_period_user_idx ON token_reservations (period, user_id);
+CREATE INDEX IF NOT EXISTS token_reservations_created_at_idx ON token_reservations (created_at);
+
+-- Reconciliation rebuilds the counters from one month of the ledger
+CREATE INDEX IF NOT EXISTS token_usage_created_at_idx ON token_usage (created_at);
+
+-- === Pooled role assistants (app/services/assistant_service.py)
+
+CREATE TABLE IF NOT EXISTS role_assistants (
+    role             TEXT        NOT NULL,
+    template_version VARCHAR(64) NOT NULL,           -- sparring template hash, or 'default'
+    assistant_id     TEXT        NOT NULL,
+    model            VARCHAR(64) NOT NULL,
+    created_at       TIMESTAMP            DEFAULT NOW(),
+    PRIMARY KEY (role, template_version)             -- ON CONFLICT (role, template_version)
+);
+
+-- === Rolling chat summaries (app/services/chat_context.py)
+
+CREATE TABLE IF NOT EXISTS idea_rolling_summaries (
+    idea_id         UUID        PRIMARY KEY,         -- ON CONFLICT (idea_id)
+    summary         TEXT        NOT NULL DEFAULT '',
+    last_message_at TIMESTAMPTZ,
+    last_message_id TEXT,
+    messages_folded INTEGER     NOT NULL DEFAULT 0,
+    updated_at      TIMESTAMP            DEFAULT NOW()
+);
+-- Messages after the high-water mark, in (created_at, id) order
+CREATE INDEX IF NOT EXISTS idea_chat_log_idea_created_idx ON idea_chat_log (idea_id, created_at);
+
+-- === Local conversation threads (app/stella_sdk/local_threads.py)
+
+CREATE TABLE IF NOT EXISTS local_threads (
+    id                 TEXT        PRIMARY KEY,      -- 'local_<hex>', stored as project_threads.thread_id
+    project_id         UUID        NOT NULL,
+    role               TEXT        NOT NULL,
+    tenant_id          UUID        NOT NULL,
+    user_id            UUID        NOT NULL,
+    summary            TEXT        NOT NULL DEFAULT '',
+    summarized_until   TIMESTAMPTZ,
+    summarized_turn_id TEXT,
+    created_at         TIMESTAMPTZ          DEFAULT NOW(),
+    updated_at         TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS local_thread_turns (
+    id         UUID        PRIMARY KEY,
+    thread_id  TEXT        NOT NULL REFERENCES local_threads (id) ON DELETE CASCADE,
+    speaker    VARCHAR(16) NOT NULL,                 -- 'user' or 'assistant'
+    content    TEXT        NOT NULL,
+    tokens     INTEGER,
+    created_at TIMESTAMPTZ          DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS local_thread_turns_thread_created_idx ON local_thread_turns (thread_id, created_at);
+
+-- === Cross-worker single-flight (app/utils/single_flight.py, SINGLE_FLIGHT_BACKEND=postgres)
+
+CREATE TABLE IF NOT EXISTS single_flight_leases (
+    key        TEXT        PRIMARY KEY,              -- ON CONFLICT (key)
+    holder     TEXT        NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- One thread per (project, role, user): the ON CONFLICT target used when
+-- assistant_service stores a new thread, so concurrent setups can't duplicate it.
+
+BEGIN;
+
+-- Keep the oldest row of any duplicates created before the constraint existed
+DELETE FROM project_threads p
+USING project_threads q
+WHERE p.project_id = q.project_id AND p.role = q.role AND p.user_id = q.user_id
+  AND (p.created_at, p.id::text) > (q.created_at, q.id::text);
+
+CREATE UNIQUE INDEX IF NOT EXISTS project_threads_project_role_user_key
+    ON project_threads (project_id, role, user_id);
+
+COMMIT;
@@ -0,0 +1,4 @@
+-- Per-role outcome of a panel analysis (status, tokens, seconds, error), written with
+-- vetting_response so a coalesced duplicate request can return the same response.
+
+ALTER TABLE ideas ADD COLUMN IF NOT EXISTS vetting_panel JSONB;
@@ -1,13 +1,11 @@
 from sqlalchemy.orm import Session
 from uuid import uuid4
-from openai import AsyncOpenAI
-from jinja2 import Template
 
 from app.models.idea import Idea
 from app.models.project_threads import ProjectThread
-from app.models.sparring_template import SparringTemplate
-
-client = AsyncOpenAI()
+from app.services.template_registry import template_registry
+from app.ai.llm_gateway import get_client
+from app.utils.rate_limiter import llm_slot
 
 
 async def ensure_assistant_for_role(
@@ -42,15 +40,14 @@ async def ensure_assistant_for_role(
         db=db
     )
 
-    # Create the new OpenAI assistant
-    assistant = await client.beta.assistants.create(
-        name=f"{idea.name} {role.upper()}",
-        instructions=prompt,
-        model="gpt-4o"
-    )
-
-    # Create a new memory thread for the assistant
-    thread = await client.beta.threads.create()
+    # Create the new OpenAI assistant and its memory thread (a fair turn on the assistants lane)
+    async with llm_slot("openai", user["tenant_id"], model="assistants"):
+        assistant = await get_client().beta.assistants.create(
+            name=f"{idea.name} {role.upper()}",
+            instructions=prompt,
+            model="gpt-4o"
+        )
+        thread = await get_client().beta.threads.create()
 
     # Save assistant/thread details to project_threads table
     db.add(ProjectThread(
@@ -70,13 +67,13 @@ async def ensure_assistant_for_role(
 def get_dynamic_prompt(role: str, idea_name: str, idea_summary: str, db: Session) -> str:
     role = role.lower()
 
-    template_obj = db.query(SparringTemplate).filter_by(role=role).first()
+    template_obj = template_registry.get_sparring_sync(role, db)
     if not template_obj:
         return f"You are the {role.upper()} of a startup. Help the founder make high-quality decisions."
 
     try:
-        tpl = Template(template_obj.template_text)
-        return tpl.render(
+        return template_obj.render(
+            "text",
             idea_name=idea_name,
             idea_summary=idea_summary
         )
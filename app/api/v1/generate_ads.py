@@ -1,10 +1,18 @@
 from dotenv import load_dotenv
 import os
+import asyncio
 from facebook.content_generator import generate_facebook_posts, queue_facebook_posts
+from app.db import close_pool
+from app.ai.llm_gateway import close_clients
 
 # Load env
 load_dotenv()
 
+async def generate_and_queue():
+    posts = await generate_facebook_posts(n=5)
+    await queue_facebook_posts(posts)
+    await close_pool()
+    await close_clients()
+
 if __name__ == "__main__":
-    posts = generate_facebook_posts(n=5)
-    queue_facebook_posts(posts)
+    asyncio.run(generate_and_queue())
@@ -1,15 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from uuid import UUID, uuid4
-from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from app.core.db import get_db
+from app.core.db import get_async_db, AsyncSessionLocal
 from app.dependencies.auth import get_current_user
-from app.services.assistant_service import ensure_assistant_for_role
+from app.services.assistant_service import (
+    ensure_assistant_for_role, project_context_instructions, is_pooled_assistant
+)
 from app.services.sparring_prompt import get_rendered_prompt
-from app.stella_sdk.runner import run_assistant
+from app.services.usage_service import (
+    get_user_usage, estimate_tokens, reserve_tokens, commit_reservation, release_reservation
+)
+from app.stella_sdk.runner import run_assistant, get_thread_id, stream_assistant
+from app.stella_sdk.local_threads import is_local_thread
+from app.utils.rate_limiter import LimiterRejected
+from app.ai.role_classifier import resolve_role
 import logging
+import json
 import re
 
 router = APIRouter()
@@ -21,6 +30,76 @@ class ChatMessage(BaseModel):
     sparring_mode: bool = False
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def store_chat_exchange(
+    db: AsyncSession, project_id: UUID, role: str, user: dict,
+    message: str, reply: str, reservation, tokens_used: int
+) -> int | None:
+    """
+    Writes the user/assistant messages, settles the token reservation and records
+    any viability score found in the reply. The caller commits.
+    """
+    # Extract viability score if present
+    viability_score = None
+    match = re.search(r"viability score:?\s*(\d{1,3})", reply, re.IGNORECASE)
+    if match:
+        viability_score = int(match.group(1))
+
+    # Store both messages
+    await db.execute(
+        text("""
+            INSERT INTO idea_chat_log (id, idea_id, user_id, role, message, created_at)
+            VALUES 
+                (:id1, :project_id, :user_id, 'user', :msg1, clock_timestamp()),
+                (:id2, :project_id, :user_id, :role, :msg2, clock_timestamp())
+        """),
+        {
+            "id1": str(uuid4()),
+            "id2": str(uuid4()),
+            "project_id": str(project_id),
+            "user_id": user["id"],
+            "msg1": message,
+            "msg2": reply,
+            "role": role
+        }
+    )
+
+    # Token usage log + monthly counters, replacing the reservation
+    await commit_reservation(db, reservation, user, project_id, tokens_used)
+
+    # Update score and history if found
+    if viability_score is not None:
+        await db.execute(
+            text("""
+                UPDATE ideas SET viability_score = :score, updated_at = NOW()
+                WHERE id = :id AND user_id = :user_id
+            """),
+            {
+                "score": viability_score,
+                "id": str(project_id),
+                "user_id": user["id"]
+            }
+        )
+        await db.execute(
+            text("""
+                INSERT INTO viability_score_history (id, idea_id, user_id, score, source, created_at)
+                VALUES (:id, :idea_id, :user_id, :score, :source, NOW())
+            """),
+            {
+                "id": str(uuid4()),
+                "idea_id": str(project_id),
+                "user_id": user["id"],
+                "score": viability_score,
+                "source": role
+            }
+        )
+
+    return viability_score
+
+
 # === POST /ideas/{project_id}/chat/{role}
 @router.post("/ideas/{project_id}/chat/{role}")
 async def chat_with_project_role(
@@ -28,29 +107,34 @@ async def chat_with_project_role(
     role: str,
     body: ChatMessage,
     user=Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> dict:
-    assistant_id = await ensure_assistant_for_role(project_id, role, user, db)
-
     # Load usage plan
-    plan = db.execute(
+    plan = (await db.execute(
         text("SELECT p.max_tokens FROM user_plans p JOIN users u ON u.plan_id = p.id WHERE u.id = :user_id"),
         {"user_id": user["id"]}
-    ).fetchone()
+    )).fetchone()
     if not plan:
         raise HTTPException(status_code=400, detail="User has no plan")
 
-    start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    used = db.execute(
-        text("SELECT COALESCE(SUM(tokens_used), 0) FROM token_usage WHERE user_id = :user_id AND created_at >= :start"),
-        {"user_id": user["id"], "start": start_of_month}
-    ).scalar()
+    # "auto": pick the role from the message itself (keyword match, then embedding score)
+    if role.lower() == "auto":
+        role = await resolve_role(body.message)
+
+    used = await get_user_usage(db, user["id"])
+
+    # Optional: Inject sparring mode system prompt
+    system_prompt = await get_rendered_prompt(project_id, role, db) if body.sparring_mode else None
+
+    # Hold the estimated cost up front; over-quota users never reach OpenAI
+    reservation = await reserve_tokens(
+        user, estimate_tokens(body.message + (system_prompt or "")), plan.max_tokens
+    )
 
     try:
-        # Optional: Inject sparring mode system prompt
-        system_prompt = get_rendered_prompt(project_id, role, db) if body.sparring_mode else None
+        assistant_id = await ensure_assistant_for_role(project_id, role, user, db)
 
-        gpt_reply, thread_id = await run_assistant(
+        run = await run_assistant(
             project_id=project_id,
             role=role,
             message=body.message,
@@ -60,79 +144,16 @@ async def chat_with_project_role(
             db=db,
             system_message=system_prompt
         )
+        gpt_reply, thread_id = run
 
-        tokens_used = 800  # Estimate (or replace with real tracking if available)
-
-        if used + tokens_used > plan.max_tokens:
-            raise HTTPException(status_code=403, detail="Token limit exceeded")
-
-        # Extract viability score if present
-        viability_score = None
-        match = re.search(r"viability score:?\s*(\d{1,3})", gpt_reply, re.IGNORECASE)
-        if match:
-            viability_score = int(match.group(1))
+        # The run's reported usage; a text-length estimate only if the API gave none
+        tokens_used = run.total_tokens or estimate_tokens(body.message + gpt_reply, completion_tokens=0)
 
-        # Store both messages
-        db.execute(
-            text("""
-                INSERT INTO idea_chat_log (id, idea_id, user_id, role, message)
-                VALUES 
-                    (:id1, :project_id, :user_id, 'user', :msg1),
-                    (:id2, :project_id, :user_id, :role, :msg2)
-            """),
-            {
-                "id1": str(uuid4()),
-                "id2": str(uuid4()),
-                "project_id": str(project_id),
-                "user_id": user["id"],
-                "msg1": body.message,
-                "msg2": gpt_reply,
-                "role": role
-            }
+        viability_score = await store_chat_exchange(
+            db, project_id, role, user, body.message, gpt_reply, reservation, tokens_used
         )
 
-        # Token usage log
-        db.execute(
-            text("""
-                INSERT INTO token_usage (id, user_id, idea_id, tokens_used, created_at)
-                VALUES (:id, :user_id, :idea_id, :tokens_used, NOW())
-            """),
-            {
-                "id": str(uuid4()),
-                "user_id": user["id"],
-                "idea_id": str(project_id),
-                "tokens_used": tokens_used
-            }
-        )
-
-        # Update score and history if found
-        if viability_score is not None:
-            db.execute(
-                text("""
-                    UPDATE ideas SET viability_score = :score, updated_at = NOW()
-                    WHERE id = :id AND user_id = :user_id
-                """),
-                {
-                    "score": viability_score,
-                    "id": str(project_id),
-                    "user_id": user["id"]
-                }
-            )
-            db.execute(
-                text("""
-                    INSERT INTO viability_score_history (id, idea_id, user_id, score, source, created_at)
-                    VALUES (:id, :idea_id, :user_id, :score, :source, NOW())
-                """),
-                {
-                    "id": str(uuid4()),
-                    "idea_id": str(project_id),
-                    "user_id": user["id"],
-                    "score": viability_score,
-                    "source": role
-                }
-            )
-
-        db.commit()
+        await db.commit()
 
         return {
             "response": gpt_reply,
@@ -146,40 +167,135 @@ async def chat_with_project_role(
         }
 
     except Exception as e:
+        await db.rollback()  # drop row locks taken by commit_reservation first
+        await release_reservation(reservation)
+        if isinstance(e, LimiterRejected):
+            raise
         logger.exception(f"[{role.upper()} Assistant] GPT failed")
         raise HTTPException(status_code=500, detail=f"{role.upper()} assistant failed: {str(e)}")
 
 
+# === POST /ideas/{project_id}/chat/{role}/stream
+@router.post("/ideas/{project_id}/chat/{role}/stream")
+async def stream_chat_with_project_role(
+    project_id: UUID,
+    role: str,
+    body: ChatMessage,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Same exchange as the non-streaming route, delivered as Server-Sent Events:
+    `delta` events carry text as it arrives, then one `done` (or `error`) event.
+    The chat log, token usage and viability score are written once the run ends.
+    """
+    plan = (await db.execute(
+        text("SELECT p.max_tokens FROM user_plans p JOIN users u ON u.plan_id = p.id WHERE u.id = :user_id"),
+        {"user_id": user["id"]}
+    )).fetchone()
+    if not plan:
+        raise HTTPException(status_code=400, detail="User has no plan")
+
+    # "auto": pick the role from the message itself (keyword match, then embedding score)
+    if role.lower() == "auto":
+        role = await resolve_role(body.message)
+
+    used = await get_user_usage(db, user["id"])
+    system_prompt = await get_rendered_prompt(project_id, role, db) if body.sparring_mode else None
+
+    reservation = await reserve_tokens(
+        user, estimate_tokens(body.message + (system_prompt or "")), plan.max_tokens
+    )
+
+    try:
+        assistant_id = await ensure_assistant_for_role(project_id, role, user, db)
+        thread_id = await get_thread_id(project_id, role, user["tenant_id"], user["id"], db)
+        # Local threads render the project into their own system prompt
+        pooled = not is_local_thread(thread_id) and await is_pooled_assistant(assistant_id, db)
+        context = await project_context_instructions(project_id, db) if pooled else None
+    except Exception as e:
+        await db.rollback()
+        await release_reservation(reservation)
+        logger.exception(f"[{role.upper()} Assistant] Stream setup failed")
+        raise HTTPException(status_code=500, detail=f"{role.upper()} assistant failed: {str(e)}")
+
+    # End the request session's transaction now so its pooled connection is not held
+    # for the length of the stream; the exchange is stored on a fresh session below.
+    await db.commit()
+
+    async def event_stream():
+        chunks = []
+        settled = False
+        try:
+            tokens_used = None
+            async for kind, value in stream_assistant(
+                thread_id, assistant_id, body.message, user["tenant_id"], additional_instructions=context
+            ):
+                if kind == "delta":
+                    chunks.append(value)
+                    yield _sse("delta", {"text": value})
+                else:
+                    tokens_used = value
+
+            gpt_reply = "".join(chunks).strip()
+            # Estimate from the text when the run reports no usage
+            tokens_used = tokens_used or estimate_tokens(body.message + gpt_reply, completion_tokens=0)
+
+            async with AsyncSessionLocal() as stream_db:
+                viability_score = await store_chat_exchange(
+                    stream_db, project_id, role, user, body.message, gpt_reply, reservation, tokens_used
+                )
+                await stream_db.commit()
+            settled = True
+
+            yield _sse("done", {
+                "thread_id": thread_id,
+                "assistant_id": assistant_id,
+                "role": role,
+                "project_id": str(project_id),
+                "tokens_used": tokens_used,
+                "tokens_remaining": plan.max_tokens - used - tokens_used,
+                "viability_score": viability_score
+            })
+        except LimiterRejected as e:
+            yield _sse("error", {"detail": e.detail, "retry_after": int(e.headers["Retry-After"])})
+        except Exception as e:
+            logger.exception(f"[{role.upper()} Assistant] Stream failed")
+            yield _sse("error", {"detail": f"{role.upper()} assistant failed: {str(e)}"})
+        finally:
+            # Also runs when the client disconnects mid-stream.
+            if not settled:
+                await release_reservation(reservation)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # === GET /ideas/{project_id}/chat-log
 @router.get("/ideas/{project_id}/chat-log")
-def get_chat_log(
+async def get_chat_log(
     project_id: UUID,
     user=Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    plan = db.execute(
+    plan = (await db.execute(
         text("""
         SELECT p.max_tokens
         FROM user_plans p
         JOIN users u ON u.plan_id = p.id
         WHERE u.id = :user_id
         """), {"user_id": user["id"]}
-    ).fetchone()
+    )).fetchone()
 
     if not plan:
         raise HTTPException(status_code=400, detail="User has no plan")
 
-    start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    used = db.execute(
-        text("""
-        SELECT COALESCE(SUM(tokens_used), 0)
-        FROM token_usage
-        WHERE user_id = :user_id AND created_at >= :start
-        """),
-        {"user_id": user["id"], "start": start_of_month}
-    ).scalar()
+    used = await get_user_usage(db, user["id"])
 
-    rows = db.execute(
+    rows = (await db.execute(
         text("""
         SELECT role, message, created_at
         FROM idea_chat_log
@@ -187,16 +303,16 @@ def get_chat_log(
         ORDER BY created_at ASC
         """),
         {"idea_id": str(project_id), "user_id": user["id"]}
-    ).fetchall()
+    )).fetchall()
 
-    score = db.execute(
+    score = (await db.execute(
         text("""
         SELECT viability_score
         FROM ideas
         WHERE id = :id AND user_id = :user_id
         """),
         {"id": str(project_id), "user_id": user["id"]}
-    ).scalar()
+    )).scalar()
 
     return {
         "messages": [
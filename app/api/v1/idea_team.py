@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from uuid import UUID
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.dependencies.auth import get_current_user
-from app.core.db import get_db
+from app.core.db import get_db, get_async_db
 from app.models.project_threads import ProjectThread
+from app.services.team_service import start_team_prewarm, get_recommended_team, get_team_status
 
 router = APIRouter()
 
@@ -29,3 +31,26 @@ def get_project_team(
         "roles": roles,
         "assistants": assistant_map
     }
+
+
+@router.post("/ideas/{project_id}/team/prewarm")
+async def prewarm_project_team(
+    project_id: UUID,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    team = await get_recommended_team(project_id, user, db)
+    if team is None:
+        raise HTTPException(status_code=404, detail="Summarize the idea first to get a recommended team.")
+
+    start_team_prewarm(project_id, user, team)
+    return await get_team_status(project_id, user, db)
+
+
+@router.get("/ideas/{project_id}/team/status")
+async def get_project_team_status(
+    project_id: UUID,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await get_team_status(project_id, user, db)
@@ -1,9 +1,10 @@
 from uuid import UUID
+from typing import Literal, Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dependencies.auth import get_current_user
-from app.core.db import get_db
+from app.core.db import get_async_db
 from app.services.idea_service import (
     analyze_idea_logic,
     create_idea,
@@ -11,37 +12,54 @@ from app.services.idea_service import (
     get_idea_detail,
     export_idea_email,
     summarize_idea,
+    get_recent_analysis,
+    get_recent_summary,
 )
 from app.schemas.idea import IdeaCreate
-from app.services.assistant_service import ensure_assistant_for_role
+from app.services.team_service import ensure_team_role, start_team_prewarm
+from app.utils.single_flight import single_flight, flight_key
 
 router = APIRouter()
 
 @router.post("/ideas/{id}/analyze")
-async def analyze_idea(id: UUID, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    return await analyze_idea_logic(id, user, db)
+async def analyze_idea(
+    id: UUID,
+    mode: Optional[Literal["panel", "single"]] = None,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Double-clicks and retries share one analysis run
+    return await single_flight.do(
+        flight_key("analyze", user["tenant_id"], id, {"user": user["id"], "mode": mode}),
+        lambda: analyze_idea_logic(id, user, db, mode=mode),
+        reuse=lambda since: get_recent_analysis(id, user, db, since)
+    )
 
 @router.post("/ideas")
-def create_idea_route(payload: IdeaCreate, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    return create_idea(payload, user, db)
+async def create_idea_route(payload: IdeaCreate, user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await create_idea(payload, user, db)
 
 @router.get("/ideas")
-def list_ideas(user=Depends(get_current_user), db: Session = Depends(get_db)):
-    return get_all_ideas(user, db)
+async def list_ideas(user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await get_all_ideas(user, db)
 
 @router.get("/ideas/{id}")
-def get_idea(id: UUID, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    return get_idea_detail(id, user, db)
+async def get_idea(id: UUID, user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await get_idea_detail(id, user, db)
 
 @router.post("/ideas/{id}/export-email")
-def export_email(id: UUID, format_type: str = "pdf", user=Depends(get_current_user), db: Session = Depends(get_db)):
-    return export_idea_email(id, format_type, user, db)
+async def export_email(id: UUID, format_type: str = "pdf", user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await export_idea_email(id, format_type, user, db)
 
 @router.post("/ideas/{id}/summarize")
-async def summarize(id: UUID, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    result = await summarize_idea(id, user, db)
-    
-    # 🔁 Create CEO assistant after idea summary
-    await ensure_assistant_for_role(id, role="ceo", user=user, db=db)
-    
+async def summarize(id: UUID, user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    result = await single_flight.do(
+        flight_key("summarize", user["tenant_id"], id, user["id"]),
+        lambda: summarize_idea(id, user, db),
+        reuse=lambda since: get_recent_summary(id, user, db, since)
+    )
+
+    # 🧠 The CEO is ready before we return; every recommended role is set up in the background
+    await ensure_team_role(id, "ceo", user)
+    start_team_prewarm(id, user, result.get("recommended_team"))
     return result
@@ -1,16 +1,19 @@
 from dotenv import load_dotenv
 import os
+import asyncio
 from facebook.poster import FacebookPoster
 from facebook.content_generator import generate_facebook_posts, queue_facebook_posts, get_next_queued_post
+from app.db import close_pool
 
 # Load env vars
 load_dotenv()
 
 FB_PAGE_TOKEN = os.getenv("FB_PAGE_TOKEN")
 
-def post_scheduled_content():
+async def post_scheduled_content():
     # Post if there's something queued
-    next_post = get_next_queued_post()
+    next_post = await get_next_queued_post()
+    await close_pool()
     if next_post:
         print("🗓️ Scheduled post day — posting next queued content...")
         fb_poster = FacebookPoster(FB_PAGE_TOKEN)
@@ -19,4 +22,4 @@ def post_scheduled_content():
         print("📭 No queued posts available. Run the content generator.")
 
 if __name__ == "__main__":
-    post_scheduled_content()
+    asyncio.run(post_scheduled_content())
@@ -1,16 +1,8 @@
 # app/core/config.py
 
-import os
-from databases import Database
-from dotenv import load_dotenv
+from app.core.db_registry import get_database
 
-load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not set")
-
-database = Database(DATABASE_URL)
+database = get_database()
 
 async def load_config():
     # Extend as needed to pull dynamic settings or tenant config
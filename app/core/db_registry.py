@@ -0,0 +1,90 @@
+# app/core/db_registry.py
+
+import os
+import logging
+from typing import Dict, Tuple
+
+from databases import Database
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    raise RuntimeError("DATABASE_URL not set")
+
+# === Pool sizing per role
+# "oltp" serves request handlers; "logging" keeps audit/API-log writes from
+# competing with them. A role may point at its own DSN via DATABASE_URL_<ROLE>.
+ROLE_POOL_SIZES: Dict[str, Tuple[int, int]] = {
+    "oltp": (
+        int(os.getenv("DB_OLTP_MIN_SIZE", 1)),
+        int(os.getenv("DB_OLTP_MAX_SIZE", 10)),
+    ),
+    "logging": (
+        int(os.getenv("DB_LOGGING_MIN_SIZE", 1)),
+        int(os.getenv("DB_LOGGING_MAX_SIZE", 3)),
+    ),
+}
+
+_databases: Dict[Tuple[str, str], Database] = {}
+
+
+def get_database(role: str = "oltp") -> Database:
+    """
+    Returns the shared `Database` for a role, creating it on first use.
+    Every module asking for the same role and DSN gets the same pool.
+    """
+    if role not in ROLE_POOL_SIZES:
+        raise ValueError(f"Unknown database role: {role}")
+
+    url = os.getenv(f"DATABASE_URL_{role.upper()}") or DATABASE_URL
+    key = (role, url)
+    if key not in _databases:
+        min_size, max_size = ROLE_POOL_SIZES[role]
+        _databases[key] = Database(url, min_size=min_size, max_size=max_size)
+    return _databases[key]
+
+
+async def connect_all():
+    for (role, _), database in _databases.items():
+        await database.connect()
+        logger.info(f"✅ Database pool connected: {role}")
+
+
+async def disconnect_all():
+    for (role, _), database in _databases.items():
+        if database.is_connected:
+            await database.disconnect()
+            logger.info(f"🛑 Database pool disconnected: {role}")
+
+
+def database_metrics() -> dict:
+    """
+    Per-role pool gauges. `saturation` is in-use connections over max size.
+    """
+    metrics = {}
+    for (role, _), database in _databases.items():
+        min_size, max_size = ROLE_POOL_SIZES[role]
+        stats = {
+            "connected": database.is_connected,
+            "min_size": min_size,
+            "max_size": max_size,
+            "size": 0,
+            "in_use": 0,
+            "saturation": 0.0,
+        }
+        # asyncpg backend only; other backends report the static sizes.
+        pool = getattr(getattr(database, "_backend", None), "_pool", None)
+        if database.is_connected and pool is not None:
+            size = pool.get_size()
+            in_use = size - pool.get_idle_size()
+            stats.update({
+                "size": size,
+                "in_use": in_use,
+                "saturation": round(in_use / max_size, 3) if max_size else 0.0,
+            })
+        metrics[role] = stats
+    return metrics
@@ -1,21 +1,20 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
+# Kept for older imports; the engines and session factories live in app.core.db.
+from app.core.db import (
+    engine,
+    SessionLocal,
+    get_db,
+    get_sync_db,
+    async_engine,
+    AsyncSessionLocal,
+    get_async_db,
+)
 
-load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set")
-
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# ✅ Add this missing function:
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+__all__ = [
+    "engine",
+    "SessionLocal",
+    "get_db",
+    "get_sync_db",
+    "async_engine",
+    "AsyncSessionLocal",
+    "get_async_db",
+]
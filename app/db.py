@@ -1,14 +1,120 @@
-import asyncpg
+import asyncio
+import logging
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import asyncpg
 from dotenv import load_dotenv
 
 load_dotenv()
 
-async def get_db_connection():
-    return await asyncpg.connect(
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        database=os.getenv("POSTGRES_DB"),
-        host=os.getenv("POSTGRES_HOST"),
-        port=int(os.getenv("POSTGRES_PORT")),
+logger = logging.getLogger(__name__)
+
+# === Pool settings (per worker)
+POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", 2))
+POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", 10))
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("PG_POOL_ACQUIRE_TIMEOUT", 5))
+POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("PG_POOL_MAX_INACTIVE_LIFETIME", 300))
+POOL_COMMAND_TIMEOUT = float(os.getenv("PG_POOL_COMMAND_TIMEOUT", 30))
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+_metrics = {
+    "acquired_total": 0,
+    "acquire_timeouts_total": 0,
+    "acquire_wait_seconds_total": 0.0,
+    "acquire_wait_seconds_max": 0.0,
+    "in_use": 0,
+}
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    # Return UUIDs as plain strings, the same shape psycopg2 handed the routers.
+    await conn.set_type_codec(
+        "uuid", encoder=str, decoder=str, schema="pg_catalog", format="text"
     )
+
+
+async def init_pool() -> asyncpg.Pool:
+    """
+    Creates the shared asyncpg pool. Called from the app lifespan; scripts get it lazily.
+    """
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await asyncpg.create_pool(
+                user=os.getenv("POSTGRES_USER"),
+                password=os.getenv("POSTGRES_PASSWORD"),
+                database=os.getenv("POSTGRES_DB"),
+                host=os.getenv("POSTGRES_HOST"),
+                port=int(os.getenv("POSTGRES_PORT", 5432)),
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+                max_inactive_connection_lifetime=POOL_MAX_INACTIVE_LIFETIME,
+                command_timeout=POOL_COMMAND_TIMEOUT,
+                init=_init_connection,
+            )
+            logger.info(f"✅ Postgres pool ready (min={POOL_MIN_SIZE}, max={POOL_MAX_SIZE})")
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+            logger.info("🛑 Postgres pool closed.")
+
+
+@asynccontextmanager
+async def get_db_connection() -> AsyncIterator[asyncpg.Connection]:
+    """
+    Acquires a pooled connection and releases it on exit.
+
+    Usage:
+        async with get_db_connection() as conn:
+            row = await conn.fetchrow("SELECT ... WHERE id = $1", some_id)
+    """
+    pool = _pool or await init_pool()
+
+    started = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _metrics["acquire_timeouts_total"] += 1
+        logger.error(f"❌ Timed out after {POOL_ACQUIRE_TIMEOUT}s waiting for a Postgres connection")
+        raise
+
+    waited = time.perf_counter() - started
+    _metrics["acquired_total"] += 1
+    _metrics["acquire_wait_seconds_total"] += waited
+    _metrics["acquire_wait_seconds_max"] = max(_metrics["acquire_wait_seconds_max"], waited)
+    _metrics["in_use"] += 1
+    try:
+        yield conn
+    finally:
+        _metrics["in_use"] -= 1
+        await pool.release(conn)
+
+
+def pool_metrics() -> dict:
+    """
+    Snapshot of pool size and acquire statistics for the health endpoint.
+    """
+    stats = dict(_metrics)
+    stats["min_size"] = POOL_MIN_SIZE
+    stats["max_size"] = POOL_MAX_SIZE
+    stats["acquire_timeout"] = POOL_ACQUIRE_TIMEOUT
+    if _pool is None:
+        stats.update({"started": False, "size": 0, "idle": 0})
+    else:
+        stats.update({
+            "started": True,
+            "size": _pool.get_size(),
+            "idle": _pool.get_idle_size(),
+        })
+    return stats
@@ -1,8 +1,9 @@
 from fastapi import Depends, HTTPException, Header
 from jose import jwt, JWTError
-from app.core.db import get_db
+from app.core.db import get_async_db
 from app.models.user import User
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 import logging
 
@@ -20,7 +21,7 @@ if not SECRET_KEY:
 # === Auth Dependency
 async def get_current_user(
     authorization: str = Header(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not authorization.startswith("Bearer "):
         logger.warning("⚠️ Missing 'Bearer' in token header.")
@@ -43,7 +44,7 @@ async def get_current_user(
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
     # Fetch user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
 
     if not user:
         logger.warning(f"❌ User not found for ID: {user_id}")
@@ -24,9 +24,23 @@ else:
 
 # === Config ===
 from app.core.config import load_config
+from app.db import init_pool, close_pool, pool_metrics
+from app.core.db import async_engine
+from app.core.db_registry import connect_all, disconnect_all, database_metrics
+from app.ai.llm_gateway import close_clients, gateway_metrics
+from app.utils.http_clients import close_http_clients
+from app.utils.circuit_breaker import breaker_status
+from app.utils.single_flight import single_flight
+from app.utils.rate_limiter import limiter_metrics
+from app.ai.response_cache import response_cache
+from app.ai.semantic_cache import semantic_cache
+from app.services.blueprint_service import blueprint_cache_metrics
+from app.services.template_registry import template_registry
+from app.ai.role_router import get_role_router
+from app.ai.role_classifier import get_role_classifier, ROLE_CLASSIFIER_ENABLED
 
 # === Routers ===
-from app.api.v1 import auth, ideas, idea_chat
+from app.api.v1 import auth, ideas, idea_chat, idea_team
 from app.routes import (
     waitlist,
     ai_agents,
@@ -50,13 +64,24 @@ from app.routes.crm import crm_leads, crm_tasks, crm_notes
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
+        await init_pool()
+        await connect_all()
         await load_config()
-        logger.info("✅ Startup complete: config loaded.")
+        await template_registry.preload()
+        get_role_router()  # build the role catalog and matcher once, up front
+        if ROLE_CLASSIFIER_ENABLED:
+            await get_role_classifier()
+        logger.info("✅ Startup complete: DB pools started, config loaded.")
         yield
     except Exception as e:
         logger.exception("❌ Startup failed.")
         raise e
     finally:
+        await close_pool()
+        await disconnect_all()
+        await async_engine.dispose()
+        await close_clients()
+        await close_http_clients()
         logger.info("🛑 Shutdown complete.")
 
 # === Initialize App ===
@@ -93,11 +118,33 @@ app.add_middleware(
 async def ping():
     return {"status": "ok", "message": "FounderHub API is live"}
 
+@app.get("/ping/db")
+async def ping_db():
+    return {
+        "status": "ok",
+        "pool": pool_metrics(),
+        "databases": database_metrics(),
+        "llm": gateway_metrics()
+    }
+
+@app.get("/ping/upstreams")
+async def ping_upstreams():
+    return {
+        "status": "ok",
+        "circuits": breaker_status(),
+        "single_flight": single_flight.metrics(),
+        "limiter": limiter_metrics(),
+        "response_cache": response_cache.metrics(),
+        "semantic_cache": semantic_cache.metrics(),
+        "blueprint_cache": blueprint_cache_metrics()
+    }
+
 # === Mount API Routes ===
 # Core
 app.include_router(auth.router, prefix="/api")
 app.include_router(ideas.router, prefix="/api")
 app.include_router(idea_chat.router, prefix="/api")
+app.include_router(idea_team.router, prefix="/api")
 
 # CRM
 app.include_router(crm_leads.router, prefix="/api")
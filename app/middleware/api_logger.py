@@ -5,15 +5,11 @@ from datetime import datetime
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
-from databases import Database
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set!")
-database = Database(DATABASE_URL)
+from app.core.db_registry import get_database
+
+# API logs go through the small "logging" pool so they never starve request handlers.
+database = get_database("logging")
 
 class APILoggerMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
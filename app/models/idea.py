@@ -1,5 +1,5 @@
 from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from datetime import datetime
 from uuid import uuid4
 from app.core.db import Base
@@ -20,6 +20,7 @@ class Idea(Base):
     vetting_status = Column(String(50), default="pending")
     vetting_response = Column(Text, nullable=True)
     tokens_used = Column(Integer, default=0)
+    vetting_panel = Column(JSONB, nullable=True)  # per-role status of a panel analysis
 
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Text, Integer, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from app.core.db import Base
+
+class IdeaRollingSummary(Base):
+    """
+    Running summary of an idea's chat log. Messages up to the high-water mark
+    (last_message_at, last_message_id) are folded in; later ones are still raw.
+    """
+    __tablename__ = "idea_rolling_summaries"
+
+    idea_id = Column(UUID(as_uuid=True), primary_key=True)
+    summary = Column(Text, nullable=False, default="")
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    last_message_id = Column(Text, nullable=True)
+    messages_folded = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
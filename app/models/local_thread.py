@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, Text, Integer, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+
+from app.core.db import Base
+
+class LocalThread(Base):
+    """
+    Conversation kept in Postgres instead of an OpenAI thread (CONVERSATION_BACKEND=local).
+    Turns up to the high-water mark are folded into `summary`; later ones are sent raw.
+    """
+    __tablename__ = "local_threads"
+
+    id = Column(Text, primary_key=True)  # "local_<hex>", stored as project_threads.thread_id
+    project_id = Column(UUID(as_uuid=True), nullable=False)
+    role = Column(Text, nullable=False)
+    tenant_id = Column(UUID(as_uuid=True), nullable=False)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    summary = Column(Text, nullable=False, default="")
+    summarized_until = Column(DateTime(timezone=True), nullable=True)
+    summarized_turn_id = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class LocalThreadTurn(Base):
+    __tablename__ = "local_thread_turns"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    thread_id = Column(Text, nullable=False, index=True)
+    speaker = Column(String(16), nullable=False)  # "user" or "assistant"
+    content = Column(Text, nullable=False)
+    tokens = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
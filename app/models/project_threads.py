@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, func
+from sqlalchemy import Column, String, Text, DateTime, UniqueConstraint, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
@@ -19,6 +19,7 @@ class ProjectThread(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     __table_args__ = (
-        # Enforce one thread per project + role
+        # Enforce one thread per project + role + user (ON CONFLICT target in assistant_service)
+        UniqueConstraint("project_id", "role", "user_id", name="project_threads_project_role_user_key"),
         dict(sqlite_autoincrement=True),
     )
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Text, DateTime
+from datetime import datetime
+from app.core.db import Base
+
+class RoleAssistant(Base):
+    """
+    Pooled OpenAI assistant shared by every project for one role template version.
+    Project context is passed per run (additional_instructions); only threads are per project.
+    """
+    __tablename__ = "role_assistants"
+
+    role = Column(Text, primary_key=True)
+    template_version = Column(String(64), primary_key=True)  # sparring template hash, or "default"
+    assistant_id = Column(Text, nullable=False)
+    model = Column(String(64), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
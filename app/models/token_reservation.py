@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, Integer, Date, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from uuid import uuid4
+from app.core.db import Base
+
+class TokenReservation(Base):
+    """
+    Budget held against a user's monthly counter while an LLM call is in flight.
+    Deleted on commit or release; rows left behind by a crashed worker expire.
+    """
+    __tablename__ = "token_reservations"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    user_id = Column(String(36), nullable=False)
+    period = Column(Date, nullable=False)
+    tokens = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
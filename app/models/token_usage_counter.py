@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, BigInteger, Date, DateTime
+from datetime import datetime
+from app.core.db import Base
+
+class TokenUsageCounter(Base):
+    """
+    Rolling monthly totals over `token_usage`, one row per user and per tenant.
+    Incremented alongside every ledger insert; rebuilt by the reconciliation job.
+    """
+    __tablename__ = "token_usage_counters"
+
+    scope = Column(String(16), primary_key=True)      # "user" or "tenant"
+    scope_id = Column(String(36), primary_key=True)
+    period = Column(Date, primary_key=True)           # first day of the billing month (UTC)
+    tokens_used = Column(BigInteger, nullable=False, default=0, server_default="0")
+    reserved_tokens = Column(BigInteger, nullable=False, default=0, server_default="0")  # held by in-flight LLM calls
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
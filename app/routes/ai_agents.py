@@ -1,14 +1,17 @@
 import os
 import uuid
 import logging
-import jwt
-import httpx
-import psycopg2
-from datetime import datetime, timedelta
+from datetime import datetime
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from tenacity import retry, stop_after_attempt, wait_exponential
+
+from app.db import get_db_connection
+from app.ai.llm_gateway import complete
+from app.utils.http_clients import get_http_client, bearer_headers
+from app.utils.circuit_breaker import get_breaker
+from app.utils.rate_limiter import llm_slot, LimiterRejected
+from app.services.blueprint_service import forget_blueprint
 
 # Load environment variables
 load_dotenv()
@@ -22,43 +25,25 @@ if not all([GPU_API_URL, GPU_API_SECRET, OPENAI_API_KEY]):
     raise RuntimeError("Missing required environment variables")
 
 # === DB ===
-def get_db_connection():
-    return psycopg2.connect(
-        dbname=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        host=os.getenv("POSTGRES_HOST"),
-        port=os.getenv("POSTGRES_PORT", 5432)
-    )
-
-def store_blueprint(tenant_id: str, project_id: str, role: str, blueprint: str):
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO business_blueprints (id, tenant_id, project_id, role, blueprint, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (
-                str(uuid.uuid4()), tenant_id, project_id, role, blueprint, datetime.utcnow()
-            ))
-        conn.commit()
-    finally:
-        conn.close()
-
-def log_token_usage(user_id: str, tenant_id: str, tokens: int, source: str):
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO usage_log (id, user_id, tenant_id, tokens_used, source, endpoint, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                str(uuid.uuid4()), user_id, tenant_id, tokens, source,
-                "/ai-agents/build-business", datetime.utcnow()
-            ))
-        conn.commit()
-    finally:
-        conn.close()
+async def store_blueprint(tenant_id: str, project_id: str, role: str, blueprint: str):
+    async with get_db_connection() as conn:
+        await conn.execute("""
+            INSERT INTO business_blueprints (id, tenant_id, project_id, role, blueprint, created_at)
+            VALUES ($1, $2, $3, $4, $5, $6)
+        """,
+            str(uuid.uuid4()), tenant_id, project_id, role, blueprint, datetime.utcnow()
+        )
+    forget_blueprint(tenant_id, project_id)
+
+async def log_token_usage(user_id: str, tenant_id: str, tokens: int, source: str):
+    async with get_db_connection() as conn:
+        await conn.execute("""
+            INSERT INTO usage_log (id, user_id, tenant_id, tokens_used, source, endpoint, created_at)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+        """,
+            str(uuid.uuid4()), user_id, tenant_id, tokens, source,
+            "/ai-agents/build-business", datetime.utcnow()
+        )
 
 # === MODELS ===
 class BlueprintRequest(BaseModel):
@@ -103,65 +88,36 @@ def build_prompt(role: str) -> str:
         return f"You are a strategic executive in the role of {role}. Build a full plan step-by-step."
 
 # === MAIN AI GENERATOR ===
-@retry(stop=stop_after_attempt(2), wait=wait_exponential())
 async def generate_blueprint(prompt: str, role: str, tenant_id: str, user_id: str) -> str:
     # === Try GPU
     try:
-        token = jwt.encode({
-            "sub": user_id,
-            "scope": "founderhub",
-            "iat": datetime.utcnow(),
-            "exp": datetime.utcnow() + timedelta(hours=12)
-        }, GPU_API_SECRET, algorithm="HS256")
-
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-
         model = "llama3:8b" if role != "codegamma" else "codegemma:latest"
 
-        async with httpx.AsyncClient() as client:
-            res = await client.post(
+        async with get_breaker("gpu").guard(slot=llm_slot("gpu", tenant_id, tokens=len(prompt) // 4)):
+            res = await get_http_client("gpu").post(
                 GPU_API_URL,
-                headers=headers,
+                headers=bearer_headers(GPU_API_SECRET, user_id),
                 json={"model": model, "prompt": prompt, "stream": False},
                 timeout=20
             )
             res.raise_for_status()
             content = res.json().get("response", "").strip()
-            tokens = int(len(content.split()) / 0.75)
-            log_token_usage(user_id, tenant_id, tokens, "gpu")
-            return content
+        tokens = int(len(content.split()) / 0.75)
+        await log_token_usage(user_id, tenant_id, tokens, "gpu")
+        return content
 
     except Exception as gpu_error:
         logging.warning("GPU fallback triggered: %s", gpu_error)
 
     # === OpenAI fallback
     try:
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        response = await complete(prompt, model="gpt-4", temperature=0.8, max_tokens=1000, tenant_id=tenant_id)
+        tokens = response.total_tokens or int(len(response.content.split()) / 0.75)
+        await log_token_usage(user_id, tenant_id, tokens, "openai")
+        return response.content
 
-        async with httpx.AsyncClient() as client:
-            res = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json={
-                    "model": "gpt-4",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.8,
-                    "max_tokens": 1000
-                },
-                timeout=40
-            )
-            res.raise_for_status()
-            data = res.json()
-            content = data["choices"][0]["message"]["content"].strip()
-            tokens = data.get("usage", {}).get("total_tokens", int(len(content.split()) / 0.75))
-            log_token_usage(user_id, tenant_id, tokens, "openai")
-            return content
+    except LimiterRejected:
+        raise
 
     except Exception as openai_error:
         logging.error("OpenAI Fallback failed: %s", openai_error)
@@ -178,12 +134,14 @@ async def build_business_blueprint(request: BlueprintRequest):
             tenant_id=request.tenant_id,
             user_id="founderhub"
         )
-        store_blueprint(request.tenant_id, request.project_id, request.role, blueprint)
+        await store_blueprint(request.tenant_id, request.project_id, request.role, blueprint)
         return {
             "tenant_id": request.tenant_id,
             "project_id": request.project_id,
             "role": request.role,
             "blueprint": blueprint
         }
+    except LimiterRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
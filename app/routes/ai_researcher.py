@@ -1,14 +1,18 @@
 import os
 import uuid
-import jwt
-import httpx
 import logging
-import psycopg2
-from datetime import datetime, timedelta
+from datetime import datetime
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from tenacity import retry, stop_after_attempt, wait_exponential
+
+from app.db import get_db_connection
+from app.ai.llm_gateway import complete
+from app.ai.response_cache import response_cache, cache_key, RESPONSE_CACHE_ENABLED
+from app.ai.semantic_cache import semantic_cache, SEMANTIC_CACHE_ENABLED
+from app.utils.http_clients import get_http_client, bearer_headers
+from app.utils.circuit_breaker import get_breaker
+from app.utils.rate_limiter import llm_slot, LimiterRejected
 
 load_dotenv()
 router = APIRouter()
@@ -22,43 +26,24 @@ if not all([OLLAMA_API_URL, OLLAMA_API_SECRET, OPENAI_API_KEY]):
     raise RuntimeError("Missing environment variables")
 
 # === DB Setup
-def get_db_connection():
-    return psycopg2.connect(
-        dbname=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        host=os.getenv("POSTGRES_HOST"),
-        port=os.getenv("POSTGRES_PORT", 5432)
-    )
+async def store_research_output(tenant_id, project_id, query, rtype, output):
+    async with get_db_connection() as conn:
+        await conn.execute("""
+            INSERT INTO research_outputs (
+                id, tenant_id, project_id, research_query, research_type, research_output, created_at
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7)
+        """,
+            str(uuid.uuid4()), tenant_id, project_id, query, rtype, output, datetime.utcnow()
+        )
 
-def store_research_output(tenant_id, project_id, query, rtype, output):
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO research_outputs (
-                    id, tenant_id, project_id, research_query, research_type, research_output, created_at
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                str(uuid.uuid4()), tenant_id, project_id, query, rtype, output, datetime.utcnow()
-            ))
-        conn.commit()
-    finally:
-        conn.close()
-
-def log_token_usage(user_id, tenant_id, tokens, source):
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO usage_log (id, user_id, tenant_id, tokens_used, source, endpoint, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                str(uuid.uuid4()), user_id, tenant_id, tokens, source, "/ai-agents/ai-research-extended", datetime.utcnow()
-            ))
-        conn.commit()
-    finally:
-        conn.close()
+async def log_token_usage(user_id, tenant_id, tokens, source):
+    async with get_db_connection() as conn:
+        await conn.execute("""
+            INSERT INTO usage_log (id, user_id, tenant_id, tokens_used, source, endpoint, created_at)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+        """,
+            str(uuid.uuid4()), user_id, tenant_id, tokens, source, "/ai-agents/ai-research-extended", datetime.utcnow()
+        )
 
 # === Pydantic
 class ResearchRequest(BaseModel):
@@ -67,6 +52,7 @@ class ResearchRequest(BaseModel):
     research_query: str
     research_internet: bool = False
     research_type: str = "general"
+    skip_cache: bool = False
 
 # === Prompt Builder
 def build_research_prompt(query: str, use_web: bool, rtype: str) -> str:
@@ -92,63 +78,45 @@ def build_research_prompt(query: str, use_web: bool, rtype: str) -> str:
     return prompt
 
 # === AI Generator (GPU + fallback)
-@retry(stop=stop_after_attempt(2), wait=wait_exponential())
-async def generate_research_output(prompt, tenant_id, user_id) -> str:
+async def generate_research_output(prompt, tenant_id, user_id, use_cache: bool = True) -> str:
+    # === Cached answer for the same prompt (either source); no tokens are logged
+    key = cache_key("ollama|gpt-4", 0.7, [{"role": "user", "content": prompt}])
+    if use_cache and RESPONSE_CACHE_ENABLED:
+        cached = response_cache.get(tenant_id, key)
+        if cached is not None:
+            return cached
+
     # === Try GPU
     try:
-        token = jwt.encode({
-            "sub": user_id,
-            "scope": "founderhub",
-            "iat": datetime.utcnow(),
-            "exp": datetime.utcnow() + timedelta(hours=12)
-        }, OLLAMA_API_SECRET, algorithm="HS256")
-
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-
-        async with httpx.AsyncClient() as client:
-            res = await client.post(
+        async with get_breaker("ollama").guard(slot=llm_slot("ollama", tenant_id, tokens=len(prompt) // 4)):
+            res = await get_http_client("ollama").post(
                 OLLAMA_API_URL,
-                headers=headers,
+                headers=bearer_headers(OLLAMA_API_SECRET, user_id),
                 json={"role": "ai researcher", "prompt": prompt},
                 timeout=20
             )
             res.raise_for_status()
             content = res.json().get("response", "").strip()
-            tokens = int(len(content.split()) / 0.75)
-            log_token_usage(user_id, tenant_id, tokens, "gpu")
-            return content
+        tokens = int(len(content.split()) / 0.75)
+        await log_token_usage(user_id, tenant_id, tokens, "gpu")
+        if content:
+            response_cache.put(tenant_id, key, content)
+        return content
 
     except Exception as gpu_error:
         logging.warning("GPU failed: %s", gpu_error)
 
     # === Fallback to OpenAI
     try:
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        response = await complete(prompt, model="gpt-4", temperature=0.7, max_tokens=1500, tenant_id=tenant_id)
+        tokens = response.total_tokens or int(len(response.content.split()) / 0.75)
+        await log_token_usage(user_id, tenant_id, tokens, "openai")
+        if response.content:
+            response_cache.put(tenant_id, key, response.content)
+        return response.content
 
-        async with httpx.AsyncClient() as client:
-            res = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json={
-                    "model": "gpt-4",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,
-                    "max_tokens": 1500
-                },
-                timeout=40
-            )
-            res.raise_for_status()
-            data = res.json()
-            content = data["choices"][0]["message"]["content"].strip()
-            tokens = data.get("usage", {}).get("total_tokens", int(len(content.split()) / 0.75))
-            log_token_usage(user_id, tenant_id, tokens, "openai")
-            return content
+    except LimiterRejected:
+        raise
 
     except Exception as openai_error:
         logging.error("OpenAI Fallback failed: %s", openai_error)
@@ -158,13 +126,23 @@ async def generate_research_output(prompt, tenant_id, user_id) -> str:
 @router.post("/ai-agents/ai-research-extended")
 async def generate_research(request: ResearchRequest):
     prompt = build_research_prompt(request.research_query, request.research_internet, request.research_type)
+    # Near-duplicate queries of the same kind, for the same project, reuse an earlier answer
+    namespace = f"research:{request.project_id}:{request.research_type.lower()}:{request.research_internet}"
+    use_semantic = SEMANTIC_CACHE_ENABLED and not request.skip_cache
     try:
-        output = await generate_research_output(
-            prompt,
-            tenant_id=request.tenant_id,
-            user_id="founderhub"
-        )
-        store_research_output(request.tenant_id, request.project_id, request.research_query, request.research_type, output)
+        output = None
+        if use_semantic:
+            output = await semantic_cache.get(request.tenant_id, namespace, request.research_query)
+        if output is None:
+            output = await generate_research_output(
+                prompt,
+                tenant_id=request.tenant_id,
+                user_id="founderhub",
+                use_cache=not request.skip_cache
+            )
+            if use_semantic and output:
+                await semantic_cache.put(request.tenant_id, namespace, request.research_query, output)
+        await store_research_output(request.tenant_id, request.project_id, request.research_query, request.research_type, output)
         return {
             "tenant_id": request.tenant_id,
             "project_id": request.project_id,
@@ -173,5 +151,7 @@ async def generate_research(request: ResearchRequest):
             "research_internet": request.research_internet,
             "research_output": output
         }
+    except LimiterRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
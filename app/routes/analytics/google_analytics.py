@@ -1,6 +1,6 @@
 import os
 import json
-import psycopg2
+import asyncio
 from cryptography.fernet import Fernet
 from google.oauth2 import service_account
 from google.analytics.data_v1beta import BetaAnalyticsDataClient
@@ -12,27 +12,20 @@ from google.analytics.data_v1beta.types import (
 )
 from dotenv import load_dotenv
 
+from app.db import get_db_connection
+
 # Load environment variables (ideally once in your main entry point)
 load_dotenv()
 
-def get_db_connection():
-    return psycopg2.connect(
-        dbname=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        host=os.getenv("POSTGRES_HOST"),
-        port=os.getenv("POSTGRES_PORT", 5432)
-    )
-
 def decrypt(encrypted_text: str) -> str:
     key = os.getenv("ENCRYPTION_KEY")
     fernet = Fernet(key.encode())
     return fernet.decrypt(encrypted_text.encode()).decode()
 
 class GoogleAnalyticsFetcher:
-    def __init__(self, site_id: str):
+    def __init__(self, site_id: str, site_details: dict):
         self.site_id = site_id
-        self.site_details = self._load_site_details()
+        self.site_details = site_details
         self.property_id = self.site_details["ga4_property_id"]
         self.tenant_id = self.site_details["tenant_id"]
         # Credentials are stored encrypted in the DB; decrypt and load them.
@@ -40,26 +33,30 @@ class GoogleAnalyticsFetcher:
         self.credentials = json.loads(credentials_json)
         self.client = self._create_client()
 
-    def _load_site_details(self) -> dict:
+    @classmethod
+    async def create(cls, site_id: str) -> "GoogleAnalyticsFetcher":
+        """Build a fetcher for the given site ID, loading its details from the database."""
+        return cls(site_id, await cls._load_site_details(site_id))
+
+    @staticmethod
+    async def _load_site_details(site_id: str) -> dict:
         """Load GA site details from the database using the site ID."""
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT tenant_id, ga4_property_id, ga4_credentials_json 
-                    FROM ga_sites 
-                    WHERE id = %s
-                    """,
-                    (self.site_id,)
-                )
-                row = cur.fetchone()
-                if not row:
-                    raise Exception(f"Site ID not found: {self.site_id}")
-                return {
-                    "tenant_id": row[0],
-                    "ga4_property_id": row[1],
-                    "ga4_credentials_json": row[2]
-                }
+        async with get_db_connection() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT tenant_id, ga4_property_id, ga4_credentials_json 
+                FROM ga_sites 
+                WHERE id = $1
+                """,
+                site_id
+            )
+        if not row:
+            raise Exception(f"Site ID not found: {site_id}")
+        return {
+            "tenant_id": row[0],
+            "ga4_property_id": row[1],
+            "ga4_credentials_json": row[2]
+        }
 
     def _create_client(self) -> BetaAnalyticsDataClient:
         """Create a GA Data API client using credentials from the database."""
@@ -120,48 +117,49 @@ class GoogleAnalyticsFetcher:
             kpi_data.append(data)
         return kpi_data
 
-    def save_kpis_to_db(self) -> None:
+    async def save_kpis_to_db(self) -> None:
         """
         Saves all fetched KPI details into the SQL table.
         Ensure that your 'ga_metrics' table includes columns for every detail below.
         """
-        metrics = self.fetch_kpis()
+        # The GA Data API client is synchronous; keep it off the event loop.
+        metrics = await asyncio.to_thread(self.fetch_kpis)
 
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                for row in metrics:
-                    cur.execute(
-                        """
-                        INSERT INTO ga_metrics (
-                            site_id, tenant_id, property_id, report_date,
-                            session_source, session_medium, session_campaign, country,
-                            device_category, browser, landing_page,
-                            bounce_rate, conversion_rate, avg_session_duration,
-                            pages_per_session, sessions, users, new_users, engagement_rate,
-                            event_count
-                        ) VALUES (%s, %s, %s, CURRENT_DATE, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        (
-                            self.site_id,
-                            self.tenant_id,
-                            self.property_id,
-                            row["sessionSource"],
-                            row["sessionMedium"],
-                            row["sessionCampaign"],
-                            row["country"],
-                            row["deviceCategory"],
-                            row["browser"],
-                            row["landingPage"],
-                            row["bounceRate"],
-                            row["conversionRate"],
-                            row["avgSessionDuration"],
-                            row["pagesPerSession"],
-                            row["sessions"],
-                            row["users"],
-                            row["newUsers"],
-                            row["engagementRate"],
-                            row["eventCount"]
-                        )
+        async with get_db_connection() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO ga_metrics (
+                    site_id, tenant_id, property_id, report_date,
+                    session_source, session_medium, session_campaign, country,
+                    device_category, browser, landing_page,
+                    bounce_rate, conversion_rate, avg_session_duration,
+                    pages_per_session, sessions, users, new_users, engagement_rate,
+                    event_count
+                ) VALUES ($1, $2, $3, CURRENT_DATE, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19)
+                """,
+                [
+                    (
+                        self.site_id,
+                        self.tenant_id,
+                        self.property_id,
+                        row["sessionSource"],
+                        row["sessionMedium"],
+                        row["sessionCampaign"],
+                        row["country"],
+                        row["deviceCategory"],
+                        row["browser"],
+                        row["landingPage"],
+                        row["bounceRate"],
+                        row["conversionRate"],
+                        row["avgSessionDuration"],
+                        row["pagesPerSession"],
+                        row["sessions"],
+                        row["users"],
+                        row["newUsers"],
+                        row["engagementRate"],
+                        row["eventCount"]
                     )
-            conn.commit()
+                    for row in metrics
+                ]
+            )
         print(f"✅ GA metrics saved for site {self.site_id}")
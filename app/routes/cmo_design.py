@@ -1,16 +1,18 @@
 import os
 import uuid
-import jwt
 import httpx
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from databases import Database
+from app.core.db_registry import get_database
+from app.ai.llm_gateway import complete
+from app.utils.http_clients import get_http_client, bearer_headers
+from app.utils.circuit_breaker import get_breaker
+from app.utils.rate_limiter import llm_slot, LimiterRejected
 from dotenv import load_dotenv
 from typing import Optional, List
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 # === Load ENV ===
 load_dotenv()
@@ -30,7 +32,7 @@ if missing:
     raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
 
 # === Setup ===
-database = Database(DATABASE_URL)
+database = get_database()
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
@@ -101,53 +103,31 @@ async def store_design_output(*args, **kwargs):
     return str(uuid.uuid4())
 
 # === Generator (GPU + OpenAI)
-@retry(stop=stop_after_attempt(2), wait=wait_exponential())
 async def generate_design_brief(request: DesignRequest, user_id: str) -> str:
     prompt = build_design_prompt(request)
 
     # GPU call
     try:
-        jwt_token = jwt.encode({
-            "sub": user_id,
-            "scope": "founderhub",
-            "iat": datetime.utcnow(),
-            "exp": datetime.utcnow() + timedelta(hours=12)
-        }, GPU_API_SECRET, algorithm="HS256")
-
-        headers = {"Authorization": f"Bearer {jwt_token}"}
-
-        async with httpx.AsyncClient() as client:
-            res = await client.post(GPU_API_URL, headers=headers, json={
+        async with get_breaker("gpu").guard(slot=llm_slot("gpu", request.tenant_id, tokens=len(prompt) // 4)):
+            res = await get_http_client("gpu").post(GPU_API_URL, headers=bearer_headers(GPU_API_SECRET, user_id), json={
                 "role": "cmo", "prompt": prompt, "stream": False
             }, timeout=30)
             res.raise_for_status()
             content = res.json().get("response", "").strip()
-            tokens = len(content.split()) // 0.75
-            await log_token_usage(user_id, request.tenant_id, int(tokens), "gpu")
-            return content
+        tokens = len(content.split()) // 0.75
+        await log_token_usage(user_id, request.tenant_id, int(tokens), "gpu")
+        return content
     except Exception as e:
         logger.warning("GPU fallback: %s", e)
 
     # OpenAI fallback
     try:
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        async with httpx.AsyncClient() as client:
-            res = await client.post("https://api.openai.com/v1/chat/completions", headers=headers, json={
-                "model": "gpt-4",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.8,
-                "max_tokens": 1500
-            }, timeout=40)
-            res.raise_for_status()
-            data = res.json()
-            content = data["choices"][0]["message"]["content"].strip()
-            tokens = data.get("usage", {}).get("total_tokens", len(content.split()) // 0.75)
-            await log_token_usage(user_id, request.tenant_id, int(tokens), "openai")
-            return content
+        response = await complete(prompt, model="gpt-4", temperature=0.8, max_tokens=1500, tenant_id=request.tenant_id)
+        tokens = response.total_tokens or len(response.content.split()) // 0.75
+        await log_token_usage(user_id, request.tenant_id, int(tokens), "openai")
+        return response.content
+    except LimiterRejected:
+        raise
     except Exception as e:
         logger.error("OpenAI fallback failed: %s", e)
         raise HTTPException(status_code=500, detail="All generation failed")
@@ -185,25 +165,20 @@ async def stream_design_response(
     user=Depends(get_current_user)
 ):
     prompt = build_design_prompt(request)
-
-    jwt_token = jwt.encode({
-        "sub": user["user_id"],
-        "scope": "founderhub",
-        "exp": datetime.utcnow() + timedelta(hours=12),
-        "iat": datetime.utcnow()
-    }, GPU_API_SECRET, algorithm="HS256")
-
-    headers = {"Authorization": f"Bearer {jwt_token}"}
+    headers = bearer_headers(GPU_API_SECRET, user["user_id"])
 
     async def stream_response():
         try:
-            async with httpx.AsyncClient(timeout=None) as client:
-                async with client.stream("POST", GPU_API_URL, headers=headers, json={
+            # No read timeout: tokens may trickle in slower than any fixed bound.
+            async with llm_slot("gpu", request.tenant_id, tokens=len(prompt) // 4):
+                async with get_http_client("gpu").stream("POST", GPU_API_URL, headers=headers, json={
                     "role": "cmo", "prompt": prompt, "stream": True
-                }) as response:
+                }, timeout=httpx.Timeout(None, connect=5)) as response:
                     async for line in response.aiter_lines():
                         if line.startswith("data: "):
                             yield line.replace("data: ", "") + "\n"
+        except LimiterRejected as e:
+            yield f"[STREAM ERROR]: {e.detail} (retry after {e.headers['Retry-After']}s)\n"
         except Exception as e:
             yield f"[STREAM ERROR]: {str(e)}\n"
 
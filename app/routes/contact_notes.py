@@ -1,14 +1,14 @@
-import os
 import uuid
 import logging
 from datetime import datetime
 from typing import List, Optional
 
-import psycopg2
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from app.db import get_db_connection
+
 # === Load environment variables
 load_dotenv()
 
@@ -19,20 +19,6 @@ logging.basicConfig(level=logging.INFO)
 # === FastAPI router
 router = APIRouter()
 
-# === Database connection
-def get_db_connection():
-    try:
-        return psycopg2.connect(
-            dbname=os.getenv("POSTGRES_DB"),
-            user=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD"),
-            host=os.getenv("POSTGRES_HOST"),
-            port=os.getenv("POSTGRES_PORT", 5432)
-        )
-    except Exception as e:
-        logger.exception("Could not connect to the database")
-        raise HTTPException(status_code=500, detail="Database connection failed")
-
 # === Pydantic Models
 class NoteCreate(BaseModel):
     tenant_id: str
@@ -60,23 +46,21 @@ async def add_contact_note(contact_id: str, note: NoteCreate):
     created_at = datetime.utcnow()
 
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO contact_notes (
-                        id, tenant_id, contact_id, note, created_by, source, channel, created_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    note_id,
-                    note.tenant_id,
-                    contact_id,
-                    note.note,
-                    note.created_by,
-                    note.source,
-                    note.channel,
-                    created_at
-                ))
-            conn.commit()
+        async with get_db_connection() as conn:
+            await conn.execute("""
+                INSERT INTO contact_notes (
+                    id, tenant_id, contact_id, note, created_by, source, channel, created_at
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            """,
+                note_id,
+                note.tenant_id,
+                contact_id,
+                note.note,
+                note.created_by,
+                note.source,
+                note.channel,
+                created_at
+            )
     except Exception as e:
         logger.exception("Failed to insert contact note")
         raise HTTPException(status_code=500, detail="Database error")
@@ -102,28 +86,26 @@ async def get_contact_notes(
     notes = []
 
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id, tenant_id, contact_id, note, created_by, source, channel, created_at
-                    FROM contact_notes
-                    WHERE contact_id = %s AND tenant_id = %s
-                    ORDER BY created_at ASC
-                    LIMIT %s OFFSET %s
-                """, (contact_id, tenant_id, limit, offset))
-
-                rows = cur.fetchall()
-                for row in rows:
-                    notes.append(NoteOut(
-                        id=row[0],
-                        tenant_id=row[1],
-                        contact_id=row[2],
-                        note=row[3],
-                        created_by=row[4],
-                        source=row[5],
-                        channel=row[6],
-                        created_at=row[7],
-                    ))
+        async with get_db_connection() as conn:
+            rows = await conn.fetch("""
+                SELECT id, tenant_id, contact_id, note, created_by, source, channel, created_at
+                FROM contact_notes
+                WHERE contact_id = $1 AND tenant_id = $2
+                ORDER BY created_at ASC
+                LIMIT $3 OFFSET $4
+            """, contact_id, tenant_id, limit, offset)
+
+        for row in rows:
+            notes.append(NoteOut(
+                id=row[0],
+                tenant_id=row[1],
+                contact_id=row[2],
+                note=row[3],
+                created_by=row[4],
+                source=row[5],
+                channel=row[6],
+                created_at=row[7],
+            ))
     except Exception:
         logger.exception("Failed to fetch contact notes")
         raise HTTPException(status_code=500, detail="Database error")
@@ -133,15 +115,13 @@ async def get_contact_notes(
 @router.delete("/contacts/{contact_id}/notes/{note_id}")
 async def delete_contact_note(contact_id: str, note_id: str, tenant_id: str = Query(...)):
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    DELETE FROM contact_notes
-                    WHERE id = %s AND contact_id = %s AND tenant_id = %s
-                """, (note_id, contact_id, tenant_id))
-                if cur.rowcount == 0:
-                    raise HTTPException(status_code=404, detail="Note not found")
-            conn.commit()
+        async with get_db_connection() as conn:
+            status = await conn.execute("""
+                DELETE FROM contact_notes
+                WHERE id = $1 AND contact_id = $2 AND tenant_id = $3
+            """, note_id, contact_id, tenant_id)
+        if status == "DELETE 0":
+            raise HTTPException(status_code=404, detail="Note not found")
     except Exception:
         logger.exception("Failed to delete contact note")
         raise HTTPException(status_code=500, detail="Database error")
@@ -5,12 +5,13 @@ import logging
 from datetime import datetime
 from typing import List, Optional
 
-import psycopg2
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, EmailStr
 
+from app.db import get_db_connection
+
 # === Load .env + encryption setup
 load_dotenv()
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
@@ -25,16 +26,6 @@ logging.basicConfig(level=logging.INFO)
 # === FastAPI router
 router = APIRouter()
 
-# === DB connection
-def get_db_connection():
-    return psycopg2.connect(
-        dbname=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        host=os.getenv("POSTGRES_HOST"),
-        port=os.getenv("POSTGRES_PORT", 5432)
-    )
-
 # === Encryption utils
 def encrypt_value(value: str) -> str:
     return fernet.encrypt(value.encode()).decode()
@@ -82,19 +73,17 @@ async def create_contact(contact: ContactCreate):
     encrypted_phone = encrypt_value(contact.phone)
 
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO contacts (id, tenant_id, user_id, name, role, email, phone, tags, created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    contact_id, contact.tenant_id, contact.user_id,
-                    contact.name, contact.role,
-                    encrypted_email, encrypted_phone,
-                    json.dumps(contact.tags),
-                    now, now
-                ))
-            conn.commit()
+        async with get_db_connection() as conn:
+            await conn.execute("""
+                INSERT INTO contacts (id, tenant_id, user_id, name, role, email, phone, tags, created_at, updated_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+            """,
+                contact_id, contact.tenant_id, contact.user_id,
+                contact.name, contact.role,
+                encrypted_email, encrypted_phone,
+                json.dumps(contact.tags),
+                now, now
+            )
     except Exception as e:
         logger.exception("Failed to create contact")
         raise HTTPException(status_code=500, detail="Database error")
@@ -121,30 +110,28 @@ async def get_contacts(
     contacts = []
 
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id, tenant_id, user_id, name, role, email, phone, tags, created_at, updated_at
-                    FROM contacts
-                    WHERE tenant_id = %s
-                    ORDER BY created_at DESC
-                    LIMIT %s OFFSET %s
-                """, (tenant_id, limit, offset))
-                rows = cur.fetchall()
-
-                for row in rows:
-                    contacts.append(ContactOut(
-                        id=row[0],
-                        tenant_id=row[1],
-                        user_id=row[2],
-                        name=row[3],
-                        role=row[4],
-                        email=decrypt_value(row[5]),
-                        phone=decrypt_value(row[6]),
-                        tags=json.loads(row[7]),
-                        created_at=row[8],
-                        updated_at=row[9],
-                    ))
+        async with get_db_connection() as conn:
+            rows = await conn.fetch("""
+                SELECT id, tenant_id, user_id, name, role, email, phone, tags, created_at, updated_at
+                FROM contacts
+                WHERE tenant_id = $1
+                ORDER BY created_at DESC
+                LIMIT $2 OFFSET $3
+            """, tenant_id, limit, offset)
+
+        for row in rows:
+            contacts.append(ContactOut(
+                id=row[0],
+                tenant_id=row[1],
+                user_id=row[2],
+                name=row[3],
+                role=row[4],
+                email=decrypt_value(row[5]),
+                phone=decrypt_value(row[6]),
+                tags=json.loads(row[7]),
+                created_at=row[8],
+                updated_at=row[9],
+            ))
     except Exception:
         logger.exception("Error fetching contacts")
         raise HTTPException(status_code=500, detail="Database error")
@@ -154,10 +141,8 @@ async def get_contacts(
 @router.get("/contacts/count")
 async def get_contact_count(tenant_id: str = Query(...)):
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT COUNT(*) FROM contacts WHERE tenant_id = %s", (tenant_id,))
-                count = cur.fetchone()[0]
+        async with get_db_connection() as conn:
+            count = await conn.fetchval("SELECT COUNT(*) FROM contacts WHERE tenant_id = $1", tenant_id)
     except Exception:
         logger.exception("Error counting contacts")
         raise HTTPException(status_code=500, detail="Database error")
@@ -167,29 +152,27 @@ async def get_contact_count(tenant_id: str = Query(...)):
 @router.get("/contacts/{contact_id}", response_model=ContactOut)
 async def get_contact_by_id(contact_id: str):
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id, tenant_id, user_id, name, role, email, phone, tags, created_at, updated_at
-                    FROM contacts
-                    WHERE id = %s
-                """, (contact_id,))
-                row = cur.fetchone()
-                if not row:
-                    raise HTTPException(status_code=404, detail="Contact not found")
-
-                return ContactOut(
-                    id=row[0],
-                    tenant_id=row[1],
-                    user_id=row[2],
-                    name=row[3],
-                    role=row[4],
-                    email=decrypt_value(row[5]),
-                    phone=decrypt_value(row[6]),
-                    tags=json.loads(row[7]),
-                    created_at=row[8],
-                    updated_at=row[9],
-                )
+        async with get_db_connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT id, tenant_id, user_id, name, role, email, phone, tags, created_at, updated_at
+                FROM contacts
+                WHERE id = $1
+            """, contact_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Contact not found")
+
+        return ContactOut(
+            id=row[0],
+            tenant_id=row[1],
+            user_id=row[2],
+            name=row[3],
+            role=row[4],
+            email=decrypt_value(row[5]),
+            phone=decrypt_value(row[6]),
+            tags=json.loads(row[7]),
+            created_at=row[8],
+            updated_at=row[9],
+        )
     except Exception:
         logger.exception("Error fetching contact by ID")
         raise HTTPException(status_code=500, detail="Database error")
@@ -199,10 +182,9 @@ async def update_contact(contact_id: str, contact: ContactUpdate):
     now = datetime.utcnow()
 
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT * FROM contacts WHERE id = %s", (contact_id,))
-                row = cur.fetchone()
+        async with get_db_connection() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow("SELECT * FROM contacts WHERE id = $1 FOR UPDATE", contact_id)
                 if not row:
                     raise HTTPException(status_code=404, detail="Contact not found")
 
@@ -212,15 +194,14 @@ async def update_contact(contact_id: str, contact: ContactUpdate):
                 updated_phone = encrypt_value(contact.phone) if contact.phone else row[6]
                 updated_tags = json.dumps(contact.tags) if contact.tags else row[7]
 
-                cur.execute("""
+                await conn.execute("""
                     UPDATE contacts
-                    SET name = %s, role = %s, email = %s, phone = %s, tags = %s, updated_at = %s
-                    WHERE id = %s
-                """, (
+                    SET name = $1, role = $2, email = $3, phone = $4, tags = $5, updated_at = $6
+                    WHERE id = $7
+                """,
                     updated_name, updated_role, updated_email, updated_phone,
                     updated_tags, now, contact_id
-                ))
-            conn.commit()
+                )
     except Exception:
         logger.exception("Failed to update contact")
         raise HTTPException(status_code=500, detail="Database error")
@@ -230,12 +211,10 @@ async def update_contact(contact_id: str, contact: ContactUpdate):
 @router.delete("/contacts/{contact_id}")
 async def delete_contact(contact_id: str):
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("DELETE FROM contacts WHERE id = %s", (contact_id,))
-                if cur.rowcount == 0:
-                    raise HTTPException(status_code=404, detail="Contact not found")
-            conn.commit()
+        async with get_db_connection() as conn:
+            status = await conn.execute("DELETE FROM contacts WHERE id = $1", contact_id)
+        if status == "DELETE 0":
+            raise HTTPException(status_code=404, detail="Contact not found")
     except Exception:
         logger.exception("Failed to delete contact")
         raise HTTPException(status_code=500, detail="Database error")
@@ -5,8 +5,9 @@ from uuid import uuid4, UUID
 from datetime import datetime
 from sqlalchemy import text
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
+from app.core.db import get_db, get_async_db
 from app.dependencies.auth import get_current_user
 
 router = APIRouter()
@@ -59,13 +60,13 @@ async def create_lead(
     lead: LeadCreate,
     request: Request,
     user=Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     lead_id = uuid4()
     created_at = datetime.utcnow()
 
     try:
-        db.execute(
+        await db.execute(
             text("""
                 INSERT INTO crm_leads (
                     id, tenant_id, name, email, company, phone,
@@ -82,7 +83,7 @@ async def create_lead(
                 "created_at": created_at
             }
         )
-        db.commit()
+        await db.commit()
 
         return {
             **lead.dict(),
@@ -92,7 +93,7 @@ async def create_lead(
         }
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print("❌ DB Error:", str(e))
         raise HTTPException(status_code=500, detail="Failed to create lead")
 
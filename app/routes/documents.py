@@ -1,9 +1,9 @@
 import os
 import uuid
+import asyncio
 from datetime import datetime
 from typing import List, Optional
 
-import openai
 import psycopg2
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
@@ -11,10 +11,12 @@ from dotenv import load_dotenv
 
 # Load environment variables (ideally done once in your app's entry point)
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
 # Import your authentication dependency
 from app.dependencies.auth import get_current_user  # adjust as needed
+from app.ai.llm_gateway import chat
+from app.db import get_db_connection as get_async_connection
+from app.utils.rate_limiter import LimiterRejected
 
 router = APIRouter()
 
@@ -265,26 +267,41 @@ async def delete_agent(agent_id: str, user=Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def log_token_usage(user_id: str, tenant_id: str, tokens: int, source: str, endpoint: str):
+    async with get_async_connection() as conn:
+        await conn.execute("""
+            INSERT INTO usage_log (id, user_id, tenant_id, tokens_used, source, endpoint, created_at)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+        """,
+            str(uuid.uuid4()), user_id, tenant_id, tokens, source, endpoint, datetime.utcnow()
+        )
+
 @router.post("/ai-agents/{agent_id}/execute")
 async def execute_agent(agent_id: str, user=Depends(get_current_user)):
     """
     Executes the specified AI agent by sending its system prompt to the OpenAI API,
     returning the generated response. This simulates the agent "acting" to drive business growth.
     """
-    agent_data = get_agent_from_db(agent_id)
+    # psycopg2 is blocking; keep the lookup off the event loop.
+    agent_data = await asyncio.to_thread(get_agent_from_db, agent_id)
     if not agent_data:
         raise HTTPException(status_code=404, detail="Agent not found")
     
     system_prompt = agent_data["system_prompt"]
     # Here you could combine the system prompt with dynamic context if needed.
     try:
-        response = openai.ChatCompletion.create(
+        response = await chat(
+            [{"role": "system", "content": system_prompt}],
             model=agent_data["model"],
-            messages=[{"role": "system", "content": system_prompt}],
             temperature=0.7,
-            max_tokens=800
+            max_tokens=800,
+            tenant_id=user["tenant_id"]
+        )
+        await log_token_usage(
+            user["id"], user["tenant_id"], response.total_tokens, "openai", f"/ai-agents/{agent_id}/execute"
         )
-        result = response.choices[0].message.content.strip()
-        return {"agent_id": agent_id, "response": result}
+        return {"agent_id": agent_id, "response": response.content, "tokens_used": response.total_tokens}
+    except LimiterRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
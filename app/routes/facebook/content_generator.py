@@ -1,30 +1,14 @@
-import os
-import json
-import openai
-import psycopg2
 import uuid
 from datetime import datetime
 from dotenv import load_dotenv
 
+from app.db import get_db_connection
+from app.ai.llm_gateway import complete
+
 # Load environment variables (ideally once in your main entry point)
 load_dotenv()
 
-# Set OpenAI API key
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
-def get_db_connection():
-    """
-    Establishes and returns a connection to the Postgres database.
-    """
-    return psycopg2.connect(
-        dbname=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        host=os.getenv("POSTGRES_HOST"),
-        port=os.getenv("POSTGRES_PORT", 5432)
-    )
-
-def generate_facebook_posts(n: int = 3) -> list[str]:
+async def generate_facebook_posts(n: int = 3) -> list[str]:
     """
     Generates 'n' Facebook post ideas using the OpenAI API.
     Returns a list of post content strings.
@@ -35,59 +19,42 @@ def generate_facebook_posts(n: int = 3) -> list[str]:
         f"Include tips, inspiration, and subtle CTAs. Make each one sound authentic, not too salesy. Use emojis and 2 hashtags max per post."
     )
 
-    response = openai.ChatCompletion.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.8,
-        max_tokens=800
-    )
+    response = await complete(prompt, model="gpt-4o", temperature=0.8, max_tokens=800)
 
     # Split by double newlines to separate posts; adjust as needed.
-    content = response.choices[0].message.content.strip().split("\n\n")
+    content = response.content.split("\n\n")
     return [post.strip() for post in content if post.strip()]
 
-def queue_facebook_posts(posts: list[str]) -> None:
+async def queue_facebook_posts(posts: list[str]) -> None:
     """
     Queues the provided Facebook posts by inserting them into the SQL table 'content_queue'.
     Each post is tagged with a unique UUID and the current UTC timestamp.
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            for post in posts:
-                cur.execute(
-                    """
-                    INSERT INTO content_queue (id, created_at, content)
-                    VALUES (%s, %s, %s)
-                    """,
-                    (str(uuid.uuid4()), datetime.utcnow(), post)
-                )
-        conn.commit()
-        print(f"📦 Queued {len(posts)} post(s) for future scheduling.")
-    finally:
-        conn.close()
+    async with get_db_connection() as conn:
+        await conn.executemany(
+            """
+            INSERT INTO content_queue (id, created_at, content)
+            VALUES ($1, $2, $3)
+            """,
+            [(str(uuid.uuid4()), datetime.utcnow(), post) for post in posts]
+        )
+    print(f"📦 Queued {len(posts)} post(s) for future scheduling.")
 
-def get_next_queued_post() -> str | None:
+async def get_next_queued_post() -> str | None:
     """
     Retrieves and removes the earliest queued post from the SQL table 'content_queue'.
     Returns the content of the post, or None if the queue is empty.
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, content FROM content_queue
+    async with get_db_connection() as conn:
+        return await conn.fetchval(
+            """
+            DELETE FROM content_queue
+            WHERE id = (
+                SELECT id FROM content_queue
                 ORDER BY created_at ASC
                 LIMIT 1
-                """
+                FOR UPDATE SKIP LOCKED
             )
-            row = cur.fetchone()
-            if not row:
-                return None
-            post_id, content = row
-            cur.execute("DELETE FROM content_queue WHERE id = %s", (post_id,))
-            conn.commit()
-            return content
-    finally:
-        conn.close()
+            RETURNING content
+            """
+        )
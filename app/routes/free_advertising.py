@@ -4,12 +4,13 @@ import logging
 from datetime import datetime, date
 from typing import List, Optional, Dict
 
-import openai
 import requests
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
 from pydantic import BaseModel, Field
-from databases import Database
-from tenacity import retry, stop_after_attempt, wait_exponential
+from app.core.db_registry import get_database
+from app.ai.llm_gateway import complete, configure_provider
+from app.utils.rate_limiter import LimiterRejected
+from app.ai.semantic_cache import semantic_cache, SEMANTIC_CACHE_ENABLED
 from dotenv import load_dotenv
 
 # Load environment variables and initialize the async database connection.
@@ -17,7 +18,7 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
-database = Database(DATABASE_URL)
+database = get_database()
 
 # Global configuration dictionary loaded from DB.
 # The system_config table must contain keys: "OPENAI_API_KEY", "SLACK_WEBHOOK_URL"
@@ -34,7 +35,7 @@ async def load_config():
     keys = ["OPENAI_API_KEY", "SLACK_WEBHOOK_URL"]
     for key in keys:
         config[key] = await get_config_value(key)
-    openai.api_key = config["OPENAI_API_KEY"]
+    configure_provider("openai", api_key=config["OPENAI_API_KEY"])
     logging.info("Configuration loaded from DB.")
 
 # Setup logging
@@ -80,6 +81,7 @@ class FreeAdvertisingRequest(BaseModel):
     target_audience: Optional[str] = Field(None, description="Target audience description")
     additional_context: Optional[str] = Field("", description="Additional context or challenges the business faces")
     language: Optional[str] = Field("en", description="Language code (e.g., 'en', 'es', 'fr')")
+    skip_cache: bool = Field(False, description="Always call the model, even for a prompt answered recently")
 
 class FreeAdvertisingResponse(BaseModel):
     id: str
@@ -154,18 +156,24 @@ def build_free_advertising_prompt(request: FreeAdvertisingRequest) -> str:
 # -----------------------------
 # Free Advertising Strategy Generation Function with Retry Logic
 # -----------------------------
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
 async def generate_free_advertising_strategy(request: FreeAdvertisingRequest) -> str:
     prompt = build_free_advertising_prompt(request)
+    # Same business and language: a reworded industry/audience/context can reuse an earlier strategy
+    namespace = f"free_advertising:{request.language}:{request.business_name.strip().lower()}"
+    brief = " ".join(filter(None, [request.industry, request.target_audience, request.additional_context]))
+    use_semantic = SEMANTIC_CACHE_ENABLED and not request.skip_cache and bool(brief)
+    if use_semantic:
+        advice = await semantic_cache.get(request.tenant_id, namespace, brief)
+        if advice is not None:
+            return advice
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.75,
-            max_tokens=1500
-        )
-        advice = response.choices[0].message.content.strip()
+        response = await complete(prompt, model="gpt-4", temperature=0.75, max_tokens=1500, tenant_id=request.tenant_id, cache=not request.skip_cache)
+        advice = response.content
+        if use_semantic and advice and not response.cached:
+            await semantic_cache.put(request.tenant_id, namespace, brief, advice)
         return advice
+    except LimiterRejected:
+        raise
     except Exception as e:
         logger.error("Error generating free advertising strategy: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate strategy: {str(e)}")
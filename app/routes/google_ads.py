@@ -5,10 +5,11 @@ import requests
 from datetime import datetime, date
 from typing import List, Optional, Dict
 
-import openai
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
 from pydantic import BaseModel, Field
-from databases import Database
+from app.core.db_registry import get_database
+from app.ai.llm_gateway import complete, configure_provider
+from app.utils.rate_limiter import LimiterRejected
 from tenacity import retry, stop_after_attempt, wait_exponential
 from dotenv import load_dotenv
 
@@ -17,7 +18,7 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
-database = Database(DATABASE_URL)
+database = get_database()
 
 # Global configuration dictionary loaded from DB (assume this is done on startup).
 # For this module, we expect keys: "OPENAI_API_KEY", "GOOGLE_ADS_API_TOKEN", "SLACK_WEBHOOK_URL"
@@ -34,7 +35,7 @@ async def load_config():
     keys = ["OPENAI_API_KEY", "GOOGLE_ADS_API_TOKEN", "SLACK_WEBHOOK_URL"]
     for key in keys:
         config[key] = await get_config_value(key)
-    openai.api_key = config["OPENAI_API_KEY"]
+    configure_provider("openai", api_key=config["OPENAI_API_KEY"])
     logging.info("Configuration loaded from DB.")
 
 # Setup logging
@@ -84,6 +85,7 @@ class GoogleAdRequest(BaseModel):
     style: Optional[str] = Field("modern", description="Tone and style (energetic, professional, playful, etc.)")
     language: Optional[str] = Field("en", description="Language code (e.g., 'en', 'es', 'fr')")
     extra_instructions: Optional[str] = Field("", description="Extra instructions for the ad copy")
+    skip_cache: bool = Field(False, description="Always call the model, even for a prompt answered recently")
 
 class GoogleAdResponse(BaseModel):
     id: str
@@ -214,18 +216,15 @@ def post_to_google_ads(message: str) -> dict:
 # -----------------------------
 # Ad Copy Generation Function with Retry Logic
 # -----------------------------
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-async def generate_google_ad_content(request: GoogleAdRequest) -> str:
+async def generate_google_ad_content(request: GoogleAdRequest, use_cache: bool = True) -> str:
     prompt = build_google_ad_prompt(request)
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.8,
-            max_tokens=800
-        )
-        ad_copy = response.choices[0].message.content.strip()
+        response = await complete(prompt, model="gpt-4", temperature=0.8, max_tokens=800, tenant_id=request.tenant_id,
+                                  cache=use_cache and not request.skip_cache)
+        ad_copy = response.content
         return ad_copy
+    except LimiterRejected:
+        raise
     except Exception as e:
         logger.error("Error generating Google ad content: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate ad copy: {str(e)}")
@@ -289,7 +288,7 @@ async def update_google_ad(
     """
     Updates an existing Google ad by regenerating ad copy and incrementing the version.
     """
-    new_ad_copy = await generate_google_ad_content(request)
+    new_ad_copy = await generate_google_ad_content(request, use_cache=False)  # a regenerate must not return the same copy
     query = "SELECT version FROM google_ads WHERE id = :id"
     current_ad = await database.fetch_one(query=query, values={"id": ad_id})
     if not current_ad:
@@ -430,7 +429,7 @@ async def optimize_google_ad(
             language="en",
             extra_instructions=""
         )
-        new_ad_copy = await generate_google_ad_content(new_request)
+        new_ad_copy = await generate_google_ad_content(new_request, use_cache=False)
         new_version = current_ad["version"] + 1
         await update_google_ad_in_db(ad_id, new_ad_copy, None, new_version)
         background_tasks.add_task(send_slack_notification, f"Google ad {ad_id} auto-optimized to version {new_version}")
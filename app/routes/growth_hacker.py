@@ -4,12 +4,12 @@ import logging
 from datetime import datetime
 from typing import List, Optional, Dict
 
-import openai
 import requests
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
 from pydantic import BaseModel, Field
-from databases import Database
-from tenacity import retry, stop_after_attempt, wait_exponential
+from app.core.db_registry import get_database
+from app.ai.llm_gateway import complete, configure_provider
+from app.utils.rate_limiter import LimiterRejected
 from dotenv import load_dotenv
 
 # Load environment variables (DATABASE_URL is provided via env)
@@ -17,7 +17,7 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
-database = Database(DATABASE_URL)
+database = get_database()
 
 # Global configuration loaded from DB via system_config table.
 # Expect keys: "OPENAI_API_KEY", "SLACK_WEBHOOK_URL"
@@ -34,7 +34,7 @@ async def load_config():
     keys = ["OPENAI_API_KEY", "SLACK_WEBHOOK_URL"]
     for key in keys:
         config[key] = await get_config_value(key)
-    openai.api_key = config["OPENAI_API_KEY"]
+    configure_provider("openai", api_key=config["OPENAI_API_KEY"])
     logging.info("Configuration loaded from DB.")
 
 # Setup logging
@@ -80,6 +80,7 @@ class GrowthHackRequest(BaseModel):
     target_audience: Optional[str] = Field(None, description="Description of the target audience")
     additional_context: Optional[str] = Field("", description="Additional context or challenges")
     language: Optional[str] = Field("en", description="Language code (e.g., 'en', 'es', 'fr')")
+    skip_cache: bool = Field(False, description="Always call the model, even for a prompt answered recently")
 
 class GrowthHackResponse(BaseModel):
     id: str
@@ -151,18 +152,14 @@ def build_growth_hack_prompt(request: GrowthHackRequest) -> str:
 # -----------------------------
 # Growth Hacker Strategy Generation Function with Retry Logic
 # -----------------------------
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
 async def generate_growth_hack_strategy(request: GrowthHackRequest) -> str:
     prompt = build_growth_hack_prompt(request)
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.75,
-            max_tokens=1500
-        )
-        strategy = response.choices[0].message.content.strip()
+        response = await complete(prompt, model="gpt-4", temperature=0.75, max_tokens=1500, tenant_id=request.tenant_id, cache=not request.skip_cache)
+        strategy = response.content
         return strategy
+    except LimiterRejected:
+        raise
     except Exception as e:
         logger.error("Error generating growth hack strategy: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate strategy: {str(e)}")
@@ -1,12 +1,16 @@
-import os, uuid, logging, requests, httpx, jwt
-from datetime import datetime, timedelta
+import os, uuid, logging, requests
+from datetime import datetime
 from typing import List, Optional, Dict
 
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
 from pydantic import BaseModel, Field
-from databases import Database
+from app.core.db_registry import get_database
+from app.ai.llm_gateway import complete
+from app.utils.http_clients import get_http_client, bearer_headers
+from app.utils.circuit_breaker import get_breaker
+from app.utils.rate_limiter import llm_slot, LimiterRejected
+from app.utils.hedging import Arm, hedge, hedge_delay
 from dotenv import load_dotenv
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 load_dotenv()
 
@@ -15,7 +19,7 @@ GPU_API_URL = os.getenv("GPU_API_URL")
 GPU_API_SECRET = os.getenv("GPU_API_SECRET")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-database = Database(DATABASE_URL)
+database = get_database()
 config: Dict[str, str] = {}
 
 if not all([DATABASE_URL, GPU_API_URL, GPU_API_SECRET, OPENAI_API_KEY]):
@@ -118,67 +122,41 @@ async def log_token_usage(user_id: str, tenant_id: str, tokens: int, source: str
 #  GENERATE POST
 # =========================
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential())
 async def generate_post(request: LinkedInPostRequest, user: dict) -> str:
     prompt = build_prompt(request)
-    token = jwt.encode({
-        "sub": user["user_id"],
-        "scope": "founderhub",
-        "exp": datetime.utcnow() + timedelta(hours=12),
-        "iat": datetime.utcnow()
-    }, GPU_API_SECRET, algorithm="HS256")
-
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
 
-    try:
-        async with httpx.AsyncClient() as client:
-            res = await client.post(
+    async def call_gpu():
+        async with get_breaker("gpu").guard(slot=llm_slot("gpu", request.tenant_id, tokens=len(prompt) // 4)):
+            res = await get_http_client("gpu").post(
                 GPU_API_URL,
-                headers=headers,
+                headers=bearer_headers(GPU_API_SECRET, user["user_id"]),
                 json={"role": "cmo", "prompt": prompt},
                 timeout=20
             )
             res.raise_for_status()
             content = res.json().get("response", "").strip()
-            token_estimate = len(content.split()) // 0.75  # rough token count
-            await log_token_usage(user["user_id"], request.tenant_id, int(token_estimate), "gpu")
-            return content
+        return content, int(len(content.split()) // 0.75)  # rough token count
+
+    async def call_openai():
+        response = await complete(prompt, model="gpt-4", temperature=0.8, max_tokens=800, timeout=30, tenant_id=request.tenant_id)
+        return response.content, int(response.total_tokens or len(response.content.split()) // 0.75)
 
-    except Exception as gpu_error:
-        logger.warning("GPU failed: %s", gpu_error)
+    async def log_usage(tokens: int, source: str):
+        await log_token_usage(user["user_id"], request.tenant_id, int(tokens), source)
 
-    # Fallback to OpenAI
+    # GPU first; OpenAI on failure, or raced against it once GPU passes its p95 (HEDGE_ENABLED)
     try:
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        async with httpx.AsyncClient() as client:
-            res = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json={
-                    "model": "gpt-4",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.8,
-                    "max_tokens": 800
-                },
-                timeout=30
-            )
-            res.raise_for_status()
-            data = res.json()
-            content = data["choices"][0]["message"]["content"].strip()
-            usage = data.get("usage", {})
-            tokens = usage.get("total_tokens", len(content.split()) // 0.75)
-            await log_token_usage(user["user_id"], request.tenant_id, int(tokens), "openai")
-            return content
-
-    except Exception as fallback_error:
-        logger.error("OpenAI Fallback failed: %s", fallback_error)
+        return await hedge(
+            Arm("gpu", call_gpu),
+            Arm("openai", call_openai),
+            delay=hedge_delay("gpu"),
+            log_usage=log_usage,
+            prompt_tokens=len(prompt) // 4
+        )
+    except LimiterRejected:
+        raise
+    except Exception as generation_error:
+        logger.error("AI generation failed: %s", generation_error)
         raise HTTPException(status_code=500, detail="AI generation failed")
 
 # =========================
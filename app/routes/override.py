@@ -1,18 +1,13 @@
-import os
 import uuid
 from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from databases import Database
-from dotenv import load_dotenv
 
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set!")
-database = Database(DATABASE_URL)
+from app.core.db_registry import get_database
+
+database = get_database()
 
 router = APIRouter(prefix="/api/override", tags=["Override"])
 
@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID, uuid4
 from sqlalchemy import text
-from fastapi.responses import FileResponse
-from app.core.db import get_db
+from fastapi.responses import FileResponse, StreamingResponse
+from app.core.db import get_db, get_async_db
 from app.dependencies.auth import get_current_user
 from app.documents.document_template import build_project_document
-from app.utils.llm_client import run_gpt_task
+from app.services.business_plan import (
+    PLAN_SECTIONS, stream_business_plan, regenerate_section, latest_sections, plan_result
+)
+from app.utils.rate_limiter import LimiterRejected
+from app.utils.single_flight import single_flight, flight_key
+import json
+import logging
 import os
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # -----------------------------
 # 📥 Create Project
@@ -56,77 +64,120 @@ def list_projects(user=Depends(get_current_user), db: Session = Depends(get_db))
 # 📥 Generate Business Plan (POST)
 # -----------------------------
 @router.post("/projects/{project_id}/generate-business-plan")
-def generate_business_plan(
+async def generate_business_plan(
     project_id: UUID,
     user=Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    project = db.execute(
+    project = (await db.execute(
         text("SELECT * FROM projects WHERE id = :id AND tenant_id = :tenant_id"),
         {"id": str(project_id), "tenant_id": user["tenant_id"]}
-    ).fetchone()
+    )).fetchone()
 
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    summary_row = db.execute(
-        text("SELECT content_html FROM project_plan WHERE project_id = :id"),
-        {"id": str(project_id)}
-    ).fetchone()
-    summary = summary_row.content_html if summary_row else ""
+    # Duplicate clicks share one generation
+    return await single_flight.do(
+        flight_key("business-plan", user["tenant_id"], project_id),
+        lambda: _generate_business_plan(project_id, user),
+        reuse=lambda since: _recent_business_plan(project_id, db, since)
+    )
+
 
-    chat_rows = db.execute(
+async def _recent_business_plan(project_id: UUID, db: AsyncSession, since):
+    row = (await db.execute(
         text("""
-            SELECT role, message
-            FROM idea_chat_log
-            WHERE idea_id = :id
-            ORDER BY created_at
+            SELECT content FROM assistant_outputs
+            WHERE project_id = :project_id AND role = 'ceo'
+              AND created_at >= CAST(:since AS TIMESTAMPTZ)
+            ORDER BY created_at DESC
+            LIMIT 1
         """),
-        {"id": str(project_id)}
-    ).fetchall()
-    chat_log = "\n".join([f"{r.role.capitalize()}: {r.message}" for r in chat_rows])
-
-    prompt = f"""
-You are the CEO of a startup. Based on the summary and chat, write a business plan:
+        {"project_id": str(project_id), "since": since}
+    )).fetchone()
+    if not row:
+        return None
+    return plan_result(row.content, await latest_sections(project_id, db, since))
 
-- Executive Summary
-- Business Model
-- Product Vision
-- Monetization Strategy
-- Market & Opportunity
-- Go-To-Market Strategy
-- Hiring Plan
-- Financials
-- Key Milestones
-- Risk & Mitigation
 
----
+async def _generate_business_plan(project_id: UUID, user: dict):
+    # Sections are written concurrently and stored one by one (see services/business_plan)
+    async for kind, data in stream_business_plan(project_id, user["tenant_id"], user):
+        if kind == "done":
+            return data
 
-Summary:
-{summary}
 
----
+async def _get_project(project_id: UUID, user: dict, db: AsyncSession):
+    project = (await db.execute(
+        text("SELECT * FROM projects WHERE id = :id AND tenant_id = :tenant_id"),
+        {"id": str(project_id), "tenant_id": user["tenant_id"]}
+    )).fetchone()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
 
-Chat Transcript:
-{chat_log}
-"""
 
-    business_plan = run_gpt_task(prompt, system="You are a startup CEO generating a business plan.")
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    db.execute(
-        text("""
-            INSERT INTO assistant_outputs (id, project_id, role, content, created_at)
-            VALUES (:id, :project_id, 'ceo', :content, NOW())
-        """),
-        {
-            "id": str(uuid4()),
-            "project_id": str(project_id),
-            "content": business_plan
-        }
+# -----------------------------
+# 📡 Generate Business Plan (SSE)
+# -----------------------------
+@router.post("/projects/{project_id}/generate-business-plan/stream")
+async def stream_generate_business_plan(
+    project_id: UUID,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Server-Sent Events: a `section` event for each section as it is finished and
+    stored, then `done` with the assembled plan (or `error`).
+    """
+    await _get_project(project_id, user, db)
+
+    async def event_stream():
+        try:
+            async for kind, data in stream_business_plan(project_id, user["tenant_id"], user):
+                yield _sse(kind, data)
+        except LimiterRejected as e:
+            yield _sse("error", {"detail": e.detail, "retry_after": int(e.headers["Retry-After"])})
+        except Exception as e:
+            logger.exception("Business plan stream failed")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    db.commit()
 
-    return {"content": business_plan}
+# -----------------------------
+# 🔁 Regenerate One Business Plan Section
+# -----------------------------
+@router.post("/projects/{project_id}/business-plan/sections/{section}/regenerate")
+async def regenerate_business_plan_section(
+    project_id: UUID,
+    section: str,
+    payload: dict = Body(default={}),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if section not in PLAN_SECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown section. Use one of: {', '.join(PLAN_SECTIONS)}")
+    await _get_project(project_id, user, db)
+
+    try:
+        return await single_flight.do(
+            flight_key("business-plan-section", user["tenant_id"], project_id, [section, payload.get("instructions")]),
+            lambda: regenerate_section(
+                project_id, section, user["tenant_id"], db, payload.get("instructions") or "", user
+            )
+        )
+    except LimiterRejected:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 # -----------------------------
 # 📤 Get Existing Business Plan (GET)
@@ -151,7 +202,20 @@ def get_business_plan(
     if not row:
         raise HTTPException(status_code=404, detail="No business plan found")
 
-    return {"content": row.content}
+    sections = db.execute(
+        text("""
+            SELECT DISTINCT ON (role) role, content
+            FROM assistant_outputs
+            WHERE project_id = :project_id AND role LIKE 'plan:%'
+            ORDER BY role, created_at DESC
+        """),
+        {"project_id": str(project_id)}
+    ).fetchall()
+
+    return {
+        "content": row.content,
+        "sections": {r.role.split(":", 1)[1]: r.content for r in sections}
+    }
 
 # -----------------------------
 # 📁 Generate Project Document (Download .docx)
@@ -9,7 +9,8 @@ from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from pydantic import BaseModel, Field
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.jobstores.base import JobLookupError
-from databases import Database
+from app.core.db_registry import get_database
+from app.scheduler.token_usage_reconciler import reconcile_token_usage
 from dotenv import load_dotenv
 
 # Load environment variables (DATABASE_URL is provided via env)
@@ -17,7 +18,7 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
-database = Database(DATABASE_URL)
+database = get_database()
 
 # Global configuration loaded from the DB (assume keys are stored in system_config)
 config: Dict[str, str] = {}
@@ -43,6 +44,15 @@ logger = logging.getLogger(__name__)
 scheduler = AsyncIOScheduler()
 scheduler.start()
 
+# Hourly rebuild of the monthly token usage counters from the ledger
+scheduler.add_job(
+    reconcile_token_usage,
+    trigger="cron",
+    minute=int(os.getenv("TOKEN_USAGE_RECONCILE_MINUTE", 5)),
+    id="reconcile_token_usage",
+    replace_existing=True
+)
+
 router = APIRouter(prefix="/scheduler", tags=["Scheduler"])
 
 # -----------------------------
@@ -154,15 +164,14 @@ async def cancel_scheduled_post(job_id: str):
 from fastapi import FastAPI
 
 def init_scheduler(app: FastAPI):
+    # The shared database pool is connected and disconnected by the app lifespan.
     @app.on_event("startup")
     async def startup():
-        await database.connect()
         await load_config()
         scheduler.start()
-        logger.info("Scheduler started, DB connected, and config loaded.")
+        logger.info("Scheduler started and config loaded.")
 
     @app.on_event("shutdown")
     async def shutdown():
         scheduler.shutdown(wait=False)
-        await database.disconnect()
-        logger.info("Scheduler shutdown and DB disconnected.")
+        logger.info("Scheduler shutdown.")
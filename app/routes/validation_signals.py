@@ -1,14 +1,14 @@
-import os
 import uuid
 import logging
 from datetime import datetime
 from typing import List, Optional
 
-import psycopg2
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from app.db import get_db_connection
+
 # === Load env
 load_dotenv()
 
@@ -17,16 +17,6 @@ router = APIRouter()
 logger = logging.getLogger("validation_signals")
 logging.basicConfig(level=logging.INFO)
 
-# === DB Connection
-def get_db_connection():
-    return psycopg2.connect(
-        dbname=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        host=os.getenv("POSTGRES_HOST"),
-        port=os.getenv("POSTGRES_PORT", 5432)
-    )
-
 # === Models
 class SignalCreate(BaseModel):
     tenant_id: str
@@ -56,25 +46,23 @@ async def add_validation_signal(project_id: str, signal: SignalCreate):
     created_at = datetime.utcnow()
 
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO validation_signals (
-                        id, tenant_id, project_id, contact_id, type, note, strength, created_by, created_at
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    signal_id,
-                    signal.tenant_id,
-                    project_id,
-                    signal.contact_id,
-                    signal.type,
-                    signal.note,
-                    signal.strength,
-                    signal.created_by,
-                    created_at
-                ))
-            conn.commit()
+        async with get_db_connection() as conn:
+            await conn.execute("""
+                INSERT INTO validation_signals (
+                    id, tenant_id, project_id, contact_id, type, note, strength, created_by, created_at
+                )
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+            """,
+                signal_id,
+                signal.tenant_id,
+                project_id,
+                signal.contact_id,
+                signal.type,
+                signal.note,
+                signal.strength,
+                signal.created_by,
+                created_at
+            )
     except Exception:
         logger.exception("Error inserting validation signal")
         raise HTTPException(status_code=500, detail="Database error")
@@ -100,27 +88,26 @@ async def get_signals_for_project(
 ):
     signals = []
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id, tenant_id, project_id, contact_id, type, note, strength, created_by, created_at
-                    FROM validation_signals
-                    WHERE project_id = %s AND tenant_id = %s
-                    ORDER BY created_at DESC
-                    LIMIT %s OFFSET %s
-                """, (project_id, tenant_id, limit, offset))
-                for row in cur.fetchall():
-                    signals.append(SignalOut(
-                        id=row[0],
-                        tenant_id=row[1],
-                        project_id=row[2],
-                        contact_id=row[3],
-                        type=row[4],
-                        note=row[5],
-                        strength=row[6],
-                        created_by=row[7],
-                        created_at=row[8]
-                    ))
+        async with get_db_connection() as conn:
+            rows = await conn.fetch("""
+                SELECT id, tenant_id, project_id, contact_id, type, note, strength, created_by, created_at
+                FROM validation_signals
+                WHERE project_id = $1 AND tenant_id = $2
+                ORDER BY created_at DESC
+                LIMIT $3 OFFSET $4
+            """, project_id, tenant_id, limit, offset)
+        for row in rows:
+            signals.append(SignalOut(
+                id=row[0],
+                tenant_id=row[1],
+                project_id=row[2],
+                contact_id=row[3],
+                type=row[4],
+                note=row[5],
+                strength=row[6],
+                created_by=row[7],
+                created_at=row[8]
+            ))
     except Exception:
         logger.exception("Failed to fetch validation signals")
         raise HTTPException(status_code=500, detail="Database error")
@@ -12,11 +12,10 @@ async def add_to_waitlist(request: Request):
         raise HTTPException(status_code=400, detail="Missing email")
 
     try:
-        conn = await get_db_connection()
-        await conn.execute(
-            "INSERT INTO waitlist (email) VALUES ($1)", data["email"]
-        )
-        await conn.close()
+        async with get_db_connection() as conn:
+            await conn.execute(
+                "INSERT INTO waitlist (email) VALUES ($1)", data["email"]
+            )
         return {"message": "Email added to waitlist"}
     except Exception as e:
         print("❌ DB error:", e)
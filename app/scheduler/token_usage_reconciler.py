@@ -0,0 +1,13 @@
+from app.core.db import get_sync_db
+from app.services.usage_service import reconcile_usage_counters
+
+def reconcile_token_usage():
+    db = get_sync_db()
+    try:
+        rows = reconcile_usage_counters(db)
+        print(f"🔁 Rebuilt {rows} token usage counter(s) from the ledger")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
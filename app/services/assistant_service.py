@@ -1,30 +1,52 @@
+import os
+import logging
 from uuid import uuid4
-from sqlalchemy.orm import Session
-from openai import AsyncOpenAI
-from jinja2 import Template, TemplateError
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from jinja2 import TemplateError
 
+from app.core.db import AsyncSessionLocal
 from app.models.idea import Idea
-from app.models.sparring_template import SparringTemplate
+from app.models.role_assistant import RoleAssistant
+from app.services.template_registry import template_registry
 from app.models.project_threads import ProjectThread
+from app.models.local_thread import LocalThread
+from app.utils.single_flight import single_flight
+from app.utils.rate_limiter import llm_slot, LimiterRejected
+from app.ai.llm_gateway import get_client
 
-client = AsyncOpenAI()
+logger = logging.getLogger(__name__)
+
+# === Assistant pool settings
+# Opt-in. Pooled: new project threads use one assistant per (role, template version),
+# shared by all projects, with the project context sent per run. Existing threads keep
+# the assistant they were created with, whichever way this is set.
+ASSISTANT_POOLING = os.getenv("ASSISTANT_POOLING", "0") == "1"
+ASSISTANT_MODEL = os.getenv("ASSISTANT_MODEL", "gpt-4o")
+# "openai": Assistants API threads. "local": turns kept in Postgres and sent to chat
+# completions (see app.stella_sdk.local_threads). Existing threads keep their backend.
+CONVERSATION_BACKEND = os.getenv("CONVERSATION_BACKEND", "openai")
+
+_pooled_assistants: dict[tuple[str, str], str] = {}
+_pooled_ids: set[str] = set()
+_pool_table_present: bool | None = None
 
 # ✅ Main entry point
 async def ensure_assistant_for_role(
     project_id: str,
     role: str,
     user: dict,
-    db: Session
+    db: AsyncSession
 ) -> str:
     role = role.lower()
 
     # 🧠 Check if assistant + thread already exist
-    existing = db.query(ProjectThread).filter_by(
+    existing = (await db.execute(select(ProjectThread).filter_by(
         project_id=project_id,
         role=role,
         tenant_id=user["tenant_id"],
         user_id=user["id"]
-    ).first()
+    ))).scalars().first()
 
     if existing:
         return existing.assistant_id
@@ -42,7 +64,7 @@ async def ensure_assistant_for_role(
 
 # 🔧 Builds assistant + thread from scratch
 async def get_or_create_assistant_and_thread(
-    db: Session,
+    db: AsyncSession,
     user_id: str,
     tenant_id: str,
     project_id: str,
@@ -50,61 +72,232 @@ async def get_or_create_assistant_and_thread(
 ) -> tuple[str, str]:
     role = role.lower()
 
-    idea = db.query(Idea).filter_by(id=project_id).first()
+    idea = (await db.execute(select(Idea).filter_by(id=project_id))).scalars().first()
     if not idea:
         raise ValueError("⚠️ Project idea not found.")
 
-    instructions = generate_instructions_by_role(role=role, db=db, project_id=project_id)
+    if CONVERSATION_BACKEND == "local":
+        # 🗄️ No remote assistant or thread: the conversation lives in local_threads
+        thread_id = f"local_{uuid4().hex}"
+        existing = await _claim_project_thread(db, project_id, role, tenant_id, user_id, f"local:{role}", thread_id)
+        if existing:
+            return existing
+        db.add(LocalThread(
+            id=thread_id, project_id=project_id, role=role, tenant_id=tenant_id, user_id=user_id
+        ))
+        await db.commit()
+        return f"local:{role}", thread_id
 
-    # 🧠 Create assistant using OpenAI
-    try:
-        assistant = await client.beta.assistants.create(
-            name=f"{idea.title} — {role.upper()}",
-            instructions=instructions,
-            model="gpt-4o"
-        )
-    except Exception as e:
-        raise RuntimeError(f"Failed to create assistant: {e}")
+    if ASSISTANT_POOLING:
+        # ♻️ Shared role assistant; the project context goes with each run
+        assistant_id = await get_pooled_assistant(role, db)
+    else:
+        instructions = await generate_instructions_by_role(role=role, db=db, project_id=project_id)
+
+        # 🧠 Create assistant using OpenAI
+        try:
+            async with llm_slot("openai", tenant_id, model="assistants"):
+                assistant = await get_client().beta.assistants.create(
+                    name=f"{idea.title} — {role.upper()}",
+                    instructions=instructions,
+                    model=ASSISTANT_MODEL
+                )
+        except LimiterRejected:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Failed to create assistant: {e}")
+        assistant_id = assistant.id
 
     # 🔗 Create thread
     try:
-        thread = await client.beta.threads.create()
+        async with llm_slot("openai", tenant_id, model="assistants"):
+            thread = await get_client().beta.threads.create(
+                metadata={"project_id": str(project_id), "role": role, "tenant_id": str(tenant_id)}
+            )
+    except LimiterRejected:
+        raise
     except Exception as e:
         raise RuntimeError(f"Failed to create thread: {e}")
 
-    # 💾 Save to DB
-    db.add(ProjectThread(
-        id=str(uuid4()),
-        project_id=project_id,
-        role=role,
-        assistant_id=assistant.id,
-        thread_id=thread.id,
-        tenant_id=tenant_id,
-        user_id=user_id
-    ))
-    db.commit()
+    # 💾 Save to DB, unless a concurrent request got there first: then keep theirs
+    existing = await _claim_project_thread(db, project_id, role, tenant_id, user_id, assistant_id, thread.id)
+    if existing:
+        try:
+            await get_client().beta.threads.delete(thread.id)
+            if not ASSISTANT_POOLING:
+                await get_client().beta.assistants.delete(assistant_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not delete duplicate thread {thread.id}: {e}")
+        return existing
+    await db.commit()
+
+    return assistant_id, thread.id
 
-    return assistant.id, thread.id
+
+async def _claim_project_thread(
+    db: AsyncSession, project_id: str, role: str, tenant_id: str, user_id: str, assistant_id: str, thread_id: str
+) -> tuple[str, str] | None:
+    """
+    Inserts the (project, role, user) thread row; the caller commits. Returns None
+    if it was inserted, or the (assistant_id, thread_id) of the row that already exists.
+    """
+    inserted = (await db.execute(
+        text("""
+            INSERT INTO project_threads (id, project_id, role, assistant_id, thread_id, tenant_id, user_id, created_at)
+            VALUES (:id, :project_id, :role, :assistant_id, :thread_id, :tenant_id, :user_id, NOW())
+            ON CONFLICT (project_id, role, user_id) DO NOTHING
+            RETURNING id
+        """),
+        {
+            "id": str(uuid4()),
+            "project_id": str(project_id),
+            "role": role,
+            "assistant_id": assistant_id,
+            "thread_id": thread_id,
+            "tenant_id": str(tenant_id),
+            "user_id": str(user_id)
+        }
+    )).scalar()
+    if inserted:
+        return None
+
+    existing = (await db.execute(select(ProjectThread).filter_by(
+        project_id=project_id, role=role, user_id=user_id
+    ))).scalars().one()
+    return existing.assistant_id, existing.thread_id
+
+
+# ♻️ One assistant per (role, template version), created on first use
+async def get_pooled_assistant(role: str, db: AsyncSession) -> str:
+    role = role.lower()
+    template = await template_registry.get_sparring(role, db)
+    version = template.version if template else "default"
+
+    assistant_id = _pooled_assistants.get((role, version))
+    if assistant_id:
+        return assistant_id
+
+    assistant_id = await single_flight.do(
+        f"role_assistant:{role}:{version}",
+        lambda: _load_or_create_pooled_assistant(role, version, template)
+    )
+    _pooled_assistants[(role, version)] = assistant_id
+    _pooled_ids.add(assistant_id)
+    return assistant_id
+
+
+async def is_pooled_assistant(assistant_id: str, db: AsyncSession) -> bool:
+    global _pool_table_present
+    if assistant_id in _pooled_ids:
+        return True
+    if _pool_table_present is None:
+        # Deployments that never enabled pooling may not have role_assistants yet
+        _pool_table_present = ASSISTANT_POOLING or (await db.execute(
+            text("SELECT to_regclass('role_assistants') IS NOT NULL")
+        )).scalar()
+    if not _pool_table_present:
+        return False
+    found = (await db.execute(
+        select(RoleAssistant.assistant_id).filter_by(assistant_id=assistant_id)
+    )).scalar()
+    if found:
+        _pooled_ids.add(found)
+    return found is not None
+
+
+async def _load_or_create_pooled_assistant(role: str, version: str, template) -> str:
+    # Own session: the row is shared state, independent of the caller's transaction.
+    async with AsyncSessionLocal() as pool_db:
+        existing = (await pool_db.execute(
+            select(RoleAssistant).filter_by(role=role, template_version=version)
+        )).scalars().first()
+        if existing:
+            return existing.assistant_id
+
+        # Shared by every tenant, so it queues on the "system" share of the lane
+        async with llm_slot("openai", None, model="assistants"):
+            assistant = await get_client().beta.assistants.create(
+                name=f"FounderHub — {role.upper()}",
+                instructions=role_instructions(role, template),
+                model=ASSISTANT_MODEL,
+                metadata={"role": role, "template_version": version}
+            )
+
+        # Another worker may have created one meanwhile; keep whichever row landed first.
+        winner = (await pool_db.execute(
+            text("""
+                INSERT INTO role_assistants (role, template_version, assistant_id, model, created_at)
+                VALUES (:role, :version, :assistant_id, :model, NOW())
+                ON CONFLICT (role, template_version) DO NOTHING
+                RETURNING assistant_id
+            """),
+            {"role": role, "version": version, "assistant_id": assistant.id, "model": ASSISTANT_MODEL}
+        )).scalar()
+        await pool_db.commit()
+
+        if winner:
+            logger.info(f"✅ Created pooled assistant for {role} ({version[:8]}): {assistant.id}")
+            return assistant.id
+
+        try:
+            await get_client().beta.assistants.delete(assistant.id)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not delete duplicate assistant {assistant.id}: {e}")
+        return (await pool_db.execute(
+            select(RoleAssistant.assistant_id).filter_by(role=role, template_version=version)
+        )).scalar_one()
+
+
+def role_instructions(role: str, template) -> str:
+    """
+    Project-independent instructions for a pooled assistant. The sparring template
+    is rendered with neutral values; the real project arrives per run.
+    """
+    note = "The founder's project details are provided with each run as project context."
+    if not template:
+        return f"You are the {role.upper()} of a startup. Help the founder make high-quality decisions.\n\n{note}"
+    try:
+        return template.render(
+            "text",
+            idea_name="the founder's startup",
+            idea_summary="See the project context provided with each run."
+        ) + f"\n\n{note}"
+    except TemplateError as e:
+        return f"You are the assistant for {role.upper()}, but the prompt failed to render. Error: {e}"
+
+
+# 📎 Per-run project context for pooled assistants
+async def project_context_instructions(project_id: str, db: AsyncSession) -> str | None:
+    idea = (await db.execute(select(Idea).filter_by(id=project_id))).scalars().first()
+    if not idea:
+        return None
+    return (
+        "Project context for this conversation:\n"
+        f"Startup: {idea.title}\n"
+        f"Problem: {idea.problem or 'N/A'}\n"
+        f"Audience: {idea.audience or 'N/A'}\n"
+        f"Summary: {idea.solution or 'No summary provided yet.'}"
+    )
 
 # 🧠 Loads + renders the correct prompt template
-def generate_instructions_by_role(
+async def generate_instructions_by_role(
     role: str,
-    db: Session,
+    db: AsyncSession,
     project_id: str
 ) -> str:
     role = role.lower()
 
-    idea = db.query(Idea).filter_by(id=project_id).first()
+    idea = (await db.execute(select(Idea).filter_by(id=project_id))).scalars().first()
     if not idea:
         raise ValueError("Idea not found.")
 
-    template = db.query(SparringTemplate).filter_by(role=role).first()
+    template = await template_registry.get_sparring(role, db)
     if not template:
         return f"You are the {role.upper()} of a startup. Help the founder make high-quality decisions."
 
     try:
-        tpl = Template(template.template_text)
-        return tpl.render(
+        return template.render(
+            "text",
             idea_name=idea.title,
             idea_summary=idea.solution or "No summary provided yet."
         )
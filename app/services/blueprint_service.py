@@ -0,0 +1,59 @@
+import os
+import logging
+
+from app.db import get_db_connection
+from app.ai.response_cache import ResponseCache
+from app.utils.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# === Blueprint cache settings
+# Blueprints change only when /ai-agents/build-business stores a new one, which
+# drops the cached copy; the TTL covers writes from other workers.
+BLUEPRINT_CACHE_TTL = float(os.getenv("BLUEPRINT_CACHE_TTL_SECONDS", 600))
+
+_blueprints = ResponseCache(max_entries=100, ttl=BLUEPRINT_CACHE_TTL)
+
+
+async def _load_blueprint(tenant_id: str, project_id: str) -> str:
+    async with get_db_connection() as conn:
+        row = await conn.fetchrow(
+            """
+            SELECT blueprint FROM business_blueprints
+            WHERE tenant_id = $1 AND project_id = $2
+            ORDER BY created_at DESC LIMIT 1
+            """,
+            tenant_id, project_id
+        )
+    blueprint = row[0] if row else ""
+    _blueprints.put(tenant_id, project_id, blueprint)
+    return blueprint
+
+
+async def get_blueprint(tenant_id: str, project_id: str) -> str:
+    """
+    Fetches the most recent blueprint from the 'business_blueprints' table for the given tenant and project.
+    Returns the blueprint text, or an empty string if none is found. Lookups are cached per project
+    (an empty result too) and concurrent misses share one query.
+    """
+    cached = _blueprints.get(tenant_id, project_id)
+    if cached is not None:
+        return cached
+    try:
+        return await single_flight.do(
+            f"blueprint:{tenant_id}:{project_id}",
+            lambda: _load_blueprint(tenant_id, project_id)
+        )
+    except Exception as e:
+        # Not cached: the next meeting retries the lookup
+        logger.warning(f"⚠️ Error fetching blueprint: {e}")
+        return ""
+
+
+def forget_blueprint(tenant_id: str, project_id: str):
+    # Call after storing a new blueprint for the project.
+    _blueprints.delete(tenant_id, project_id)
+
+
+def blueprint_cache_metrics() -> dict:
+    return _blueprints.metrics()
@@ -0,0 +1,218 @@
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.llm_gateway import complete
+from app.core.db import AsyncSessionLocal
+from app.services.chat_context import assemble_context
+from app.utils.rate_limiter import LimiterRejected
+
+logger = logging.getLogger(__name__)
+
+# === Business plan settings
+BUSINESS_PLAN_MODEL = os.getenv("BUSINESS_PLAN_MODEL", "gpt-4o")
+BUSINESS_PLAN_CONCURRENCY = int(os.getenv("BUSINESS_PLAN_CONCURRENCY", 5))
+BUSINESS_PLAN_SECTION_MAX_TOKENS = int(os.getenv("BUSINESS_PLAN_SECTION_MAX_TOKENS", 1200))
+BUSINESS_PLAN_SECTION_DEADLINE = float(os.getenv("BUSINESS_PLAN_SECTION_DEADLINE_SECONDS", 90))
+
+SYSTEM = "You are a startup CEO writing one section of your company's business plan."
+
+# Plan order. Every section but the executive summary is written concurrently from
+# the shared context; the executive summary is written last, from the others.
+PLAN_SECTIONS: Dict[str, tuple] = {
+    "executive_summary": ("Executive Summary", "The plan in brief: problem, solution, market, model, traction and the ask."),
+    "business_model": ("Business Model", "Who pays, for what, and how value is created and captured."),
+    "product_vision": ("Product Vision", "The product today, where it goes next, and what makes it defensible."),
+    "monetization": ("Monetization Strategy", "Pricing, packaging, revenue streams and expansion revenue."),
+    "market": ("Market & Opportunity", "Target segments, market size with reasoning, competitors and timing."),
+    "go_to_market": ("Go-To-Market Strategy", "Launch plan, channels, sales motion and the first 100 customers."),
+    "hiring": ("Hiring Plan", "Key roles, order of hiring and the team needed for the next 18 months."),
+    "financials": ("Financials", "Revenue and cost assumptions, burn, runway and funding needs."),
+    "milestones": ("Key Milestones", "Dated milestones for the next 12-24 months with success metrics."),
+    "risks": ("Risk & Mitigation", "The biggest risks and how each one is mitigated."),
+}
+SUMMARY_SECTION = "executive_summary"
+
+
+@dataclass
+class PlanSection:
+    key: str
+    content: str = ""
+    error: Optional[str] = None
+
+    @property
+    def title(self) -> str:
+        return PLAN_SECTIONS[self.key][0]
+
+    def event(self) -> dict:
+        return {"key": self.key, "title": self.title, "content": self.content, "error": self.error}
+
+
+def _output_role(key: str) -> str:
+    # assistant_outputs row of one section; the assembled plan stays under role 'ceo'.
+    return f"plan:{key}"
+
+
+def assemble_plan(sections: Dict[str, str]) -> str:
+    return "\n\n".join(
+        f"## {title}\n\n{sections[key]}" for key, (title, _) in PLAN_SECTIONS.items() if sections.get(key)
+    )
+
+
+async def shared_context(project_id, tenant_id: str, db: AsyncSession, user: Optional[dict] = None) -> str:
+    """
+    What every section is written from: the stored project summary plus the
+    founder's chat (rolling summary and recent turns). Any chat folding this
+    triggers is charged to `user`.
+    """
+    summary_row = (await db.execute(
+        text("SELECT content_html FROM project_plan WHERE project_id = :id"),
+        {"id": str(project_id)}
+    )).fetchone()
+    chat = (await assemble_context(project_id, tenant_id, db, user=user)).render()
+    return f"Summary:\n{summary_row.content_html if summary_row else ''}\n\n---\n\nChat:\n{chat}"
+
+
+async def _write_section(
+    section: PlanSection, context: str, tenant_id: str,
+    others: Optional[Dict[str, str]] = None, instructions: str = ""
+) -> PlanSection:
+    title, guidance = PLAN_SECTIONS[section.key]
+    prompt = f"{context}\n\n---\n\n"
+    if others:
+        prompt += "Sections already written:\n\n" + assemble_plan(others) + "\n\n---\n\n"
+    prompt += (
+        f"Write only the '{title}' section of the business plan. {guidance}\n"
+        "Use markdown without a top-level heading; be specific to this startup."
+    )
+    if instructions:
+        prompt += f"\n\nFounder's instructions for this section:\n{instructions}"
+
+    try:
+        response = await asyncio.wait_for(
+            complete(
+                prompt, system=SYSTEM, model=BUSINESS_PLAN_MODEL,
+                max_tokens=BUSINESS_PLAN_SECTION_MAX_TOKENS, tenant_id=tenant_id
+            ),
+            timeout=BUSINESS_PLAN_SECTION_DEADLINE
+        )
+        section.content = response.content
+    except LimiterRejected:
+        raise
+    except asyncio.TimeoutError:
+        section.error = f"not finished within {BUSINESS_PLAN_SECTION_DEADLINE:.0f}s"
+    except Exception as e:
+        logger.warning(f"⚠️ Business plan section {section.key} failed: {e}")
+        section.error = str(e)
+    return section
+
+
+async def _store_output(project_id, role: str, content: str):
+    # Own session: generation outlives the request-scoped one when streaming.
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            text("""
+                INSERT INTO assistant_outputs (id, project_id, role, content, created_at)
+                VALUES (:id, :project_id, :role, :content, NOW())
+            """),
+            {"id": str(uuid4()), "project_id": str(project_id), "role": role, "content": content}
+        )
+        await db.commit()
+
+
+async def latest_sections(project_id, db: AsyncSession, since=None) -> Dict[str, str]:
+    # Newest version of each stored section (only those written at or after `since`, if given)
+    rows = (await db.execute(
+        text(f"""
+            SELECT DISTINCT ON (role) role, content
+            FROM assistant_outputs
+            WHERE project_id = :project_id AND role LIKE 'plan:%'
+              {"AND created_at >= CAST(:since AS TIMESTAMPTZ)" if since is not None else ""}
+            ORDER BY role, created_at DESC
+        """),
+        {"project_id": str(project_id), "since": since} if since is not None else {"project_id": str(project_id)}
+    )).fetchall()
+    sections = {row.role.split(":", 1)[1]: row.content for row in rows}
+    return {key: sections[key] for key in PLAN_SECTIONS if key in sections}
+
+
+async def stream_business_plan(project_id, tenant_id: str, user: Optional[dict] = None):
+    """
+    Generates the plan section by section and yields events as it goes:
+    ("section", {...}) for each section as soon as it is written and stored,
+    then ("done", {"content": full_plan, ...}). Sections run concurrently, at most
+    BUSINESS_PLAN_CONCURRENCY at a time; a failed section is reported and left out.
+    """
+    async with AsyncSessionLocal() as db:
+        context = await shared_context(project_id, tenant_id, db, user)
+
+    semaphore = asyncio.Semaphore(BUSINESS_PLAN_CONCURRENCY)
+
+    async def write(key: str) -> PlanSection:
+        async with semaphore:
+            section = await _write_section(PlanSection(key), context, tenant_id)
+        if section.content:
+            await _store_output(project_id, _output_role(key), section.content)
+        return section
+
+    written: Dict[str, str] = {}
+    tasks = [asyncio.ensure_future(write(key)) for key in PLAN_SECTIONS if key != SUMMARY_SECTION]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            section = await finished
+            if section.content:
+                written[section.key] = section.content
+            yield "section", section.event()
+    finally:
+        for task in tasks:
+            task.cancel()  # client went away or a section raised
+
+    if not written:
+        raise RuntimeError("No business plan section could be generated")
+
+    summary = await _write_section(PlanSection(SUMMARY_SECTION), context, tenant_id, others=written)
+    if summary.content:
+        written[SUMMARY_SECTION] = summary.content
+        await _store_output(project_id, _output_role(SUMMARY_SECTION), summary.content)
+    yield "section", summary.event()
+
+    plan = assemble_plan(written)
+    await _store_output(project_id, "ceo", plan)
+    yield "done", plan_result(plan, written)
+
+
+def plan_result(plan: str, written: Dict[str, str]) -> dict:
+    # Response of a finished generation; duplicate requests that reuse it get the same shape
+    return {
+        "content": plan,
+        "sections": list(written),
+        "failed": [key for key in PLAN_SECTIONS if key not in written],
+    }
+
+
+async def regenerate_section(
+    project_id, key: str, tenant_id: str, db: AsyncSession, instructions: str = "", user: Optional[dict] = None
+) -> dict:
+    """
+    Rewrites one section (optionally following the founder's instructions), stores
+    it, and re-assembles the plan from the latest version of every section.
+    """
+    context = await shared_context(project_id, tenant_id, db, user)
+    sections = await latest_sections(project_id, db)
+    others = {k: v for k, v in sections.items() if k != key} if key == SUMMARY_SECTION else None
+
+    section = await _write_section(PlanSection(key), context, tenant_id, others=others, instructions=instructions)
+    if not section.content:
+        raise RuntimeError(f"Section {key} could not be generated: {section.error}")
+
+    await _store_output(project_id, _output_role(key), section.content)
+    sections[key] = section.content
+    plan = assemble_plan(sections)
+    await _store_output(project_id, "ceo", plan)
+    return {"section": section.event(), "content": plan}
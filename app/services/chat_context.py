@@ -0,0 +1,230 @@
+import os
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.llm_gateway import complete
+from app.core.db import AsyncSessionLocal
+from app.services.usage_service import estimate_tokens, record_token_usage
+from app.utils.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# === Chat context settings
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", 6000))
+CHAT_CONTEXT_RECENT_TURNS = int(os.getenv("CHAT_CONTEXT_RECENT_TURNS", 12))
+# The summary is asked to stay under this; the rest of the budget is for raw turns.
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", 1200))
+# New messages are folded in batches of at most this many tokens per LLM call.
+CHAT_SUMMARY_BATCH_TOKENS = int(os.getenv("CHAT_SUMMARY_BATCH_TOKENS", 6000))
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "gpt-4o-mini")
+
+FOLD_SYSTEM = "You maintain a running summary of a founder's conversation about their startup idea."
+
+
+def _tokens(value: str) -> int:
+    return estimate_tokens(value, completion_tokens=0)
+
+
+@dataclass
+class ChatTurn:
+    id: str
+    role: str
+    message: str
+    created_at: object
+
+    def render(self) -> str:
+        return f"{self.role.capitalize()}: {self.message}"
+
+
+@dataclass
+class ChatContext:
+    summary: str
+    turns: List[ChatTurn] = field(default_factory=list)
+    folded: int = 0
+
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+        if self.turns:
+            parts.append("Recent messages:\n" + "\n".join(turn.render() for turn in self.turns))
+        return "\n\n".join(parts)
+
+    @property
+    def tokens(self) -> int:
+        return _tokens(self.render())
+
+
+async def _load_state(idea_id, db: AsyncSession):
+    return (await db.execute(
+        text("""
+            SELECT summary, last_message_at, last_message_id, messages_folded
+            FROM idea_rolling_summaries
+            WHERE idea_id = :idea_id
+        """),
+        {"idea_id": str(idea_id)}
+    )).fetchone()
+
+
+async def _messages_after(idea_id, state, db: AsyncSession) -> List[ChatTurn]:
+    # Chat rows are stamped with clock_timestamp() just before their transaction
+    # commits, so a row never appears behind a mark already taken. Rows inserted
+    # together can still share created_at, so the id breaks the tie.
+    if state and state.last_message_at is not None:
+        where = "AND (created_at > :at OR (created_at = :at AND id::text > :last_id))"
+        params = {"at": state.last_message_at, "last_id": state.last_message_id or ""}
+    else:
+        where, params = "", {}
+    rows = (await db.execute(
+        text(f"""
+            SELECT id, role, message, created_at
+            FROM idea_chat_log
+            WHERE idea_id = :idea_id {where}
+            ORDER BY created_at, id::text
+        """),
+        {"idea_id": str(idea_id), **params}
+    )).fetchall()
+    return [ChatTurn(str(r.id), r.role or "user", r.message or "", r.created_at) for r in rows]
+
+
+def batch_turns(turns: List[ChatTurn]) -> List[List[ChatTurn]]:
+    batches, current, size = [], [], 0
+    for turn in turns:
+        tokens = _tokens(turn.render())
+        if current and size + tokens > CHAT_SUMMARY_BATCH_TOKENS:
+            batches.append(current)
+            current, size = [], 0
+        current.append(turn)
+        size += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def fold_into_summary(summary: str, turns: List[ChatTurn], tenant_id: Optional[str]) -> Tuple[str, int]:
+    # (updated summary, tokens the LLM call used)
+    transcript = "\n".join(turn.render() for turn in turns)
+    if _tokens(transcript) > CHAT_SUMMARY_BATCH_TOKENS:
+        # A single huge message: its head carries enough for the summary
+        transcript = transcript[:CHAT_SUMMARY_BATCH_TOKENS * 4]
+
+    prompt = f"""Update the running summary with the new messages below.
+Keep every decision, fact, number, open question and next step; drop small talk and repetition.
+Write plain prose or short bullets, at most {CHAT_SUMMARY_MAX_TOKENS * 3 // 4} words.
+Return only the updated summary.
+
+Current summary:
+{summary or "(none yet)"}
+
+New messages:
+{transcript}
+"""
+    response = await complete(
+        prompt,
+        system=FOLD_SYSTEM,
+        model=CHAT_SUMMARY_MODEL,
+        temperature=0.2,
+        max_tokens=CHAT_SUMMARY_MAX_TOKENS,
+        tenant_id=tenant_id
+    )
+    return response.content.strip() or summary, response.total_tokens
+
+
+async def _fold_overflow(idea_id, tenant_id: Optional[str], keep: int, user: Optional[dict] = None) -> None:
+    """
+    Folds every unsummarized message except the newest `keep` into the stored
+    summary, one batch per LLM call. The high-water mark is saved after each
+    batch, so a failure part-way only repeats the batch that failed. With `user`,
+    each batch's tokens are charged to them (and their tenant) in the same commit.
+    """
+    async with AsyncSessionLocal() as db:
+        state = await _load_state(idea_id, db)
+        pending = await _messages_after(idea_id, state, db)
+        overflow = pending[:len(pending) - keep] if keep else pending
+        summary = state.summary if state else ""
+        folded = state.messages_folded if state else 0
+
+        for batch in batch_turns(overflow):
+            summary, tokens = await fold_into_summary(summary, batch, tenant_id)
+            folded += len(batch)
+            last = batch[-1]
+            await db.execute(
+                text("""
+                    INSERT INTO idea_rolling_summaries
+                        (idea_id, summary, last_message_at, last_message_id, messages_folded, updated_at)
+                    VALUES (:idea_id, :summary, :at, :last_id, :folded, NOW())
+                    ON CONFLICT (idea_id) DO UPDATE SET
+                        summary = EXCLUDED.summary,
+                        last_message_at = EXCLUDED.last_message_at,
+                        last_message_id = EXCLUDED.last_message_id,
+                        messages_folded = EXCLUDED.messages_folded,
+                        updated_at = NOW()
+                """),
+                {
+                    "idea_id": str(idea_id),
+                    "summary": summary,
+                    "at": last.created_at,
+                    "last_id": last.id,
+                    "folded": folded
+                }
+            )
+            if user and tokens:
+                await record_token_usage(db, user, idea_id, tokens)
+            await db.commit()
+
+        if overflow:
+            logger.info(f"🧾 Folded {len(overflow)} chat messages into the summary for {idea_id}")
+
+
+def recent_window(turns: List[ChatTurn], recent_turns: int, budget: int) -> List[ChatTurn]:
+    # Newest turns that fit both the turn count and the token budget; the newest
+    # one is always kept, cut down if it alone is over budget.
+    window, used = [], 0
+    for turn in reversed(turns[-recent_turns:] if recent_turns > 0 else []):
+        tokens = _tokens(turn.render())
+        if used + tokens > budget:
+            if not window:
+                window.append(ChatTurn(turn.id, turn.role, turn.message[-budget * 4:], turn.created_at))
+            break
+        window.append(turn)
+        used += tokens
+    return list(reversed(window))
+
+
+async def assemble_context(
+    idea_id,
+    tenant_id: Optional[str],
+    db: AsyncSession,
+    token_budget: int = CHAT_CONTEXT_TOKEN_BUDGET,
+    recent_turns: int = CHAT_CONTEXT_RECENT_TURNS,
+    user: Optional[dict] = None,
+) -> ChatContext:
+    """
+    The idea's chat as the stored rolling summary plus the newest raw turns,
+    sized to `token_budget`. Only messages that no longer fit the raw window are
+    sent to the LLM, and each of them only once: they are folded into the summary
+    and the high-water mark moves past them. Folding tokens are charged to `user`.
+    """
+    state = await _load_state(idea_id, db)
+    pending = await _messages_after(idea_id, state, db)
+    window = recent_window(pending, recent_turns, max(token_budget - CHAT_SUMMARY_MAX_TOKENS, 1))
+
+    if len(window) < len(pending):
+        # Concurrent callers for one idea share a single fold
+        await single_flight.do(
+            f"chat-summary:{idea_id}",
+            lambda: _fold_overflow(idea_id, tenant_id, len(window), user)
+        )
+        state = await _load_state(idea_id, db)
+        pending = await _messages_after(idea_id, state, db)
+        window = recent_window(pending, recent_turns, max(token_budget - CHAT_SUMMARY_MAX_TOKENS, 1))
+
+    return ChatContext(
+        summary=state.summary if state else "",
+        turns=window,
+        folded=state.messages_folded if state else 0,
+    )
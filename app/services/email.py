@@ -5,10 +5,9 @@ from datetime import datetime
 from uuid import uuid4
 
 from msal import ConfidentialClientApplication
-from jinja2 import Template
 from sqlalchemy.orm import Session
 
-from app.models.email_template import EmailTemplate
+from app.services.template_registry import template_registry
 from app.models.email_log import EmailLog
 
 # === ENV CONFIG ===
@@ -47,16 +46,14 @@ def send_template_email(
 ):
     try:
         # 1. Load Template
-        template = db.query(EmailTemplate).filter(
-            EmailTemplate.template_key == template_key
-        ).first()
+        template = template_registry.get_email(template_key, db)
         if not template:
             raise Exception(f"Email template '{template_key}' not found in DB")
 
         # 2. Render Template
         variables.update({"name": name, "email": to_email})
-        subject = Template(template.subject).render(**variables)
-        body = Template(template.html).render(**variables)
+        subject = template.render("subject", **variables)
+        body = template.render("html", **variables)
 
         # 3. Authenticate to Graph
         app = ConfidentialClientApplication(
@@ -1,90 +1,162 @@
+import os
+import json
+import asyncio
 from uuid import uuid4
 from datetime import datetime
 from fastapi import HTTPException
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.ai.prompt_engine import analyze_with_ai, summarize_with_ai
+from app.services.chat_context import ChatTurn, assemble_context
+from app.ai.prompt_engine import analyze_with_ai, analyze_with_panel, summarize_with_ai, ANALYSIS_PANEL_ROLES
 from app.utils.pdf_email import render_pdf, render_docx, send_email_with_attachment
 from app.schemas.idea import IdeaCreate
+from app.services.usage_service import (
+    get_user_usage, estimate_tokens, reserve_tokens, commit_reservation, release_reservation
+)
 
+# "panel": critic, CFO, CMO, CTO… in parallel; "single": the critic alone
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "panel")
 
-def get_idea(id, user, db):
-    result = db.execute(
+
+async def get_idea(id, user, db: AsyncSession):
+    result = (await db.execute(
         text("SELECT * FROM ideas WHERE id = :id AND user_id = :user_id"),
         {"id": str(id), "user_id": user["id"]}
-    ).fetchone()
+    )).fetchone()
     if not result:
         raise HTTPException(status_code=404, detail="Idea not found")
     return result
 
 
-def get_user_plan(user, db):
-    plan = db.execute(
+async def get_user_plan(user, db: AsyncSession):
+    plan = (await db.execute(
         text("SELECT p.max_tokens FROM user_plans p JOIN users u ON u.plan_id = p.id WHERE u.id = :user_id"),
         {"user_id": user["id"]}
-    ).fetchone()
+    )).fetchone()
     if not plan:
         raise HTTPException(status_code=400, detail="User has no assigned plan")
     return plan
 
 
-def get_monthly_usage(user, db):
-    start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    return db.execute(
-        text("SELECT COALESCE(SUM(tokens_used), 0) FROM token_usage WHERE user_id = :user_id AND created_at >= :start"),
-        {"user_id": user["id"], "start": start}
-    ).scalar()
-
-
-async def analyze_idea_logic(id, user, db):
-    idea = get_idea(id, user, db)
-    plan = get_user_plan(user, db)
-    used = get_monthly_usage(user, db)
-
-    result, tokens_used = await analyze_with_ai(idea, plan.max_tokens, used, user, db)
-
-    if used + tokens_used > plan.max_tokens:
-        raise HTTPException(status_code=403, detail="Token quota exceeded")
-
-    db.execute(
-        text("UPDATE ideas SET vetting_response = :result, vetting_status = 'analyzed', tokens_used = :tokens, updated_at = NOW() WHERE id = :id AND user_id = :user_id"),
-        {"result": result, "tokens": tokens_used, "id": str(id), "user_id": user["id"]}
-    )
-
-    db.execute(
-        text("INSERT INTO token_usage (id, user_id, idea_id, tokens_used, created_at) VALUES (:id, :user_id, :idea_id, :tokens_used, NOW())"),
-        {"id": str(uuid4()), "user_id": user["id"], "idea_id": str(id), "tokens_used": tokens_used}
-    )
-
-    # ✅ Insert the analysis into chat log
-    db.execute(text("""
-        INSERT INTO idea_chat_log (id, idea_id, user_id, role, message)
-        VALUES (:id, :idea_id, :user_id, 'assistant', :message)
-    """), {
-        "id": str(uuid4()),
-        "idea_id": str(id),
-        "user_id": user["id"],
-        "message": result
-    })
-
-    # ✅ Trigger summary generation (which will now also log to chat)
-    await summarize_idea(id, user, db)
-
-    db.commit()
-
-    return {
+async def get_monthly_usage(user, db: AsyncSession):
+    return await get_user_usage(db, user["id"])
+
+
+async def analyze_idea_logic(id, user, db: AsyncSession, mode: str = None):
+    idea = await get_idea(id, user, db)
+    plan = await get_user_plan(user, db)
+    used = await get_monthly_usage(user, db)
+    panel_mode = (mode or ANALYSIS_MODE) == "panel"
+
+    prompt_size = " ".join(str(v or "") for v in (idea.title, idea.problem, idea.audience, idea.solution, idea.notes))
+    estimate = estimate_tokens(prompt_size) * (len(ANALYSIS_PANEL_ROLES) if panel_mode else 1)
+    reservation = await reserve_tokens(user, estimate, plan.max_tokens)
+    try:
+        panel = None
+        if panel_mode:
+            panel = await analyze_with_panel(idea, user)
+            answered = {role: member for role, member in panel.items() if member["status"] == "ok"}
+            if not answered:
+                raise HTTPException(status_code=504, detail="No panel role answered in time")
+            result = "\n\n".join(f"### {role.upper()}\n{member['reply']}" for role, member in answered.items())
+            tokens_used = sum(member["tokens"] for member in answered.values())
+            chat_entries = [(role, member["reply"]) for role, member in answered.items()]
+        else:
+            result, tokens_used = await analyze_with_ai(idea, plan.max_tokens, used, user, db)
+            chat_entries = [("assistant", result)]
+
+        # ✅ Summary generation sees the new analysis before it is stored; all LLM work
+        # is done before the writes below, so the transaction stays short.
+        summary, team = await generate_summary(id, user, db, pending=chat_entries)
+
+        # Per-role outcome without the replies; stored so a reused analysis reports it too
+        panel_status = None
+        if panel is not None:
+            panel_status = {
+                role: {k: v for k, v in member.items() if k != "reply"} for role, member in panel.items()
+            }
+
+        await db.execute(
+            text("UPDATE ideas SET vetting_response = :result, vetting_status = 'analyzed', tokens_used = :tokens, vetting_panel = CAST(:panel AS JSONB), updated_at = NOW() WHERE id = :id AND user_id = :user_id"),
+            {
+                "result": result, "tokens": tokens_used, "id": str(id), "user_id": user["id"],
+                "panel": json.dumps(panel_status) if panel_status is not None else None
+            }
+        )
+
+        # ✅ Insert the analysis into chat log (one entry per panel role, so the summary sees who said what)
+        for role, message in chat_entries:
+            await db.execute(text("""
+                INSERT INTO idea_chat_log (id, idea_id, user_id, role, message, created_at)
+                VALUES (:id, :idea_id, :user_id, :role, :message, clock_timestamp())
+            """), {
+                "id": str(uuid4()),
+                "idea_id": str(id),
+                "user_id": user["id"],
+                "role": role,
+                "message": message
+            })
+
+        # ✅ Store the summary (which also logs to chat)
+        await store_summary(id, user, db, summary, team)
+
+        # Counter rows are locked from here to the commit: keep this last
+        await commit_reservation(db, reservation, user, id, tokens_used)
+        await db.commit()
+
+        return _analysis_response(result, tokens_used, plan.max_tokens - used - tokens_used, panel_status)
+    except Exception:
+        await db.rollback()  # drop row locks taken by commit_reservation first
+        await release_reservation(reservation)
+        raise
+
+
+def _analysis_response(result: str, tokens_used: int, tokens_remaining: int, panel_status: dict = None) -> dict:
+    response = {
         "vetting_response": result,
         "vetting_status": "analyzed",
         "tokens_used": tokens_used,
-        "tokens_remaining": plan.max_tokens - used - tokens_used
+        "tokens_remaining": tokens_remaining
     }
-
-
-def create_idea(payload: IdeaCreate, user, db):
+    if panel_status is not None:
+        response["panel"] = panel_status
+        response["partial"] = any(member["status"] != "ok" for member in panel_status.values())
+    return response
+
+
+# 🔁 Reuse hooks for cross-worker single-flight: what a concurrent duplicate stored
+async def get_recent_analysis(id, user, db: AsyncSession, since):
+    row = (await db.execute(
+        text("""SELECT vetting_response, tokens_used, vetting_panel FROM ideas
+        WHERE id = :id AND user_id = :user_id AND vetting_status = 'analyzed'
+        AND updated_at >= CAST(:since AS TIMESTAMPTZ)"""),
+        {"id": str(id), "user_id": user["id"], "since": since}
+    )).fetchone()
+    if not row:
+        return None
+    plan = await get_user_plan(user, db)
+    used = await get_monthly_usage(user, db)
+    return _analysis_response(row.vetting_response, row.tokens_used, plan.max_tokens - used, row.vetting_panel)
+
+
+async def get_recent_summary(id, user, db: AsyncSession, since):
+    row = (await db.execute(
+        text("""SELECT s.summary, s.recommended_team FROM idea_summary s
+        JOIN project_plan p ON p.project_id = s.idea_id
+        WHERE s.idea_id = :id AND s.user_id = :user_id
+        AND p.updated_at >= CAST(:since AS TIMESTAMPTZ)"""),
+        {"id": str(id), "user_id": user["id"], "since": since}
+    )).fetchone()
+    if not row:
+        return None
+    return {"summary": row.summary, "recommended_team": row.recommended_team}
+
+
+async def create_idea(payload: IdeaCreate, user, db: AsyncSession):
     idea_id = str(uuid4())
     now = datetime.utcnow()
-    db.execute(
+    await db.execute(
         text("""INSERT INTO ideas (id, tenant_id, user_id, title, problem, audience, solution, notes, vetting_status, created_at, updated_at)
         VALUES (:id, :tenant_id, :user_id, :title, :problem, :audience, :solution, :notes, 'pending', :created_at, :updated_at)"""),
         {
@@ -100,7 +172,7 @@ def create_idea(payload: IdeaCreate, user, db):
             "updated_at": now
         }
     )
-    db.commit()
+    await db.commit()
     return {
         "id": idea_id,
         "title": payload.title,
@@ -113,8 +185,8 @@ def create_idea(payload: IdeaCreate, user, db):
     }
 
 
-def get_all_ideas(user, db):
-    result = db.execute(
+async def get_all_ideas(user, db: AsyncSession):
+    result = await db.execute(
         text("""
         SELECT i.id, i.title, i.problem, i.audience, i.solution, i.notes, i.vetting_status, i.vetting_response, s.summary
         FROM ideas i
@@ -127,21 +199,21 @@ def get_all_ideas(user, db):
     return [dict(row._mapping) for row in result.fetchall()]
 
 
-def get_idea_detail(id, user, db):
-    result = get_idea(id, user, db)
+async def get_idea_detail(id, user, db: AsyncSession):
+    result = await get_idea(id, user, db)
     return dict(result._mapping)
 
 
-def export_idea_email(id, format_type, user, db):
-    idea = get_idea(id, user, db)
-    messages = db.execute(
+async def export_idea_email(id, format_type, user, db: AsyncSession):
+    idea = await get_idea(id, user, db)
+    messages = (await db.execute(
         text("SELECT role, message FROM idea_chat_log WHERE idea_id = :id AND user_id = :user_id ORDER BY created_at"),
         {"id": str(id), "user_id": user["id"]}
-    ).fetchall()
-    token_used = get_monthly_usage(user, db)
-    plan = get_user_plan(user, db)
-    score = db.execute(text("SELECT viability_score FROM ideas WHERE id = :id AND user_id = :user_id"),
-        {"id": str(id), "user_id": user["id"]}).scalar()
+    )).fetchall()
+    token_used = await get_monthly_usage(user, db)
+    plan = await get_user_plan(user, db)
+    score = (await db.execute(text("SELECT viability_score FROM ideas WHERE id = :id AND user_id = :user_id"),
+        {"id": str(id), "user_id": user["id"]})).scalar()
     data = {
         "idea": idea,
         "messages": [{"role": m.role, "message": m.message} for m in messages],
@@ -151,33 +223,46 @@ def export_idea_email(id, format_type, user, db):
         "date": datetime.utcnow().strftime("%B %d, %Y")
     }
 
+    # Rendering and Graph mail are blocking; keep them off the event loop.
     formats = []
     if format_type in ["pdf", "both"]:
-        formats.append(("PDF", render_pdf(data)))
+        formats.append(("PDF", await asyncio.to_thread(render_pdf, data)))
     if format_type in ["docx", "both"]:
-        formats.append(("DOCX", render_docx(data)))
+        formats.append(("DOCX", await asyncio.to_thread(render_docx, data)))
 
     for label, path in formats:
-        send_email_with_attachment(user["email"], f"📎 Your FounderHub Deep Dive Report ({label})", f"<p>Here’s your Deep Dive summary as a {label}.</p>", path)
+        await asyncio.to_thread(send_email_with_attachment, user["email"], f"📎 Your FounderHub Deep Dive Report ({label})", f"<p>Here’s your Deep Dive summary as a {label}.</p>", path)
 
     return {"detail": f"Deep Dive {format_type.upper()} sent to {user['email']}"}
 
 
-async def summarize_idea(id, user, db):
-    idea = get_idea(id, user, db)
-    chat = db.execute(
-        text("SELECT role, message FROM idea_chat_log WHERE idea_id = :id AND user_id = :user_id ORDER BY created_at"),
-        {"id": str(id), "user_id": user["id"]}
-    ).fetchall()
-    score = db.execute(text("SELECT viability_score FROM ideas WHERE id = :id AND user_id = :user_id"),
-        {"id": str(id), "user_id": user["id"]}).scalar()
+async def summarize_idea(id, user, db: AsyncSession):
+    summary, team = await generate_summary(id, user, db)
+    await store_summary(id, user, db, summary, team)
+    await db.commit()
+    return {"summary": summary, "recommended_team": team}
+
+
+async def generate_summary(id, user, db: AsyncSession, pending=()):
+    """
+    LLM part of summarizing: returns (summary, team) without writing anything.
+    `pending` are (role, message) pairs not yet in the chat log that the summary should cover.
+    """
+    idea = await get_idea(id, user, db)
+    # Only messages not yet in the rolling summary are sent for folding
+    context = await assemble_context(id, user["tenant_id"], db, user=user)
+    context.turns += [ChatTurn("", role, message, None) for role, message in pending]
+    score = (await db.execute(text("SELECT viability_score FROM ideas WHERE id = :id AND user_id = :user_id"),
+        {"id": str(id), "user_id": user["id"]})).scalar()
     
-    summary, team = await summarize_with_ai(idea, chat, score, user, db)
+    return await summarize_with_ai(idea, context.render(), score, user, db)
 
+
+async def store_summary(id, user, db: AsyncSession, summary: str, team: str):
     # ✅ Insert the summary into the chat log
-    db.execute(text("""
-        INSERT INTO idea_chat_log (id, idea_id, user_id, role, message)
-        VALUES (:id, :idea_id, :user_id, 'assistant', :message)
+    await db.execute(text("""
+        INSERT INTO idea_chat_log (id, idea_id, user_id, role, message, created_at)
+        VALUES (:id, :idea_id, :user_id, 'assistant', :message, clock_timestamp())
     """), {
         "id": str(uuid4()),
         "idea_id": str(id),
@@ -185,7 +270,7 @@ async def summarize_idea(id, user, db):
         "message": summary
     })
 
-    db.execute(text("""
+    await db.execute(text("""
         INSERT INTO idea_summary (id, idea_id, user_id, summary, recommended_team)
         VALUES (:id, :idea_id, :user_id, :summary, :team)
         ON CONFLICT (idea_id) DO UPDATE SET
@@ -194,7 +279,7 @@ async def summarize_idea(id, user, db):
     """),
         {"id": str(uuid4()), "idea_id": str(id), "user_id": user["id"], "summary": summary, "team": team})
 
-    db.execute(text("""
+    await db.execute(text("""
         INSERT INTO project_plan (project_id, content_html, created_at, updated_at)
         VALUES (:project_id, :content_html, NOW(), NOW())
         ON CONFLICT (project_id) DO UPDATE SET
@@ -202,6 +287,3 @@ async def summarize_idea(id, user, db):
         updated_at = NOW()
     """),
         {"project_id": str(id), "content_html": summary})
-
-    db.commit()
-    return {"summary": summary, "recommended_team": team}
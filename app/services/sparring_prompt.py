@@ -1,20 +1,20 @@
 from app.models.idea import Idea
-from app.models.sparring_template import SparringTemplate
-from sqlalchemy.orm import Session
-from jinja2 import Template
+from app.services.template_registry import template_registry
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-def get_rendered_prompt(project_id, role, db: Session) -> str:
-    idea = db.query(Idea).filter_by(id=project_id).first()
+async def get_rendered_prompt(project_id, role, db: AsyncSession) -> str:
+    idea = (await db.execute(select(Idea).filter_by(id=project_id))).scalars().first()
     if not idea:
         raise Exception("Idea not found.")
 
-    template = db.query(SparringTemplate).filter_by(role=role.lower()).first()
+    template = await template_registry.get_sparring(role, db)
     if not template:
         raise Exception(f"Sparring prompt for role '{role}' not found.")
 
     try:
-        tpl = Template(template.template_text)
-        return tpl.render(
+        return template.render(
+            "text",
             idea_name=idea.title,  # ✅ Fixed: use `title`
             idea_summary=idea.solution or "No summary provided yet."  # ✅ Use actual field
         )
@@ -0,0 +1,159 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.role_router import ALIAS_WEIGHT, get_role_router
+from app.core.db import AsyncSessionLocal
+from app.models.project_threads import ProjectThread
+from app.services.assistant_service import ensure_assistant_for_role
+from app.utils.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# === Team pre-warm settings
+TEAM_PREWARM_CONCURRENCY = int(os.getenv("TEAM_PREWARM_CONCURRENCY", 4))
+TEAM_MAX_ROLES = int(os.getenv("TEAM_MAX_ROLES", 8))
+
+# Per (project, user): {role: {"state": pending|warming|ready|failed, "error": ..., "seconds": ...}}
+_status: Dict[str, Dict[str, dict]] = {}
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _team_key(project_id, user: dict) -> str:
+    return f"{project_id}:{user['id']}"
+
+
+def parse_recommended_team(team_text: Optional[str]) -> List[str]:
+    """
+    Role names from the "Recommended Team" section of a summary, e.g.
+    "- **CMO** – owns GTM" or "2. Growth Hacker: runs experiments".
+    Names are mapped onto catalog roles where the role router recognises them.
+    The CEO is always part of the team.
+    """
+    roles = ["ceo"]
+    router = get_role_router()
+    for line in (team_text or "").splitlines():
+        line = line.strip()
+        if not re.match(r"^([-*•]|\d+[.)])\s+", line):
+            continue
+        line = re.sub(r"^([-*•]|\d+[.)])\s+", "", line)
+        bold = re.search(r"\*\*(.+?)\*\*", line)
+        name = bold.group(1) if bold else re.split(r"\s[–—-]\s|:|\(", line, maxsplit=1)[0]
+        name = re.sub(r"[*_`:]", "", name).strip().lower()
+        if not name or len(name.split()) > 5:
+            continue
+
+        match = router.best(name)
+        role = match.role if match and match.score >= ALIAS_WEIGHT else name
+        if role not in roles:
+            roles.append(role)
+    return roles[:TEAM_MAX_ROLES]
+
+
+async def ensure_team_role(project_id, role: str, user: dict) -> str:
+    """
+    Assistant and thread for one role, on its own session. Shares a single flight
+    with the background pre-warm, so a request that needs the role now and the
+    pre-warm never set it up twice.
+    """
+    # AsyncSession is not safe for concurrent use: one per role.
+    async with AsyncSessionLocal() as db:
+        return await single_flight.do(
+            f"team:{project_id}:{user['id']}:{role}",
+            lambda: ensure_assistant_for_role(project_id, role, user, db)
+        )
+
+
+async def _warm_role(project_id, role: str, user: dict, semaphore: asyncio.Semaphore, status: Dict[str, dict]):
+    async with semaphore:
+        status[role] = {"state": "warming"}
+        started = time.perf_counter()
+        try:
+            await ensure_team_role(project_id, role, user)
+            status[role] = {"state": "ready", "seconds": round(time.perf_counter() - started, 2)}
+        except Exception as e:
+            logger.warning(f"⚠️ Pre-warm of {role} for {project_id} failed: {e}")
+            status[role] = {"state": "failed", "error": str(e)}
+
+
+async def prewarm_team(project_id, user: dict, roles: List[str]) -> Dict[str, dict]:
+    """
+    Creates (or loads) the assistant and thread for every role concurrently,
+    at most TEAM_PREWARM_CONCURRENCY at a time. Roles already set up are no-ops.
+    """
+    status = _status.setdefault(_team_key(project_id, user), {})
+    for role in roles:
+        status.setdefault(role, {"state": "pending"})
+
+    semaphore = asyncio.Semaphore(TEAM_PREWARM_CONCURRENCY)
+    await asyncio.gather(*(_warm_role(project_id, role, user, semaphore, status) for role in roles))
+    logger.info(f"✅ Team pre-warmed for {project_id}: {', '.join(roles)}")
+    return status
+
+
+def start_team_prewarm(project_id, user: dict, team_text: Optional[str]) -> Dict[str, dict]:
+    """
+    Starts prewarm_team in the background and returns its live status. While a
+    pre-warm for the project is running, calling again returns that one. Its
+    entries are dropped once it finishes; the stored threads say what is ready.
+    """
+    key = _team_key(project_id, user)
+    task = _tasks.get(key)
+    if task is None or task.done():
+        roles = parse_recommended_team(team_text)
+        task = asyncio.create_task(prewarm_team(project_id, user, roles))
+        task.add_done_callback(lambda t: _forget(key, t))
+        _tasks[key] = task
+        _status[key] = {role: {"state": "pending"} for role in roles}
+    return _status[key]
+
+
+def _forget(key: str, task: asyncio.Task):
+    task.cancelled() or task.exception()  # mark any exception as retrieved
+    if _tasks.get(key) is task:
+        del _tasks[key]
+        _status.pop(key, None)
+
+
+async def get_recommended_team(project_id, user: dict, db: AsyncSession) -> Optional[str]:
+    return (await db.execute(
+        text("SELECT recommended_team FROM idea_summary WHERE idea_id = :id AND user_id = :user_id"),
+        {"id": str(project_id), "user_id": user["id"]}
+    )).scalar()
+
+
+async def get_team_status(project_id, user: dict, db: AsyncSession) -> dict:
+    """
+    Per-role state. Roles with a stored thread are "ready" whichever worker
+    created them; the in-process status adds warming/failed detail.
+    """
+    roles = parse_recommended_team(await get_recommended_team(project_id, user, db))
+    threads = (await db.execute(select(ProjectThread).filter_by(
+        project_id=project_id,
+        tenant_id=user["tenant_id"],
+        user_id=user["id"]
+    ))).scalars().all()
+    ready = {t.role: t.assistant_id for t in threads}
+
+    live = _status.get(_team_key(project_id, user), {})
+    team = {}
+    for role in dict.fromkeys(roles + list(ready) + list(live)):
+        if role in ready:
+            team[role] = {**live.get(role, {}), "state": "ready", "assistant_id": ready[role]}
+        else:
+            team[role] = live.get(role, {"state": "pending"})
+
+    task = _tasks.get(_team_key(project_id, user))
+    return {
+        "project_id": str(project_id),
+        "running": bool(task and not task.done()),
+        "ready": sum(1 for s in team.values() if s["state"] == "ready"),
+        "total": len(team),
+        "roles": team,
+    }
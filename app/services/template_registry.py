@@ -0,0 +1,154 @@
+import os
+import time
+import hashlib
+import logging
+from typing import Dict, Optional, Tuple
+
+from jinja2 import Environment, Template
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionLocal
+from app.models.sparring_template import SparringTemplate
+from app.models.email_template import EmailTemplate
+
+logger = logging.getLogger(__name__)
+
+# === Template cache settings
+# Rows are re-read after this long so edits made straight in the DB (or on another
+# worker) show up; unchanged text keeps its compiled template.
+TEMPLATE_CACHE_TTL = float(os.getenv("TEMPLATE_CACHE_TTL_SECONDS", 300))
+
+SPARRING, EMAIL = "sparring", "email"
+
+_env = Environment()
+
+
+class CompiledTemplate:
+    """
+    One template row. `version` is a hash of its source fields; each field is
+    parsed once, on first render, and reused until the version changes.
+    """
+
+    def __init__(self, kind: str, key: str, sources: Dict[str, str]):
+        self.kind = kind
+        self.key = key
+        self.sources = sources
+        self.version = hashlib.sha1(
+            "\x00".join(f"{name}={text}" for name, text in sorted(sources.items())).encode()
+        ).hexdigest()
+        self._compiled: Dict[str, Template] = {}
+
+    def template(self, field: str) -> Template:
+        if field not in self._compiled:
+            self._compiled[field] = _env.from_string(self.sources[field])
+        return self._compiled[field]
+
+    def render(self, field: str, **variables) -> str:
+        return self.template(field).render(**variables)
+
+
+class TemplateRegistry:
+    """
+    Process-wide cache of sparring and email templates, keyed by (kind, key).
+    A missing row is cached too, so roles without a template skip the lookup.
+    """
+
+    def __init__(self, ttl: float = TEMPLATE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, str], Tuple[float, Optional[CompiledTemplate]]] = {}
+        self.hits = 0
+        self.loads = 0
+
+    def _cached(self, kind: str, key: str):
+        entry = self._entries.get((kind, key))
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            self.hits += 1
+            return True, entry[1]
+        return False, None
+
+    def _store(self, kind: str, key: str, sources: Optional[Dict[str, str]]) -> Optional[CompiledTemplate]:
+        self.loads += 1
+        previous = self._entries.get((kind, key))
+        template = None
+        if sources is not None:
+            template = CompiledTemplate(kind, key, sources)
+            if previous and previous[1] and previous[1].version == template.version:
+                template = previous[1]  # unchanged: keep the parsed templates
+        self._entries[(kind, key)] = (time.monotonic(), template)
+        return template
+
+    # === Sparring templates (keyed by lower-case role)
+    async def get_sparring(self, role: str, db: AsyncSession) -> Optional[CompiledTemplate]:
+        role = role.lower()
+        found, template = self._cached(SPARRING, role)
+        if found:
+            return template
+        row = (await db.execute(select(SparringTemplate).filter_by(role=role))).scalars().first()
+        return self._store(SPARRING, role, {"text": row.template_text} if row else None)
+
+    def get_sparring_sync(self, role: str, db: Session) -> Optional[CompiledTemplate]:
+        role = role.lower()
+        found, template = self._cached(SPARRING, role)
+        if found:
+            return template
+        row = db.query(SparringTemplate).filter_by(role=role).first()
+        return self._store(SPARRING, role, {"text": row.template_text} if row else None)
+
+    # === Email templates (keyed by template_key)
+    def get_email(self, template_key: str, db: Session) -> Optional[CompiledTemplate]:
+        found, template = self._cached(EMAIL, template_key)
+        if found:
+            return template
+        row = db.query(EmailTemplate).filter(EmailTemplate.template_key == template_key).first()
+        return self._store(EMAIL, template_key, {"subject": row.subject, "html": row.html} if row else None)
+
+    async def preload(self):
+        """
+        Bulk-loads and compiles every template in two queries (called at startup).
+        """
+        try:
+            async with AsyncSessionLocal() as db:
+                sparring = (await db.execute(select(SparringTemplate))).scalars().all()
+                emails = (await db.execute(select(EmailTemplate))).scalars().all()
+        except Exception as e:
+            # Not fatal: templates then load lazily on first use
+            logger.warning(f"⚠️ Template preload failed: {e}")
+            return
+
+        loaded = [self._store(SPARRING, row.role.lower(), {"text": row.template_text}) for row in sparring]
+        loaded += [
+            self._store(EMAIL, row.template_key, {"subject": row.subject, "html": row.html}) for row in emails
+        ]
+        for template in loaded:
+            for field in template.sources:
+                try:
+                    template.template(field)
+                except Exception as e:
+                    # Left for the caller's own fallback at render time
+                    logger.warning(f"⚠️ Template {template.kind}:{template.key} ({field}) does not compile: {e}")
+        logger.info(f"✅ Preloaded {len(sparring)} sparring and {len(emails)} email templates")
+
+    def invalidate(self, kind: Optional[str] = None, key: Optional[str] = None):
+        """
+        Drops cached rows so the next use reloads them; call after updating a template.
+        """
+        if kind is None:
+            self._entries.clear()
+        elif key is None:
+            for cached_kind, cached_key in list(self._entries):
+                if cached_kind == kind:
+                    del self._entries[(cached_kind, cached_key)]
+        else:
+            self._entries.pop((kind, key.lower() if kind == SPARRING else key), None)
+
+    def metrics(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "loads": self.loads,
+        }
+
+
+template_registry = TemplateRegistry()
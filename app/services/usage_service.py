@@ -0,0 +1,180 @@
+import os
+from uuid import uuid4
+from dataclasses import dataclass
+from datetime import datetime, date, timedelta
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db import AsyncSessionLocal
+
+# === Reservation settings
+DEFAULT_COMPLETION_TOKENS = int(os.getenv("TOKEN_RESERVE_COMPLETION", 800))
+RESERVATION_TTL_SECONDS = int(os.getenv("TOKEN_RESERVATION_TTL_SECONDS", 900))
+
+
+def current_period() -> date:
+    return datetime.utcnow().date().replace(day=1)
+
+
+# ✅ Ledger row + both monthly counters; the caller's commit makes it atomic
+async def record_token_usage(db: AsyncSession, user: dict, idea_id, tokens_used: int):
+    await db.execute(
+        text("INSERT INTO token_usage (id, user_id, idea_id, tokens_used, created_at) VALUES (:id, :user_id, :idea_id, :tokens_used, NOW())"),
+        {"id": str(uuid4()), "user_id": user["id"], "idea_id": str(idea_id), "tokens_used": tokens_used}
+    )
+    await db.execute(text("""
+        INSERT INTO token_usage_counters (scope, scope_id, period, tokens_used, reserved_tokens, updated_at)
+        VALUES
+            ('user', :user_id, :period, :tokens_used, 0, NOW()),
+            ('tenant', :tenant_id, :period, :tokens_used, 0, NOW())
+        ON CONFLICT (scope, scope_id, period) DO UPDATE SET
+        tokens_used = token_usage_counters.tokens_used + EXCLUDED.tokens_used,
+        updated_at = NOW()
+    """), {
+        "user_id": str(user["id"]),
+        "tenant_id": str(user["tenant_id"]),
+        "period": current_period(),
+        "tokens_used": tokens_used
+    })
+
+
+async def _get_counter(db: AsyncSession, scope: str, scope_id: str, period: date | None) -> int:
+    used = (await db.execute(
+        text("SELECT tokens_used FROM token_usage_counters WHERE scope = :scope AND scope_id = :scope_id AND period = :period"),
+        {"scope": scope, "scope_id": str(scope_id), "period": period or current_period()}
+    )).scalar()
+    return used or 0
+
+
+async def get_user_usage(db: AsyncSession, user_id: str, period: date | None = None) -> int:
+    return await _get_counter(db, "user", user_id, period)
+
+
+async def get_tenant_usage(db: AsyncSession, tenant_id: str, period: date | None = None) -> int:
+    return await _get_counter(db, "tenant", tenant_id, period)
+
+
+def estimate_tokens(prompt: str, completion_tokens: int = DEFAULT_COMPLETION_TOKENS) -> int:
+    # ~4 characters per token for English prose, plus the expected reply.
+    return len(prompt or "") // 4 + completion_tokens
+
+
+@dataclass
+class TokenReservation:
+    id: str
+    user_id: str
+    period: date
+    tokens: int
+
+
+# 🔒 Hold budget before the LLM call; 403 if it would push the user over quota
+async def reserve_tokens(user: dict, tokens: int, max_tokens: int) -> TokenReservation:
+    reservation = TokenReservation(str(uuid4()), str(user["id"]), current_period(), tokens)
+    params = {
+        "user_id": reservation.user_id,
+        "period": reservation.period,
+        "tokens": tokens,
+        "max_tokens": max_tokens
+    }
+
+    # Own short transaction, so concurrent requests see the hold immediately.
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("""
+            INSERT INTO token_usage_counters (scope, scope_id, period, tokens_used, reserved_tokens, updated_at)
+            VALUES ('user', :user_id, :period, 0, 0, NOW())
+            ON CONFLICT (scope, scope_id, period) DO NOTHING
+        """), params)
+        held = (await db.execute(text("""
+            UPDATE token_usage_counters
+            SET reserved_tokens = reserved_tokens + :tokens, updated_at = NOW()
+            WHERE scope = 'user' AND scope_id = :user_id AND period = :period
+              AND tokens_used + reserved_tokens + :tokens <= :max_tokens
+            RETURNING tokens_used
+        """), params)).fetchone()
+
+        if not held:
+            await db.rollback()
+            raise HTTPException(status_code=403, detail="Token quota exceeded")
+
+        await db.execute(text("""
+            INSERT INTO token_reservations (id, user_id, period, tokens, created_at)
+            VALUES (:id, :user_id, :period, :tokens, NOW())
+        """), {**params, "id": reservation.id})
+        await db.commit()
+
+    return reservation
+
+
+async def _drop_reservation(db: AsyncSession, reservation: TokenReservation):
+    # Deleting the row first makes commit/release idempotent.
+    held = (await db.execute(
+        text("DELETE FROM token_reservations WHERE id = :id RETURNING tokens"),
+        {"id": reservation.id}
+    )).scalar()
+    if held:
+        await db.execute(text("""
+            UPDATE token_usage_counters
+            SET reserved_tokens = GREATEST(reserved_tokens - :tokens, 0), updated_at = NOW()
+            WHERE scope = 'user' AND scope_id = :user_id AND period = :period
+        """), {"tokens": held, "user_id": reservation.user_id, "period": reservation.period})
+
+
+# ✅ Swap the hold for real usage; the caller's commit makes it atomic
+async def commit_reservation(db: AsyncSession, reservation: TokenReservation, user: dict, idea_id, tokens_used: int):
+    await _drop_reservation(db, reservation)
+    await record_token_usage(db, user, idea_id, tokens_used)
+
+
+# ❌ Give the hold back after a failed call
+async def release_reservation(reservation: TokenReservation):
+    async with AsyncSessionLocal() as db:
+        await _drop_reservation(db, reservation)
+        await db.commit()
+
+
+# 🔁 Rebuild a period's counters from the token_usage ledger
+def reconcile_usage_counters(db: Session, period: date | None = None) -> int:
+    period = period or current_period()
+    start = datetime(period.year, period.month, 1)
+    end = datetime(period.year + (period.month == 12), period.month % 12 + 1, 1)
+
+    # Blocks concurrent counter upserts until commit, so no increment made
+    # while the ledger is being summed can be overwritten.
+    db.execute(text("LOCK TABLE token_usage_counters IN SHARE ROW EXCLUSIVE MODE"))
+    db.execute(text("DELETE FROM token_usage_counters WHERE period = :period"), {"period": period})
+    db.execute(
+        text("DELETE FROM token_reservations WHERE created_at < :cutoff"),
+        {"cutoff": datetime.utcnow() - timedelta(seconds=RESERVATION_TTL_SECONDS)}
+    )
+    db.execute(text("""
+        INSERT INTO token_usage_counters (scope, scope_id, period, tokens_used, reserved_tokens, updated_at)
+        SELECT 'user', CAST(t.user_id AS TEXT), :period, SUM(t.tokens_used), 0, NOW()
+        FROM token_usage t
+        WHERE t.created_at >= :start AND t.created_at < :end
+        GROUP BY t.user_id
+    """), {"period": period, "start": start, "end": end})
+    db.execute(text("""
+        INSERT INTO token_usage_counters (scope, scope_id, period, tokens_used, reserved_tokens, updated_at)
+        SELECT 'tenant', CAST(u.tenant_id AS TEXT), :period, SUM(t.tokens_used), 0, NOW()
+        FROM token_usage t
+        JOIN users u ON CAST(u.id AS TEXT) = CAST(t.user_id AS TEXT)
+        WHERE t.created_at >= :start AND t.created_at < :end
+        GROUP BY u.tenant_id
+    """), {"period": period, "start": start, "end": end})
+    # Holds from requests still in flight survive the rebuild.
+    db.execute(text("""
+        INSERT INTO token_usage_counters (scope, scope_id, period, tokens_used, reserved_tokens, updated_at)
+        SELECT 'user', r.user_id, :period, 0, SUM(r.tokens), NOW()
+        FROM token_reservations r
+        WHERE r.period = :period
+        GROUP BY r.user_id
+        ON CONFLICT (scope, scope_id, period) DO UPDATE SET
+        reserved_tokens = EXCLUDED.reserved_tokens
+    """), {"period": period})
+    rows = db.execute(
+        text("SELECT COUNT(*) FROM token_usage_counters WHERE period = :period"),
+        {"period": period}
+    ).scalar()
+    db.commit()
+    return rows
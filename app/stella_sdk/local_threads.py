@@ -0,0 +1,179 @@
+import os
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+from uuid import uuid4
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.llm_gateway import stream_chat
+from app.core.db import AsyncSessionLocal
+from app.models.local_thread import LocalThread
+from app.services.assistant_service import ASSISTANT_MODEL, generate_instructions_by_role
+from app.services.chat_context import (
+    CHAT_SUMMARY_MAX_TOKENS, ChatTurn, batch_turns, fold_into_summary, recent_window
+)
+from app.services.usage_service import estimate_tokens, record_token_usage
+from app.utils.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# === Local thread settings
+LOCAL_THREAD_MODEL = os.getenv("LOCAL_THREAD_MODEL", ASSISTANT_MODEL)
+# Whole request: system prompt + summary + recent turns + the new message.
+LOCAL_THREAD_TOKEN_BUDGET = int(os.getenv("LOCAL_THREAD_TOKEN_BUDGET", 8000))
+LOCAL_THREAD_RECENT_TURNS = int(os.getenv("LOCAL_THREAD_RECENT_TURNS", 20))
+LOCAL_THREAD_MAX_REPLY_TOKENS = int(os.getenv("LOCAL_THREAD_MAX_REPLY_TOKENS", 2048))
+
+LOCAL_PREFIX = "local_"
+
+
+def is_local_thread(thread_id: Optional[str]) -> bool:
+    return bool(thread_id) and thread_id.startswith(LOCAL_PREFIX)
+
+
+def _tokens(value: str) -> int:
+    return estimate_tokens(value, completion_tokens=0)
+
+
+async def _load_thread(thread_id: str, db: AsyncSession) -> LocalThread:
+    thread = (await db.execute(select(LocalThread).filter_by(id=thread_id))).scalars().first()
+    if not thread:
+        raise Exception("No thread found for this assistant")
+    return thread
+
+
+async def _turns_after(thread: LocalThread, db: AsyncSession) -> List[ChatTurn]:
+    if thread.summarized_until is not None:
+        where = "AND (created_at > :at OR (created_at = :at AND id::text > :last_id))"
+        params = {"at": thread.summarized_until, "last_id": thread.summarized_turn_id or ""}
+    else:
+        where, params = "", {}
+    rows = (await db.execute(
+        text(f"""
+            SELECT id, speaker, content, created_at
+            FROM local_thread_turns
+            WHERE thread_id = :thread_id {where}
+            ORDER BY created_at, id::text
+        """),
+        {"thread_id": thread.id, **params}
+    )).fetchall()
+    return [ChatTurn(str(r.id), r.speaker, r.content, r.created_at) for r in rows]
+
+
+async def _fold_overflow(thread_id: str, tenant_id: Optional[str], keep: int) -> None:
+    # Same scheme as chat_context: fold all but the newest `keep` turns, saving per batch.
+    async with AsyncSessionLocal() as db:
+        thread = await _load_thread(thread_id, db)
+        pending = await _turns_after(thread, db)
+        overflow = pending[:len(pending) - keep] if keep else pending
+        for batch in batch_turns(overflow):
+            thread.summary, tokens = await fold_into_summary(thread.summary or "", batch, tenant_id)
+            thread.summarized_until = batch[-1].created_at
+            thread.summarized_turn_id = batch[-1].id
+            if tokens:
+                owner = {"id": str(thread.user_id), "tenant_id": str(thread.tenant_id)}
+                await record_token_usage(db, owner, thread.project_id, tokens)
+            await db.commit()
+        if overflow:
+            logger.info(f"🧾 Folded {len(overflow)} turns of {thread_id} into its summary")
+
+
+async def build_window(
+    thread_id: str, message: str, tenant_id: Optional[str], additional_instructions: str = None
+) -> List[dict]:
+    """
+    Chat-completion messages for the next turn: the role's system prompt (plus any
+    additional instructions and the thread summary), the newest turns that fit
+    LOCAL_THREAD_TOKEN_BUDGET, then `message`. Older turns are folded into the
+    summary once and never re-sent.
+    """
+    async with AsyncSessionLocal() as db:
+        thread = await _load_thread(thread_id, db)
+        system = await generate_instructions_by_role(thread.role, db, str(thread.project_id))
+        if additional_instructions:
+            system += f"\n\n{additional_instructions}"
+
+        budget = max(
+            LOCAL_THREAD_TOKEN_BUDGET - _tokens(system) - _tokens(message) - CHAT_SUMMARY_MAX_TOKENS, 1
+        )
+        pending = await _turns_after(thread, db)
+        window = recent_window(pending, LOCAL_THREAD_RECENT_TURNS, budget)
+        if len(window) < len(pending):
+            await single_flight.do(
+                f"local-thread-summary:{thread_id}",
+                lambda: _fold_overflow(thread_id, tenant_id, len(window))
+            )
+            db.expire_all()
+            thread = await _load_thread(thread_id, db)
+            pending = await _turns_after(thread, db)
+            window = recent_window(pending, LOCAL_THREAD_RECENT_TURNS, budget)
+
+    if thread.summary:
+        system += f"\n\nSummary of the conversation so far:\n{thread.summary}"
+    return [
+        {"role": "system", "content": system},
+        *({"role": turn.role, "content": turn.message} for turn in window),
+        {"role": "user", "content": message},
+    ]
+
+
+async def _save_exchange(thread_id: str, message: str, reply: str, asked_at: datetime, tokens: int):
+    # Explicit timestamps: both rows in one transaction would otherwise share NOW().
+    async with AsyncSessionLocal() as db:
+        for speaker, content, at, used in (
+            ("user", message, asked_at, None),
+            ("assistant", reply, datetime.now(timezone.utc), tokens or None),
+        ):
+            await db.execute(
+                text("""
+                    INSERT INTO local_thread_turns (id, thread_id, speaker, content, tokens, created_at)
+                    VALUES (:id, :thread_id, :speaker, :content, :tokens, :created_at)
+                """),
+                {"id": str(uuid4()), "thread_id": thread_id, "speaker": speaker,
+                 "content": content, "tokens": used, "created_at": at}
+            )
+        await db.execute(
+            text("UPDATE local_threads SET updated_at = NOW() WHERE id = :id"), {"id": thread_id}
+        )
+        await db.commit()
+
+
+async def stream_local(
+    thread_id: str, message: str, tenant_id: Optional[str] = None, additional_instructions: str = None
+):
+    """
+    Same event contract as runner.stream_assistant: ("delta", text) fragments, then
+    ("done", total_tokens). The exchange is stored only once the reply is complete,
+    so a failed call leaves the thread as it was.
+    """
+    asked_at = datetime.now(timezone.utc)
+    messages = await build_window(thread_id, message, tenant_id, additional_instructions)
+
+    chunks = []
+    async for kind, value in stream_chat(
+        messages,
+        model=LOCAL_THREAD_MODEL,
+        max_tokens=LOCAL_THREAD_MAX_REPLY_TOKENS,
+        tenant_id=tenant_id
+    ):
+        if kind == "delta":
+            chunks.append(value)
+            yield kind, value
+        else:
+            await _save_exchange(thread_id, message, "".join(chunks).strip(), asked_at, value)
+            yield "done", value or None
+
+
+async def run_local(
+    thread_id: str, message: str, tenant_id: Optional[str] = None, additional_instructions: str = None
+) -> tuple[str, Optional[int]]:
+    # (reply, total_tokens or None)
+    chunks, tokens = [], None
+    async for kind, value in stream_local(thread_id, message, tenant_id, additional_instructions):
+        if kind == "delta":
+            chunks.append(value)
+        else:
+            tokens = value
+    return "".join(chunks).strip(), tokens
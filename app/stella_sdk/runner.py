@@ -1,9 +1,151 @@
 from app.models.project_threads import ProjectThread
-from sqlalchemy.orm import Session
-from openai import AsyncOpenAI
+from app.ai.llm_gateway import get_client
+from app.utils.rate_limiter import llm_slot
+from app.services.assistant_service import is_pooled_assistant, project_context_instructions
+from app.stella_sdk.local_threads import is_local_thread, run_local, stream_local
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# === Run settings
+RUN_STREAMING = os.getenv("ASSISTANT_RUN_STREAMING", "1") == "1"
+RUN_DEADLINE = float(os.getenv("ASSISTANT_RUN_DEADLINE", 120))
+POLL_INITIAL = float(os.getenv("ASSISTANT_POLL_INITIAL", 0.25))
+POLL_MAX = float(os.getenv("ASSISTANT_POLL_MAX", 2.0))
+POLL_BACKOFF = float(os.getenv("ASSISTANT_POLL_BACKOFF", 1.6))
+
+TERMINAL_FAILURES = ("failed", "cancelled", "expired", "incomplete", "requires_action")
+
+
+class AssistantRunError(Exception):
+    def __init__(self, status: str, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AssistantRunTimeout(AssistantRunError):
+    pass
+
+
+class AssistantReply(tuple):
+    """
+    (reply, thread_id), so existing `reply, thread_id = await run_assistant(...)`
+    callers keep working, plus the run's reported usage as `total_tokens`
+    (None if the API did not report it).
+    """
+
+    def __new__(cls, reply: str, thread_id: str, total_tokens: int = None):
+        result = super().__new__(cls, (reply, thread_id))
+        result.total_tokens = total_tokens
+        return result
+
+
+def _run_tokens(run):
+    return run.usage.total_tokens if run.usage else None
+
+
+async def get_thread_id(project_id: str, role: str, tenant_id: str, user_id: str, db: AsyncSession) -> str:
+    thread = (await db.execute(select(ProjectThread).filter_by(
+        project_id=project_id,
+        role=role,
+        tenant_id=tenant_id,
+        user_id=user_id
+    ))).scalars().first()
+
+    if not thread:
+        raise Exception("No thread found for this assistant")
+
+    return thread.thread_id
+
+
+def _message_text(message) -> str:
+    return "\n".join(
+        part.text.value for part in message.content if part.type == "text"
+    ).strip()
+
+
+async def _run_events(thread_id: str, assistant_id: str, additional_instructions: str = None):
+    """
+    Starts a streamed run and yields ("run", run_id), ("delta", text),
+    ("message", full_text) and finally ("done", total_tokens or None).
+    """
+    stream = await get_client().beta.threads.runs.create(
+        thread_id=thread_id,
+        assistant_id=assistant_id,
+        additional_instructions=additional_instructions,
+        stream=True
+    )
+
+    async for event in stream:
+        if event.event == "thread.run.created":
+            yield "run", event.data.id
+        elif event.event == "thread.message.delta":
+            for part in event.data.delta.content or []:
+                if part.type == "text" and part.text and part.text.value:
+                    yield "delta", part.text.value
+        elif event.event == "thread.message.completed":
+            yield "message", _message_text(event.data)
+        elif event.event == "thread.run.completed":
+            usage = event.data.usage
+            yield "done", usage.total_tokens if usage else None
+            return
+        elif event.event in ("thread.run.failed", "thread.run.cancelled", "thread.run.expired",
+                             "thread.run.incomplete", "thread.run.requires_action"):
+            status = event.data.status
+            detail = event.data.last_error.message if event.data.last_error else status
+            raise AssistantRunError(status, f"Assistant run {status}: {detail}")
+        elif event.event == "error":
+            raise Exception(f"Assistant stream error: {event.data}")
+
+    raise ConnectionError("Assistant stream ended before the run completed")
+
+
+async def _wait_for_run(thread_id: str, run_id: str, deadline: float):
+    """
+    Polls with exponential backoff (POLL_INITIAL → POLL_MAX) until the run is
+    terminal; cancels it and raises AssistantRunTimeout once `deadline` passes.
+    """
+    client = get_client()
+    loop = asyncio.get_running_loop()
+    delay = POLL_INITIAL
+    while True:
+        run = await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+        if run.status == "completed":
+            return run
+        if run.status in TERMINAL_FAILURES:
+            detail = run.last_error.message if run.last_error else run.status
+            raise AssistantRunError(run.status, f"Assistant run {run.status}: {detail}")
+
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            await _cancel_run(thread_id, run_id)
+            raise AssistantRunTimeout(run.status, f"Assistant run still {run.status} at its deadline; cancelled")
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * POLL_BACKOFF, POLL_MAX)
+
+
+async def _cancel_run(thread_id: str, run_id: str):
+    try:
+        await get_client().beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not cancel run {run_id}: {e}")
+
+
+async def _run_reply(thread_id: str, run_id: str) -> str:
+    # Only messages produced by this run; never an older reply on the thread.
+    messages = await get_client().beta.threads.messages.list(
+        thread_id=thread_id, run_id=run_id, order="desc", limit=10
+    )
+    for msg in messages.data:
+        if msg.role == "assistant":
+            return _message_text(msg)
+
+    raise AssistantRunError("completed", "No assistant message found")
 
-client = AsyncOpenAI()
 
 async def run_assistant(
     project_id: str,
@@ -12,22 +154,56 @@ async def run_assistant(
     assistant_id: str,
     tenant_id: str,
     user_id: str,
-    db: Session,
+    db: AsyncSession,
     system_message: str = None,  # KEEP THIS PARAM but don't use it here
-    stream: bool = False
-) -> tuple[str, str]:
-    # Fetch thread_id from DB
-    thread = db.query(ProjectThread).filter_by(
-        project_id=project_id,
-        role=role,
-        tenant_id=tenant_id,
-        user_id=user_id
-    ).first()
+    stream: bool = None,
+    additional_instructions: str = None,
+    deadline: float = None
+) -> AssistantReply:
+    """
+    Runs the role's assistant on its project thread and returns (reply, thread_id);
+    the run's token usage is on the result's `total_tokens`.
 
-    if not thread:
-        raise Exception("No thread found for this assistant")
+    By default the run is streamed and completes on its own events. If the stream
+    drops, or `stream=False`, the run is polled with adaptive backoff instead.
+    Either way it is bounded by `deadline` seconds (ASSISTANT_RUN_DEADLINE by
+    default): a run still going then is cancelled and AssistantRunTimeout raised.
+    The run is also cancelled if the caller is. It holds a slot on the
+    "openai:assistants" limiter lane (falls back to "openai") while it runs.
+
+    Pooled role assistants are shared across projects, so the project context is
+    attached to the run as `additional_instructions` (loaded here if not given).
+
+    Threads created with CONVERSATION_BACKEND=local are answered by chat completions
+    over a token-budgeted window of the locally stored turns instead.
+    """
+    deadline = deadline or RUN_DEADLINE
+    thread_id = await get_thread_id(project_id, role, tenant_id, user_id, db)
+    if is_local_thread(thread_id):
+        try:
+            reply, tokens = await asyncio.wait_for(
+                run_local(thread_id, message, tenant_id, additional_instructions), timeout=deadline
+            )
+        except asyncio.TimeoutError:
+            raise AssistantRunTimeout("in_progress", f"Local run did not finish within {deadline:.0f}s")
+        return AssistantReply(reply, thread_id, tokens)
+
+    if additional_instructions is None and await is_pooled_assistant(assistant_id, db):
+        additional_instructions = await project_context_instructions(project_id, db)
 
-    thread_id = thread.thread_id
+    async with llm_slot("openai", tenant_id, tokens=len(message) // 4 + 1000, model="assistants") as permit:
+        result = await _execute_run(thread_id, assistant_id, message, stream, additional_instructions, deadline)
+        permit.settle(result.total_tokens or 0)
+        return result
+
+
+async def _execute_run(
+    thread_id: str, assistant_id: str, message: str, stream: bool = None,
+    additional_instructions: str = None, seconds: float = RUN_DEADLINE
+) -> AssistantReply:
+    client = get_client()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
 
     # Add the message to the thread
     await client.beta.threads.messages.create(
@@ -36,27 +212,112 @@ async def run_assistant(
         content=message
     )
 
-    run = await client.beta.threads.runs.create(
-        thread_id=thread_id,
-        assistant_id=assistant_id
-    )
+    run_id = None
+    replies = []
+    tokens = None
 
-    # Poll until complete
-    for _ in range(30):
-        run_status = await client.beta.threads.runs.retrieve(
-            thread_id=thread_id,
-            run_id=run.id
-        )
-        if run_status.status == "completed":
-            break
-        elif run_status.status == "failed":
-            raise Exception("Assistant run failed")
-        await asyncio.sleep(1)
+    async def consume() -> str:
+        nonlocal run_id, tokens
+        async for kind, value in _run_events(thread_id, assistant_id, additional_instructions):
+            if kind == "run":
+                run_id = value
+            elif kind == "message" and value:
+                replies.append(value)
+            elif kind == "done":
+                tokens = value
+        return "\n\n".join(replies)
 
-    messages = await client.beta.threads.messages.list(thread_id=thread_id)
+    try:
+        if not (RUN_STREAMING if stream is None else stream):
+            run = await client.beta.threads.runs.create(
+                thread_id=thread_id, assistant_id=assistant_id, additional_instructions=additional_instructions
+            )
+            run_id = run.id
+            run = await _wait_for_run(thread_id, run_id, deadline)
+            return AssistantReply(await _run_reply(thread_id, run_id), thread_id, _run_tokens(run))
 
-    for msg in reversed(messages.data):
-        if msg.role == "assistant":
-            return msg.content[0].text.value.strip(), thread_id
+        try:
+            reply = await asyncio.wait_for(consume(), timeout=seconds)
+            if reply:
+                return AssistantReply(reply, thread_id, tokens)
+        except AssistantRunError:
+            raise
+        except asyncio.TimeoutError:
+            if run_id:
+                await _cancel_run(thread_id, run_id)
+            raise AssistantRunTimeout("in_progress", f"Assistant run did not finish within {seconds:.0f}s; cancelled")
+        except Exception as e:
+            if run_id is None:
+                raise
+            logger.warning(f"⚠️ Run stream for {run_id} dropped ({e}); polling instead")
+
+        # Stream dropped (or produced no message event): poll the same run.
+        run = await _wait_for_run(thread_id, run_id, deadline)
+        return AssistantReply(await _run_reply(thread_id, run_id), thread_id, _run_tokens(run))
+    except asyncio.CancelledError:
+        # The caller gave up (its own timeout, a client disconnect). Cancel the run
+        # too, or the thread rejects its next message while the run is still active.
+        if run_id:
+            await asyncio.shield(_cancel_run(thread_id, run_id))
+        raise
+
+
+async def _within(events, seconds: float):
+    # Re-yields `events`, raising AssistantRunTimeout if they are not exhausted within `seconds`
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(events.__anext__(), timeout=max(deadline - loop.time(), 0))
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise AssistantRunTimeout("in_progress", f"Assistant run did not finish within {seconds:.0f}s; cancelled")
+            yield event
+    finally:
+        await events.aclose()
+
+
+async def stream_assistant(
+    thread_id: str, assistant_id: str, message: str, tenant_id: str = None,
+    additional_instructions: str = None, deadline: float = None
+):
+    """
+    Streams a run on an existing thread.
+
+    Yields ("delta", text) for each text fragment as it arrives, then a single
+    ("done", total_tokens) once the run completes; total_tokens is None if the
+    API did not report usage. Like run_assistant, the run is bounded by `deadline`
+    seconds (ASSISTANT_RUN_DEADLINE by default) and cancelled when that passes or
+    when the consumer stops early.
+    """
+    seconds = deadline or RUN_DEADLINE
+    if is_local_thread(thread_id):
+        async for kind, value in _within(stream_local(thread_id, message, tenant_id, additional_instructions), seconds):
+            yield kind, value
+        return
+
+    async with llm_slot("openai", tenant_id, tokens=len(message) // 4 + 1000, model="assistants") as permit:
+        await get_client().beta.threads.messages.create(
+            thread_id=thread_id,
+            role="user",
+            content=message
+        )
 
-    raise Exception("No assistant message found")
+        run_id = None
+        completed = False
+        try:
+            async for kind, value in _within(_run_events(thread_id, assistant_id, additional_instructions), seconds):
+                if kind == "run":
+                    run_id = value
+                elif kind == "done":
+                    completed = True
+                    permit.settle(value or 0)
+                if kind in ("delta", "done"):
+                    yield kind, value
+        finally:
+            # Timed out, failed mid-stream or abandoned by a disconnected client:
+            # don't leave the run active on the founder's thread.
+            if run_id and not completed:
+                await asyncio.shield(_cancel_run(thread_id, run_id))
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("openai")
+
+from app.ai import prompt_engine  # noqa: E402
+from app.stella_sdk.runner import AssistantReply, AssistantRunTimeout  # noqa: E402
+
+USER = {"id": "u1", "tenant_id": "t1"}
+IDEA = SimpleNamespace(
+    id="idea-1", title="Acme", problem="Slow invoicing", audience="Freelancers", solution="One-click invoices", notes=None
+)
+
+
+class NoSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def panel(monkeypatch):
+    runs = {}
+    sessions = []
+
+    def session():
+        sessions.append(NoSession())
+        return sessions[-1]
+
+    async def ensure(project_id, role, user, db):
+        return f"asst_{role}"
+
+    async def run_assistant(project_id, role, message, assistant_id, tenant_id, user_id, db, deadline=None, **kwargs):
+        behaviour = runs.get(role, ("reply", 0.0, 50))
+        kind, delay, tokens = behaviour
+        await asyncio.sleep(delay)
+        if kind == "timeout":
+            raise AssistantRunTimeout("in_progress", f"{role} timed out")
+        if kind == "error":
+            raise RuntimeError(f"{role} exploded")
+        runs.setdefault("deadlines", []).append(deadline)
+        return AssistantReply(f"{role} says hi", f"thread_{role}", tokens)
+
+    monkeypatch.setattr(prompt_engine, "AsyncSessionLocal", session)
+    monkeypatch.setattr(prompt_engine, "ensure_assistant_for_role", ensure)
+    monkeypatch.setattr(prompt_engine, "run_assistant", run_assistant)
+    return runs, sessions
+
+
+def test_panel_runs_roles_concurrently_in_panel_order(panel):
+    runs, sessions = panel
+    for role in ("startup_critic", "cfo", "cmo", "cto"):
+        runs[role] = ("reply", 0.1, 50)
+
+    started = time.perf_counter()
+    result = asyncio.run(prompt_engine.analyze_with_panel(IDEA, USER, deadline=5))
+    elapsed = time.perf_counter() - started
+
+    assert list(result) == ["startup_critic", "cfo", "cmo", "cto"]
+    assert all(member["status"] == "ok" and member["tokens"] == 50 for member in result.values())
+    assert elapsed < 0.3  # ~ one role (0.1s), not four in a row (0.4s)
+    assert len(sessions) == 4  # one session per member
+    assert runs["deadlines"] == [5] * 4
+
+
+def test_slow_and_failing_roles_are_reported_not_awaited(panel):
+    runs, _ = panel
+    runs["cfo"] = ("timeout", 0.0, 0)
+    runs["cto"] = ("error", 0.0, 0)
+
+    result = asyncio.run(prompt_engine.analyze_with_panel(IDEA, USER, roles=["startup_critic", "cfo", "cto"]))
+
+    assert result["startup_critic"]["reply"] == "startup_critic says hi"
+    assert result["cfo"]["status"] == "timeout" and "reply" not in result["cfo"]
+    assert result["cto"] == {"status": "failed", "error": "cto exploded", "seconds": result["cto"]["seconds"]}
+
+
+def test_member_without_reported_usage_is_estimated(panel):
+    runs, _ = panel
+    runs["cmo"] = ("reply", 0.0, None)
+    member = asyncio.run(prompt_engine.analyze_with_panel(IDEA, USER, roles=["cmo"]))["cmo"]
+    message = prompt_engine._analysis_message(IDEA, "cmo")
+    assert member["tokens"] == (len(message) + len("cmo says hi")) // 4
+
+
+def test_analysis_message_asks_each_function_for_its_view():
+    critic = prompt_engine._analysis_message(IDEA, "startup_critic")
+    cfo = prompt_engine._analysis_message(IDEA, "cfo")
+    assert "Title: Acme" in critic and "As the" not in critic
+    assert cfo.startswith(critic) and "As the CFO" in cfo
@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("openai")
+
+from app.services import assistant_service  # noqa: E402
+from app.services.template_registry import CompiledTemplate  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def empty_pool(monkeypatch):
+    monkeypatch.setattr(assistant_service, "_pooled_assistants", {})
+    monkeypatch.setattr(assistant_service, "_pooled_ids", set())
+    monkeypatch.setattr(assistant_service, "_pool_table_present", None)
+
+
+def _templates(monkeypatch, text):
+    template = CompiledTemplate("sparring", "cfo", {"text": text}) if text else None
+    monkeypatch.setattr(
+        assistant_service.template_registry, "get_sparring", lambda role, db: asyncio.sleep(0, result=template)
+    )
+    return template
+
+
+def _creator(monkeypatch):
+    created = []
+
+    async def load_or_create(role, version, template):
+        await asyncio.sleep(0.01)
+        created.append((role, version))
+        return f"asst_{role}_{len(created)}"
+
+    monkeypatch.setattr(assistant_service, "_load_or_create_pooled_assistant", load_or_create)
+    return created
+
+
+def test_one_assistant_per_role_and_template_version(monkeypatch):
+    template = _templates(monkeypatch, "You are the CFO of {{ idea_name }}")
+    created = _creator(monkeypatch)
+
+    async def run():
+        return await asyncio.gather(*(assistant_service.get_pooled_assistant("CFO", None) for _ in range(5)))
+
+    assert set(asyncio.run(run())) == {"asst_cfo_1"}
+    assert created == [("cfo", template.version)]
+    assert asyncio.run(assistant_service.get_pooled_assistant("cfo", None)) == "asst_cfo_1"
+
+
+def test_template_edit_gets_a_new_assistant(monkeypatch):
+    created = _creator(monkeypatch)
+    _templates(monkeypatch, "v1")
+    first = asyncio.run(assistant_service.get_pooled_assistant("cfo", None))
+    _templates(monkeypatch, "v2")
+    second = asyncio.run(assistant_service.get_pooled_assistant("cfo", None))
+    assert first != second and len(created) == 2
+
+
+def test_role_without_template_uses_default_version(monkeypatch):
+    _templates(monkeypatch, None)
+    created = _creator(monkeypatch)
+    asyncio.run(assistant_service.get_pooled_assistant("cmo", None))
+    assert created == [("cmo", "default")]
+
+
+def test_role_instructions_are_project_independent():
+    template = CompiledTemplate("sparring", "cfo", {"text": "Advise {{ idea_name }}: {{ idea_summary }}"})
+    text = assistant_service.role_instructions("cfo", template)
+    assert text.startswith("Advise the founder's startup: See the project context provided with each run.")
+    assert "provided with each run as project context" in assistant_service.role_instructions("cmo", None)
+
+
+class PoolTable:
+    def __init__(self, present, pooled_ids):
+        self.present = present
+        self.pooled_ids = pooled_ids
+        self.queries = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.queries.append(sql)
+        if "to_regclass" in sql:
+            return SimpleNamespace(scalar=lambda: self.present)
+        assistant_id = statement.whereclause.right.value
+        return SimpleNamespace(scalar=lambda: assistant_id if assistant_id in self.pooled_ids else None)
+
+
+def test_is_pooled_assistant_reads_role_assistants_and_caches_hits():
+    db = PoolTable(present=True, pooled_ids={"asst_pool"})
+    assert asyncio.run(assistant_service.is_pooled_assistant("asst_pool", db))
+    assert not asyncio.run(assistant_service.is_pooled_assistant("asst_project", db))
+    queries = len(db.queries)
+    assert asyncio.run(assistant_service.is_pooled_assistant("asst_pool", db))
+    assert len(db.queries) == queries
+
+
+def test_is_pooled_assistant_without_the_table(monkeypatch):
+    monkeypatch.setattr(assistant_service, "ASSISTANT_POOLING", False)
+    db = PoolTable(present=False, pooled_ids=set())
+    assert not asyncio.run(assistant_service.is_pooled_assistant("asst_project", db))
+    assert not asyncio.run(assistant_service.is_pooled_assistant("asst_other", db))
+    assert len(db.queries) == 1  # checked once per process
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("asyncpg")
+
+from app.ai import board_meeting  # noqa: E402
+from app.ai.board_meeting import BOARD_MEMBERS, BoardTurn, run_board_meeting  # noqa: E402
+from app.services import blueprint_service  # noqa: E402
+
+
+def _speaker(system: str) -> str:
+    return next((name for name, persona in BOARD_MEMBERS.items() if system.startswith(persona)), "Chair")
+
+
+@pytest.fixture
+def board(monkeypatch):
+    calls = []
+    behaviour = {}
+
+    async def complete(prompt, system=None, **kwargs):
+        speaker = _speaker(system)
+        calls.append((speaker, prompt))
+        action = behaviour.get(speaker)
+        if action == "fail":
+            raise RuntimeError(f"{speaker} unavailable")
+        await asyncio.sleep(action if isinstance(action, float) else 0.05)
+        return SimpleNamespace(content=f"{speaker} position")
+
+    monkeypatch.setattr(board_meeting, "complete", complete)
+    return calls, behaviour
+
+
+def _meeting(**kwargs):
+    async def run():
+        return [event async for event in run_board_meeting("Enter the EU market?", "Blueprint v2", "", "t1", **kwargs)]
+    return asyncio.run(run())
+
+
+def test_openings_run_concurrently_and_rebuttals_see_the_previous_round(board):
+    calls, _ = board
+    started = time.perf_counter()
+    events = _meeting(rounds=1)
+    elapsed = time.perf_counter() - started
+
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "meeting" and kinds[-2:] == ["action_items", "done"]
+    assert kinds.count("turn") == 2 * len(BOARD_MEMBERS)
+    assert elapsed < 0.5  # two rounds of parallel turns plus the chair, not ten turns in a row
+
+    rebuttal = next(prompt for speaker, prompt in calls[len(BOARD_MEMBERS):] if speaker == "CFO")
+    assert "Your last position:\nCFO position" in rebuttal
+    assert "**CEO** (Opening): CEO position" in rebuttal
+    assert "**CFO** (Opening)" not in rebuttal.split("What the other executives said:")[1]
+
+
+def test_failed_member_is_reported_and_left_out_of_the_transcript(board):
+    _, behaviour = board
+    behaviour["CTO"] = "fail"
+    events = _meeting(rounds=0)
+
+    cto = next(data for kind, data in events if kind == "turn" and data["speaker"] == "CTO")
+    assert cto["error"] == "CTO unavailable" and cto["text"] == ""
+    assert ("round", {"round": 0, "answered": len(BOARD_MEMBERS) - 1}) in events
+    assert "**CTO**" not in events[-1][1]["transcript"]
+    assert events[-1][1]["transcript"].endswith("**Chair** (Action Items):\nChair position")
+
+
+def test_slow_member_misses_its_turn_deadline(board, monkeypatch):
+    _, behaviour = board
+    monkeypatch.setattr(board_meeting, "BOARD_TURN_DEADLINE", 0.1)
+    behaviour["Visionary"] = 1.0
+    events = _meeting(rounds=0)
+
+    visionary = next(data for kind, data in events if kind == "turn" and data["speaker"] == "Visionary")
+    assert visionary["error"].startswith("no answer within")
+
+
+def test_meeting_stops_when_nobody_answers(board):
+    _, behaviour = board
+    behaviour.update({name: "fail" for name in BOARD_MEMBERS})
+    with pytest.raises(RuntimeError, match="No board member answered"):
+        _meeting(rounds=1)
+
+
+def test_turn_labels():
+    assert BoardTurn(0, "CEO", "Go").render() == "**CEO** (Opening): Go"
+    assert BoardTurn(2, "CFO").label == "Rebuttal 2"
+
+
+def test_blueprint_lookups_are_cached_until_forgotten(monkeypatch):
+    monkeypatch.setattr(blueprint_service, "_blueprints", blueprint_service.ResponseCache(max_entries=10, ttl=60))
+    loads = []
+
+    class Connection:
+        async def fetchrow(self, query, tenant_id, project_id):
+            loads.append(project_id)
+            await asyncio.sleep(0.01)
+            return (f"blueprint {len(loads)}",)
+
+    class Pool:
+        async def __aenter__(self):
+            return Connection()
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(blueprint_service, "get_db_connection", Pool)
+
+    async def run():
+        first = await asyncio.gather(*(blueprint_service.get_blueprint("t1", "p1") for _ in range(3)))
+        again = await blueprint_service.get_blueprint("t1", "p1")
+        blueprint_service.forget_blueprint("t1", "p1")
+        return first, again, await blueprint_service.get_blueprint("t1", "p1")
+
+    first, again, reloaded = asyncio.run(run())
+    assert first == ["blueprint 1"] * 3 and again == "blueprint 1"
+    assert reloaded == "blueprint 2"
+    assert loads == ["p1", "p1"]
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("openai")
+
+from app.services.business_plan import PLAN_SECTIONS, SUMMARY_SECTION, PlanSection, assemble_plan  # noqa: E402
+
+
+def test_assemble_plan_follows_plan_order_whatever_the_finish_order():
+    sections = {"risks": "R", "market": "M", SUMMARY_SECTION: "S"}
+    assert assemble_plan(sections) == "## Executive Summary\n\nS\n\n## Market & Opportunity\n\nM\n\n## Risk & Mitigation\n\nR"
+
+
+def test_assemble_plan_leaves_out_missing_and_empty_sections():
+    plan = assemble_plan({"market": "M", "financials": "", "unknown": "ignored"})
+    assert plan == "## Market & Opportunity\n\nM"
+
+
+def test_summary_section_is_first_in_plan_order():
+    assert next(iter(PLAN_SECTIONS)) == SUMMARY_SECTION
+
+
+def test_section_event():
+    section = PlanSection("hiring", error="not finished within 90s")
+    assert section.event() == {
+        "key": "hiring", "title": "Hiring Plan", "content": "", "error": "not finished within 90s"
+    }
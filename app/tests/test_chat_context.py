@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("openai")
+
+from app.services import chat_context  # noqa: E402
+from app.services.chat_context import ChatContext, ChatTurn, batch_turns, recent_window  # noqa: E402
+
+
+def _turns(*messages):
+    return [ChatTurn(str(i), "user" if i % 2 == 0 else "assistant", m, i) for i, m in enumerate(messages)]
+
+
+def test_recent_window_keeps_newest_turns_in_order():
+    turns = _turns("one", "two", "three", "four")
+    assert [t.message for t in recent_window(turns, recent_turns=2, budget=1000)] == ["three", "four"]
+
+
+def test_recent_window_stops_at_token_budget():
+    turns = _turns("x" * 400, "y" * 400, "z" * 400)  # ~100 tokens each
+    window = recent_window(turns, recent_turns=10, budget=250)
+    assert [t.message[0] for t in window] == ["y", "z"]
+
+
+def test_recent_window_always_keeps_a_cut_down_newest_turn():
+    turns = _turns("short", "w" * 4000)
+    window = recent_window(turns, recent_turns=10, budget=100)
+    assert len(window) == 1
+    assert window[0].message == "w" * 400
+
+
+def test_recent_window_with_no_turns_allowed():
+    assert recent_window(_turns("a", "b"), recent_turns=0, budget=1000) == []
+
+
+def test_batch_turns_splits_at_batch_budget(monkeypatch):
+    monkeypatch.setattr(chat_context, "CHAT_SUMMARY_BATCH_TOKENS", 250)
+    turns = _turns(*("m" * 400 for _ in range(5)))  # ~100 tokens each
+    batches = batch_turns(turns)
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert [t for b in batches for t in b] == turns
+
+
+def test_batch_turns_never_returns_empty_batches(monkeypatch):
+    monkeypatch.setattr(chat_context, "CHAT_SUMMARY_BATCH_TOKENS", 10)
+    assert [len(b) for b in batch_turns(_turns("a" * 1000, "b"))] == [1, 1]
+    assert batch_turns([]) == []
+
+
+def test_context_render():
+    context = ChatContext(summary="Founder picked B2B.", turns=_turns("Pricing?", "Per seat."))
+    assert context.render() == (
+        "Summary of the earlier conversation:\nFounder picked B2B.\n\n"
+        "Recent messages:\nUser: Pricing?\nAssistant: Per seat."
+    )
+    assert ChatContext(summary="").render() == ""
@@ -0,0 +1,111 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.utils import circuit_breaker
+from app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def _fail(breaker: CircuitBreaker, times: int):
+    for _ in range(times):
+        assert breaker.allow_request()
+        breaker.record(False, 0.1)
+
+
+def test_opens_when_error_rate_crosses_threshold():
+    breaker = CircuitBreaker("test")
+    _fail(breaker, circuit_breaker.CB_MIN_CALLS - 1)
+    assert breaker.state == CLOSED  # not enough calls yet
+    _fail(breaker, 1)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected_total == 1
+
+
+def test_opens_on_slow_calls():
+    breaker = CircuitBreaker("test")
+    for _ in range(circuit_breaker.CB_MIN_CALLS):
+        breaker.record(True, circuit_breaker.CB_SLOW_CALL_SECONDS + 1)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_closes_or_reopens(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "CB_OPEN_SECONDS", 0)
+    breaker = CircuitBreaker("test")
+    _fail(breaker, circuit_breaker.CB_MIN_CALLS)
+
+    assert breaker.allow_request()  # the probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()  # only CB_HALF_OPEN_PROBES at a time
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+
+    assert breaker.allow_request()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.window == type(breaker.window)()
+
+
+def test_latency_percentile_needs_min_calls():
+    breaker = CircuitBreaker("test")
+    breaker.record(True, 1.0)
+    assert breaker.latency_percentile(0.95) is None
+    for latency in (0.1, 0.2, 0.3, 0.4, 0.5):
+        breaker.record(True, latency)
+    assert breaker.latency_percentile(0.5) == pytest.approx(0.4)
+
+
+def test_guard_records_failures():
+    breaker = CircuitBreaker("test")
+
+    async def run():
+        with pytest.raises(ValueError):
+            async with breaker.guard():
+                raise ValueError("upstream 500")
+
+    asyncio.run(run())
+    assert breaker.window[-1][0] is False
+
+
+def test_guard_checks_breaker_before_taking_slot():
+    entered = []
+
+    @asynccontextmanager
+    async def slot():
+        entered.append(True)
+        yield
+
+    breaker = CircuitBreaker("test")
+    _fail(breaker, circuit_breaker.CB_MIN_CALLS)
+
+    async def run():
+        with pytest.raises(CircuitOpenError):
+            async with breaker.guard(slot=slot()):
+                pass
+
+    asyncio.run(run())
+    assert entered == []
+
+
+def test_refused_slot_is_not_an_upstream_failure(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "CB_OPEN_SECONDS", 0)
+
+    @asynccontextmanager
+    async def refused():
+        raise RuntimeError("limiter said no")
+        yield
+
+    breaker = CircuitBreaker("test")
+    _fail(breaker, circuit_breaker.CB_MIN_CALLS)
+    window = list(breaker.window)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            async with breaker.guard(slot=refused()):
+                pass
+
+    asyncio.run(run())
+    assert breaker.state == HALF_OPEN
+    assert breaker.probes_in_flight == 0  # the probe was handed back
+    assert list(breaker.window) == window
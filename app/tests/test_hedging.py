@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.utils.hedging import Arm, hedge
+
+
+def _arm(source: str, delay: float, content: str = None, tokens: int = 10, error: Exception = None):
+    async def call():
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return content or source, tokens
+    return Arm(source, call)
+
+
+def _run(primary: Arm, secondary: Arm, delay):
+    usage = []
+
+    async def log_usage(tokens, source):
+        usage.append((source, tokens))
+
+    async def run():
+        return await hedge(primary, secondary, delay=delay, log_usage=log_usage, prompt_tokens=5)
+
+    return asyncio.run(run()), usage
+
+
+def test_fast_primary_never_starts_secondary():
+    result, usage = _run(_arm("gpu", 0.01), _arm("openai", 0.01), delay=0.5)
+    assert result == "gpu"
+    assert usage == [("gpu", 10)]
+
+
+def test_slow_primary_is_hedged_and_loser_logged_as_cancelled():
+    result, usage = _run(_arm("gpu", 1.0), _arm("openai", 0.01), delay=0.05)
+    assert result == "openai"
+    assert usage == [("openai", 10), ("gpu_cancelled", 5)]
+
+
+def test_failed_primary_falls_back_without_waiting_for_delay():
+    result, usage = _run(_arm("gpu", 0.0, error=RuntimeError("down")), _arm("openai", 0.01), delay=10)
+    assert result == "openai"
+    assert usage == [("openai", 10)]
+
+
+def test_no_delay_means_sequential_fallback():
+    result, usage = _run(_arm("gpu", 0.05), _arm("openai", 0.0), delay=None)
+    assert result == "gpu"
+    assert usage == [("gpu", 10)]
+
+
+def test_both_arms_failing_raises_the_last_error():
+    with pytest.raises(RuntimeError, match="openai down"):
+        _run(
+            _arm("gpu", 0.0, error=RuntimeError("gpu down")),
+            _arm("openai", 0.02, error=RuntimeError("openai down")),
+            delay=0.1
+        )
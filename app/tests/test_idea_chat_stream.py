@@ -0,0 +1,157 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("openai")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.api.v1 import idea_chat  # noqa: E402
+from app.core.db import get_async_db  # noqa: E402
+from app.dependencies.auth import get_current_user  # noqa: E402
+from app.stella_sdk import runner  # noqa: E402
+
+PROJECT_ID = "8a6e0c61-0c5e-4a53-9a0e-2f1d3b6f9a10"
+USER = {"id": "u1", "tenant_id": "t1"}
+
+
+class FakeSession:
+    def __init__(self, events):
+        self.events = events
+
+    async def execute(self, *args, **kwargs):
+        return SimpleNamespace(fetchone=lambda: SimpleNamespace(max_tokens=10000))
+
+    async def commit(self):
+        self.events.append("request commit")
+
+    async def rollback(self):
+        self.events.append("request rollback")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    events = []
+
+    async def noop(*args, **kwargs):
+        return None
+
+    async def stream_assistant(thread_id, assistant_id, message, tenant_id=None, additional_instructions=None):
+        events.append("stream")
+        for part in ("Viability ", "score: 72"):
+            yield "delta", part
+        yield "done", 40
+
+    async def store_chat_exchange(db, project_id, role, user, message, reply, reservation, tokens_used):
+        events.append(("stored", reply, tokens_used))
+        return 72
+
+    async def release_reservation(reservation):
+        events.append("released")
+
+    monkeypatch.setattr(idea_chat, "get_user_usage", lambda db, user_id: asyncio.sleep(0, result=100))
+    monkeypatch.setattr(idea_chat, "reserve_tokens", lambda *args: asyncio.sleep(0, result="reservation"))
+    monkeypatch.setattr(idea_chat, "release_reservation", release_reservation)
+    monkeypatch.setattr(idea_chat, "ensure_assistant_for_role", lambda *args: asyncio.sleep(0, result="asst_1"))
+    monkeypatch.setattr(idea_chat, "get_thread_id", lambda *args: asyncio.sleep(0, result="thread_1"))
+    monkeypatch.setattr(idea_chat, "is_pooled_assistant", lambda *args: asyncio.sleep(0, result=False))
+    monkeypatch.setattr(idea_chat, "get_rendered_prompt", noop)
+    monkeypatch.setattr(idea_chat, "stream_assistant", stream_assistant)
+    monkeypatch.setattr(idea_chat, "store_chat_exchange", store_chat_exchange)
+    monkeypatch.setattr(idea_chat, "AsyncSessionLocal", lambda: FakeSession(events))
+
+    app = FastAPI()
+    app.include_router(idea_chat.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: USER
+    app.dependency_overrides[get_async_db] = lambda: FakeSession(events)
+    return TestClient(app), events
+
+
+def _events(body: str):
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        parsed.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def test_stream_sends_deltas_then_done(chat):
+    client, events = chat
+    res = client.post(f"/api/ideas/{PROJECT_ID}/chat/cfo/stream", json={"message": "Runway?"})
+
+    assert res.headers["content-type"].startswith("text/event-stream")
+    sent = _events(res.text)
+    assert sent[:2] == [("delta", {"text": "Viability "}), ("delta", {"text": "score: 72"})]
+    name, done = sent[2]
+    assert name == "done"
+    assert done["tokens_used"] == 40
+    assert done["tokens_remaining"] == 10000 - 100 - 40
+    assert done["viability_score"] == 72
+    assert ("stored", "Viability score: 72", 40) in events
+    assert "released" not in events
+
+
+def test_request_session_is_committed_before_streaming(chat):
+    client, events = chat
+    client.post(f"/api/ideas/{PROJECT_ID}/chat/cfo/stream", json={"message": "Runway?"})
+    assert events.index("request commit") < events.index("stream")
+
+
+def test_failed_stream_sends_error_and_releases_reservation(chat, monkeypatch):
+    client, events = chat
+
+    async def failing(*args, **kwargs):
+        yield "delta", "partial"
+        raise runner.AssistantRunTimeout("in_progress", "Assistant run did not finish within 120s; cancelled")
+
+    monkeypatch.setattr(idea_chat, "stream_assistant", failing)
+    sent = _events(client.post(f"/api/ideas/{PROJECT_ID}/chat/cfo/stream", json={"message": "Runway?"}).text)
+
+    assert sent[-1][0] == "error"
+    assert "120s" in sent[-1][1]["detail"]
+    assert "released" in events
+    assert not any(isinstance(e, tuple) for e in events)
+
+
+def test_stream_assistant_cancels_a_run_past_its_deadline(monkeypatch):
+    cancelled = []
+
+    async def run_events(thread_id, assistant_id, additional_instructions=None):
+        yield "run", "run_1"
+        yield "delta", "Hello"
+        await asyncio.sleep(1)
+        yield "done", 10
+
+    async def cancel_run(thread_id, run_id):
+        cancelled.append(run_id)
+
+    async def create_message(**kwargs):
+        return None
+
+    client = SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(
+        messages=SimpleNamespace(create=create_message)
+    )))
+    monkeypatch.setattr(runner, "_run_events", run_events)
+    monkeypatch.setattr(runner, "_cancel_run", cancel_run)
+    monkeypatch.setattr(runner, "get_client", lambda: client)
+
+    async def consume():
+        seen = []
+        with pytest.raises(runner.AssistantRunTimeout):
+            async for kind, value in runner.stream_assistant("thread_1", "asst_1", "Hi", "t1", deadline=0.05):
+                seen.append((kind, value))
+        return seen
+
+    assert asyncio.run(consume()) == [("delta", "Hello")]
+    assert cancelled == ["run_1"]
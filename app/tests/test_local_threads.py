@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("openai")
+
+from app.services.chat_context import ChatTurn  # noqa: E402
+from app.stella_sdk import local_threads  # noqa: E402
+from app.stella_sdk.local_threads import build_window, is_local_thread, run_local, stream_local  # noqa: E402
+
+
+class NoSession:
+    def expire_all(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def thread(monkeypatch):
+    """One local thread kept in memory: its turns, summary and what has been folded."""
+    state = SimpleNamespace(
+        id="local_1", role="cfo", project_id="p1", summary=None, folded=0, turns=[], saved=[], folds=0
+    )
+
+    async def load_thread(thread_id, db):
+        return state
+
+    async def turns_after(thread, db):
+        return state.turns[state.folded:]
+
+    async def fold_overflow(thread_id, tenant_id, keep):
+        state.folds += 1
+        pending = state.turns[state.folded:]
+        state.folded += len(pending) - keep
+        state.summary = f"{state.folded} earlier turns"
+
+    async def instructions(role, db, project_id):
+        return f"You are the {role.upper()}."
+
+    async def save_exchange(thread_id, message, reply, asked_at, tokens):
+        state.saved.append((message, reply, tokens))
+
+    monkeypatch.setattr(local_threads, "AsyncSessionLocal", NoSession)
+    monkeypatch.setattr(local_threads, "_load_thread", load_thread)
+    monkeypatch.setattr(local_threads, "_turns_after", turns_after)
+    monkeypatch.setattr(local_threads, "_fold_overflow", fold_overflow)
+    monkeypatch.setattr(local_threads, "generate_instructions_by_role", instructions)
+    monkeypatch.setattr(local_threads, "_save_exchange", save_exchange)
+    return state
+
+
+def _turns(*messages):
+    return [ChatTurn(str(i), "user" if i % 2 == 0 else "assistant", m, i) for i, m in enumerate(messages)]
+
+
+def test_is_local_thread():
+    assert is_local_thread("local_abc")
+    assert not is_local_thread("thread_abc")
+    assert not is_local_thread(None)
+
+
+def test_window_is_system_prompt_recent_turns_then_message(thread):
+    thread.turns = _turns("Runway?", "14 months.")
+    messages = asyncio.run(build_window("local_1", "And burn?", "t1", additional_instructions="Project: Acme"))
+
+    assert messages == [
+        {"role": "system", "content": "You are the CFO.\n\nProject: Acme"},
+        {"role": "user", "content": "Runway?"},
+        {"role": "assistant", "content": "14 months."},
+        {"role": "user", "content": "And burn?"},
+    ]
+    assert thread.folds == 0
+
+
+def test_turns_beyond_the_budget_are_folded_into_the_summary(thread, monkeypatch):
+    monkeypatch.setattr(local_threads, "LOCAL_THREAD_RECENT_TURNS", 2)
+    thread.turns = _turns("one", "two", "three", "four", "five")
+    messages = asyncio.run(build_window("local_1", "six", "t1"))
+
+    assert thread.folds == 1
+    assert messages[0]["content"].endswith("Summary of the conversation so far:\n3 earlier turns")
+    assert [m["content"] for m in messages[1:]] == ["four", "five", "six"]
+
+
+def test_stream_stores_the_exchange_only_once_complete(thread, monkeypatch):
+    async def stream_chat(messages, **kwargs):
+        yield "delta", "Burn is "
+        yield "delta", "40k/month."
+        yield "done", 120
+
+    monkeypatch.setattr(local_threads, "stream_chat", stream_chat)
+
+    async def consume():
+        return [event async for event in stream_local("local_1", "Burn?", "t1")]
+
+    assert asyncio.run(consume()) == [("delta", "Burn is "), ("delta", "40k/month."), ("done", 120)]
+    assert thread.saved == [("Burn?", "Burn is 40k/month.", 120)]
+    assert asyncio.run(run_local("local_1", "Burn?", "t1")) == ("Burn is 40k/month.", 120)
+
+
+def test_failed_stream_leaves_the_thread_unchanged(thread, monkeypatch):
+    async def stream_chat(messages, **kwargs):
+        yield "delta", "Burn is "
+        raise ConnectionError("upstream closed")
+
+    monkeypatch.setattr(local_threads, "stream_chat", stream_chat)
+    with pytest.raises(ConnectionError):
+        asyncio.run(run_local("local_1", "Burn?", "t1"))
+    assert thread.saved == []
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.utils import rate_limiter  # noqa: E402
+from app.utils.rate_limiter import Lane, LimiterRejected, Permit, TokenBucket, llm_slot  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_lanes(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_lanes", {})
+    monkeypatch.setattr(rate_limiter, "TENANT_WEIGHTS", {})
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)  # one per second
+    assert bucket.wait_time(60) == 0.0
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+
+
+def test_token_bucket_caps_requests_above_capacity():
+    bucket = TokenBucket(10)
+    bucket.take(1000)
+    assert bucket.level == pytest.approx(0.0, abs=0.01)
+
+
+def test_settle_returns_overestimated_tokens():
+    lane = Lane("test", rpm=None, tpm=6000, concurrency=None)
+    lane.tokens.take(1000)
+    Permit(lane, 1000).settle(200)
+    assert lane.tokens.level == pytest.approx(5800, abs=1)
+
+
+def _grant_order(lane: Lane, requests):
+    async def run():
+        lane.in_flight = 1  # hold the only slot so everything queues
+        waiters = [lane.enqueue(tenant, tokens) for tenant, tokens in requests]
+        order = []
+        for _ in requests:
+            lane.release()
+            await asyncio.sleep(0)
+            granted = next(w for w in waiters if w.future.done() and w not in order)
+            order.append(granted)
+        return [w.tenant for w in order]
+
+    return asyncio.run(run())
+
+
+def test_weighted_fair_queue_interleaves_tenants():
+    lane = Lane("test", rpm=None, tpm=None, concurrency=1)
+    order = _grant_order(lane, [("a", 100)] * 3 + [("b", 100)] * 3)
+    assert order == ["a", "b", "a", "b", "a", "b"]
+
+
+def test_weighted_fair_queue_favours_heavier_weight(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "TENANT_WEIGHTS", {"gold": 2.0})
+    lane = Lane("test", rpm=None, tpm=None, concurrency=1)
+    order = _grant_order(lane, [("free", 100)] * 2 + [("gold", 100)] * 4)
+    assert order[:3].count("gold") == 2
+
+
+def test_cheap_requests_are_not_starved_by_large_ones():
+    lane = Lane("test", rpm=None, tpm=None, concurrency=1)
+    order = _grant_order(lane, [("big", 10000), ("big", 10000), ("small", 10)])
+    assert order.index("small") < 2
+
+
+def test_limiter_rejected_is_503_with_retry_after():
+    error = LimiterRejected("openai", 7)
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "7"
+
+
+def test_llm_slot_rejects_after_queue_deadline(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "LLM_QUEUE_DEADLINE", 0.05)
+    monkeypatch.setattr(rate_limiter, "LLM_RATE_LIMITS", {"test": {"rpm": 60, "concurrency": 1}})
+
+    async def run():
+        async with llm_slot("test", "t1"):
+            with pytest.raises(LimiterRejected) as rejected:
+                async with llm_slot("test", "t2"):
+                    pass
+        return rejected.value
+
+    error = asyncio.run(run())
+    assert int(error.headers["Retry-After"]) >= 1
+    assert rate_limiter.limiter_metrics()["test"]["rejected_total"] == 1
+
+
+def test_llm_slot_releases_on_exit(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "LLM_RATE_LIMITS", {"test": {"concurrency": 1}})
+
+    async def run():
+        for _ in range(3):
+            async with llm_slot("test", "t1"):
+                pass
+        return rate_limiter.limiter_metrics()["test"]
+
+    metrics = asyncio.run(run())
+    assert metrics["in_flight"] == 0
+    assert metrics["granted_total"] == 3
@@ -0,0 +1,59 @@
+import time
+
+from app.ai.response_cache import ResponseCache, cache_key
+
+
+def _messages(text: str):
+    return [{"role": "system", "content": "You are a CMO."}, {"role": "user", "content": text}]
+
+
+def test_cache_key_ignores_whitespace_only_differences():
+    assert cache_key("openai/gpt-4o", 0.7, _messages("Write  a tagline\n")) == \
+        cache_key("openai/gpt-4o", 0.7, _messages("Write a tagline"))
+
+
+def test_cache_key_changes_with_model_temperature_and_params():
+    base = cache_key("openai/gpt-4o", 0.7, _messages("Write a tagline"), max_tokens=100)
+    assert base != cache_key("openai/gpt-4", 0.7, _messages("Write a tagline"), max_tokens=100)
+    assert base != cache_key("openai/gpt-4o", 0.2, _messages("Write a tagline"), max_tokens=100)
+    assert base != cache_key("openai/gpt-4o", 0.7, _messages("Write a tagline"), max_tokens=200)
+
+
+def test_entries_are_per_tenant():
+    cache = ResponseCache()
+    cache.put("t1", "k", "answer")
+    assert cache.get("t1", "k") == "answer"
+    assert cache.get("t2", "k") is None
+    assert cache.metrics()["hits"] == 1 and cache.metrics()["misses"] == 1
+
+
+def test_lru_eviction_only_touches_the_busy_tenant():
+    cache = ResponseCache(max_entries=2)
+    cache.put("quiet", "q", "kept")
+    cache.put("busy", "a", 1)
+    cache.put("busy", "b", 2)
+    cache.get("busy", "a")  # a is now the most recently used
+    cache.put("busy", "c", 3)
+
+    assert cache.get("busy", "b") is None
+    assert cache.get("busy", "a") == 1
+    assert cache.get("quiet", "q") == "kept"
+    assert cache.evictions == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl=0.01)
+    cache.put(None, "k", "answer")
+    time.sleep(0.02)
+    assert cache.get(None, "k") is None
+    assert cache.metrics()["entries"] == 0
+
+
+def test_delete_and_clear():
+    cache = ResponseCache()
+    cache.put("t1", "k", 1)
+    cache.put("t2", "k", 2)
+    cache.delete("t1", "k")
+    assert cache.get("t1", "k") is None
+    cache.clear("t2")
+    assert cache.get("t2", "k") is None
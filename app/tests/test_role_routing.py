@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.ai.role_router import AhoCorasick, get_role_router
+
+# Labelled messages and the role an "auto" chat must route them to.
+EXPECTED_ROUTES = [
+    ("Ask the CFO about our margins", "cfo"),
+    ("What runway do we have at our current burn?", "cfo"),
+    ("Should we move the backend to kubernetes?", "cto"),
+    ("Is our tech stack ready to scale?", "cto"),
+    ("Can you plan our go-to-market?", "cmo"),
+    ("How should I price the premium tier?", "pricing strategist"),
+    ("Help me with our brand story", "brand strategist"),
+    ("Write a blog post for SEO", "content strategist"),
+    ("What should be on the roadmap next quarter?", "product manager"),
+    ("I need a GDPR review of the signup flow", "data protection officer"),
+    ("Our SRE is paged every night", "site reliability engineer"),
+]
+
+
+def test_aho_corasick_finds_whole_words_only():
+    matcher = AhoCorasick({"cto": "cto", "ux designer": "ux", "designer": "designer"})
+    found = [pattern for pattern, _ in matcher.find("our ux designer and the cto, not a doctor")]
+    assert sorted(found) == ["cto", "designer", "ux designer"]
+
+
+def test_aho_corasick_overlapping_patterns():
+    matcher = AhoCorasick({"burn": 1, "burn rate": 2, "rate": 3})
+    assert sorted(p for p, _ in matcher.find("our burn rate")) == ["burn", "burn rate", "rate"]
+
+
+@pytest.mark.parametrize("text, role", EXPECTED_ROUTES)
+def test_router_routes_labelled_messages(text, role):
+    best = get_role_router().best(text)
+    assert best is not None and best.role == role
+
+
+def test_role_name_beats_topic_keyword():
+    # "architecture" is a CTO topic, but naming the CFO wins
+    assert get_role_router().best("CFO, what does the new architecture cost us?").role == "cfo"
+
+
+def test_no_match_for_small_talk():
+    assert get_role_router().best("hello there, how are you?") is None
+
+
+# No keyword in these: the hashed embedding step decides, or the default applies.
+EMBEDDING_ROUTES = [
+    ("Can you review our user onboarding screens?", "onboarding specialist"),
+    ("hello there", "ceo"),
+    ("What's the weather like?", "ceo"),
+]
+
+
+@pytest.mark.parametrize("text, role", EXPECTED_ROUTES + EMBEDDING_ROUTES)
+def test_resolve_role(text, role):
+    role_classifier = pytest.importorskip("app.ai.role_classifier")
+    if role_classifier.ROLE_CLASSIFIER_EMBEDDER != "hashed":
+        pytest.skip("routing with a dense embedder depends on the embedding model")
+    assert role_classifier.ROLE_CLASSIFIER_ENABLED
+    assert asyncio.run(role_classifier.resolve_role(text)) == role
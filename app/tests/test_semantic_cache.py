@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("openai")
+
+from app.ai.semantic_cache import HashedTfidfEmbedder, SemanticCache, key_terms, terms_agree  # noqa: E402
+
+
+def _cache(**kwargs) -> SemanticCache:
+    return SemanticCache(embedder=HashedTfidfEmbedder(dim=1024), **kwargs)
+
+
+def _lookup(cache: SemanticCache, stored: str, query: str, namespace: str = "research:p1", other_ns: str = None):
+    async def run():
+        await cache.put("t1", namespace, stored, "answer")
+        return await cache.get("t1", other_ns or namespace, query)
+    return asyncio.run(run())
+
+
+def test_key_terms_ignore_stopwords_and_order():
+    assert key_terms("marketing plan for my SaaS") == key_terms("SaaS marketing plan")
+    assert key_terms("B2B pricing") != key_terms("B2C pricing")
+
+
+def test_terms_agree_up_to_spelling_only():
+    assert terms_agree(key_terms("marketing plans"), key_terms("marketting plan"))
+    assert not terms_agree(key_terms("business plan"), key_terms("business plant"))
+    assert not terms_agree(key_terms("B2B pricing"), key_terms("B2C pricing"))
+    assert not terms_agree(key_terms("meal kit delivery"), key_terms("meal kit delivery hospitals"))
+
+
+def test_reordered_prompt_hits():
+    assert _lookup(_cache(), "SaaS marketing plan", "Marketing plan, SaaS") == "answer"
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("What is a good pricing strategy for my SaaS startup?", "Pricing strategy for SaaS startups"),
+    ("How should I price my SaaS product", "How do I price my SaaS product?"),
+    ("Write a marketing plan for my SaaS", "Write a marketting plan for my SaaS"),
+])
+def test_near_duplicates_hit(stored, query):
+    assert _lookup(_cache(), stored, query) == "answer"
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("Coffee shop market size in Paris", "Coffee shop market size in Berlin"),
+    ("Go-to-market plan for a B2C fintech app", "Go-to-market plan for a B2B fintech app"),
+])
+def test_different_subject_misses_even_when_lexically_close(stored, query):
+    cache = _cache(threshold=0.8)
+    assert _lookup(cache, stored, query) is None
+    assert cache.misses == 1
+
+
+class _FixedEmbedder:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    async def embed(self, texts, tenant_id=None):
+        return np.array([self.vectors[text] for text in texts], dtype=np.float32)
+
+    def observe(self, vector):
+        pass
+
+    def weights(self):
+        return None
+
+
+def test_term_check_looks_past_the_most_similar_row():
+    cache = SemanticCache(embedder=_FixedEmbedder({
+        "market size Paris": [1.0, 0.0],
+        "market sizes Berlin": [0.9, 0.3],
+        "market size Berlin": [1.0, 0.0],
+    }), threshold=0.8, same_terms=True)
+
+    async def run():
+        await cache.put("t1", "ns", "market size Paris", "paris")
+        await cache.put("t1", "ns", "market sizes Berlin", "berlin")
+        return await cache.get("t1", "ns", "market size Berlin")
+
+    assert asyncio.run(run()) == "berlin"
+
+
+def test_namespaces_never_match_each_other():
+    cache = _cache()
+    assert _lookup(cache, "SaaS marketing plan", "SaaS marketing plan", "research:p1", "research:p2") is None
+
+
+def test_threshold_applies_without_term_check():
+    assert _lookup(_cache(threshold=1.01, same_terms=False), "SaaS plan", "SaaS plan") is None
+    assert _lookup(_cache(threshold=0.5, same_terms=False), "SaaS plan", "SaaS plan") == "answer"
+
+
+def test_tenant_index_grows_lazily_up_to_max_entries():
+    cache = _cache(max_entries=40)
+
+    async def run():
+        await cache.put("t1", "ns", "prompt 0", 0)
+        index = cache._tenants["t1"]
+        assert len(index.values) == 16
+        for i in range(1, 60):
+            await cache.put("t1", "ns", f"prompt {i}", i)
+        return index
+
+    index = asyncio.run(run())
+    assert len(index.values) == 40
+    assert index.vectors.shape[0] == 40
+    assert cache.evictions == 20
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("asyncpg")
+
+from app.utils.single_flight import SingleFlight, flight_key  # noqa: E402
+
+
+def test_flight_key_is_stable_across_payload_order():
+    assert flight_key("analyze", "t1", 42, {"a": 1, "b": 2}) == flight_key("analyze", "t1", 42, {"b": 2, "a": 1})
+    assert flight_key("analyze", "t1", 42, {"a": 1}) != flight_key("analyze", "t2", 42, {"a": 1})
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "plan"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", generate) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["plan"] * 5
+    assert len(calls) == 1
+    assert flight.metrics() == {"in_flight": 0, "leaders_total": 1, "coalesced_total": 4}
+
+
+def test_leader_error_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def generate():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", generate) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_waiter_takes_over_when_leader_is_cancelled():
+    flight = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def run():
+        leader = asyncio.create_task(flight.do("k", generate))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(flight.do("k", generate))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(run()) == 2  # the waiter ran generate itself
+    assert len(calls) == 2
+
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight()
+
+    async def run():
+        first = await flight.do("k", lambda: asyncio.sleep(0, result=1))
+        second = await flight.do("k", lambda: asyncio.sleep(0, result=2))
+        return first, second
+
+    assert asyncio.run(run()) == (1, 2)
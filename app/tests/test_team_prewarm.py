@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("openai")
+
+from app.services import team_service  # noqa: E402
+from app.services.team_service import parse_recommended_team  # noqa: E402
+
+USER = {"id": "u1", "tenant_id": "t1"}
+
+TEAM_TEXT = """
+Recommended Team:
+- **CMO** – owns go-to-market
+- **CFO** – runway and fundraising
+2. Growth Hacker: runs acquisition experiments
+- **CMO** – listed twice
+This line is not a list item.
+"""
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(team_service, "_status", {})
+    monkeypatch.setattr(team_service, "_tasks", {})
+
+
+def _ensure(monkeypatch, fail=(), delay=0.02):
+    calls, in_flight, peak = [], [0], [0]
+
+    async def ensure_team_role(project_id, role, user):
+        calls.append(role)
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        try:
+            await asyncio.sleep(delay)
+            if role in fail:
+                raise RuntimeError(f"{role} setup failed")
+            return f"asst_{role}"
+        finally:
+            in_flight[0] -= 1
+
+    monkeypatch.setattr(team_service, "ensure_team_role", ensure_team_role)
+    return calls, peak
+
+
+def test_parse_recommended_team_maps_names_and_starts_with_ceo():
+    roles = parse_recommended_team(TEAM_TEXT)
+    assert roles[:3] == ["ceo", "cmo", "cfo"]
+    assert roles.count("cmo") == 1
+    assert len(roles) == 4  # plus the growth hacker
+
+
+def test_parse_recommended_team_without_text():
+    assert parse_recommended_team(None) == ["ceo"]
+
+
+def test_parse_recommended_team_is_capped(monkeypatch):
+    monkeypatch.setattr(team_service, "TEAM_MAX_ROLES", 2)
+    assert parse_recommended_team(TEAM_TEXT) == ["ceo", "cmo"]
+
+
+def test_prewarm_sets_up_every_role_within_the_concurrency_cap(monkeypatch):
+    monkeypatch.setattr(team_service, "TEAM_PREWARM_CONCURRENCY", 2)
+    calls, peak = _ensure(monkeypatch, fail={"cfo"})
+    roles = ["ceo", "cmo", "cfo", "cto"]
+
+    status = asyncio.run(team_service.prewarm_team("p1", USER, roles))
+
+    assert sorted(calls) == sorted(roles)
+    assert peak[0] == 2
+    assert status["cfo"] == {"state": "failed", "error": "cfo setup failed"}
+    assert all(status[role]["state"] == "ready" for role in ("ceo", "cmo", "cto"))
+
+
+def test_start_returns_the_running_prewarm_and_forgets_it_when_done(monkeypatch):
+    calls, _ = _ensure(monkeypatch)
+
+    async def run():
+        first = team_service.start_team_prewarm("p1", USER, TEAM_TEXT)
+        again = team_service.start_team_prewarm("p1", USER, TEAM_TEXT)
+        assert again is first
+        assert set(first) == set(parse_recommended_team(TEAM_TEXT))
+        await team_service._tasks["p1:u1"]
+        await asyncio.sleep(0)  # let the done-callback run
+
+    asyncio.run(run())
+    assert len(calls) == len(parse_recommended_team(TEAM_TEXT))  # each role once
+    assert team_service._tasks == {} and team_service._status == {}
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("jinja2")
+pytest.importorskip("sqlalchemy")
+
+from app.services.template_registry import SPARRING, CompiledTemplate, TemplateRegistry  # noqa: E402
+
+
+class SparringRows:
+    """Async session stand-in that serves sparring rows by role and counts queries."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def execute(self, statement):
+        self.queries += 1
+        role = statement.whereclause.right.value
+        row = SimpleNamespace(template_text=self.rows[role]) if role in self.rows else None
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(first=lambda: row))
+
+
+def _get(registry, db, role):
+    return asyncio.run(registry.get_sparring(role, db))
+
+
+def test_compiled_template_renders_and_parses_once():
+    template = CompiledTemplate(SPARRING, "cfo", {"text": "Hi {{ idea_name }}"})
+    assert template.render("text", idea_name="Acme") == "Hi Acme"
+    assert template.template("text") is template.template("text")
+
+
+def test_version_tracks_source_text():
+    a = CompiledTemplate(SPARRING, "cfo", {"text": "v1"})
+    assert a.version == CompiledTemplate(SPARRING, "cfo", {"text": "v1"}).version
+    assert a.version != CompiledTemplate(SPARRING, "cfo", {"text": "v2"}).version
+
+
+def test_rows_are_loaded_once_per_ttl():
+    registry, db = TemplateRegistry(ttl=60), SparringRows({"cfo": "You are the CFO of {{ idea_name }}"})
+    first = _get(registry, db, "CFO")
+    assert _get(registry, db, "cfo") is first
+    assert db.queries == 1
+    assert registry.metrics() == {"entries": 1, "hits": 1, "loads": 1}
+
+
+def test_missing_template_is_cached_too():
+    registry, db = TemplateRegistry(ttl=60), SparringRows({})
+    assert _get(registry, db, "cmo") is None
+    assert _get(registry, db, "cmo") is None
+    assert db.queries == 1
+
+
+def test_reload_keeps_compiled_template_when_text_is_unchanged():
+    registry, db = TemplateRegistry(ttl=0), SparringRows({"cfo": "same"})
+    first = _get(registry, db, "cfo")
+    first.template("text")
+    assert _get(registry, db, "cfo") is first
+    db.rows["cfo"] = "edited"
+    assert _get(registry, db, "cfo").render("text") == "edited"
+    assert db.queries == 3
+
+
+def test_invalidate_forces_a_reload():
+    registry, db = TemplateRegistry(ttl=60), SparringRows({"cfo": "v1"})
+    _get(registry, db, "cfo")
+    db.rows["cfo"] = "v2"
+    registry.invalidate(SPARRING, "CFO")
+    assert _get(registry, db, "cfo").render("text") == "v2"
@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException  # noqa: E402
+
+from app.services import usage_service  # noqa: E402
+from app.services.usage_service import (  # noqa: E402
+    TokenReservation, commit_reservation, current_period, estimate_tokens, release_reservation, reserve_tokens
+)
+
+USER = {"id": "u1", "tenant_id": "t1"}
+
+
+class ScriptedSession:
+    """
+    Answers statements by their leading keyword: `held` is what the quota UPDATE
+    returns, `dropped` what deleting the reservation row returns.
+    """
+
+    def __init__(self, log, held=True, dropped=300):
+        self.log = log
+        self.held = held
+        self.dropped = dropped
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.log.append((sql, params or {}))
+        if sql.startswith("UPDATE token_usage_counters SET reserved_tokens = reserved_tokens +"):
+            row = SimpleNamespace(tokens_used=0) if self.held else None
+            return SimpleNamespace(fetchone=lambda: row)
+        if sql.startswith("DELETE FROM token_reservations"):
+            return SimpleNamespace(scalar=lambda: self.dropped)
+        return SimpleNamespace(scalar=lambda: None, fetchone=lambda: None)
+
+    async def commit(self):
+        self.log.append(("COMMIT", {}))
+
+    async def rollback(self):
+        self.log.append(("ROLLBACK", {}))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _sessions(monkeypatch, **script):
+    log = []
+    monkeypatch.setattr(usage_service, "AsyncSessionLocal", lambda: ScriptedSession(log, **script))
+    return log
+
+
+def test_estimate_counts_prompt_and_expected_reply():
+    assert estimate_tokens("x" * 400) == 100 + usage_service.DEFAULT_COMPLETION_TOKENS
+    assert estimate_tokens("x" * 400, completion_tokens=0) == 100
+    assert estimate_tokens(None, completion_tokens=0) == 0
+
+
+def test_reserve_holds_budget_in_its_own_transaction(monkeypatch):
+    log = _sessions(monkeypatch)
+    reservation = asyncio.run(reserve_tokens(USER, 300, max_tokens=10000))
+
+    assert reservation.tokens == 300 and reservation.period == current_period()
+    hold = next(params for sql, params in log if sql.startswith("UPDATE token_usage_counters"))
+    assert hold == {"user_id": "u1", "period": current_period(), "tokens": 300, "max_tokens": 10000}
+    assert any(sql.startswith("INSERT INTO token_reservations") for sql, _ in log)
+    assert log[-1][0] == "COMMIT"
+
+
+def test_reserve_over_quota_is_403_and_holds_nothing(monkeypatch):
+    log = _sessions(monkeypatch, held=False)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(reserve_tokens(USER, 300, max_tokens=100))
+
+    assert error.value.status_code == 403
+    assert log[-1][0] == "ROLLBACK"
+    assert not any(sql.startswith("INSERT INTO token_reservations") for sql, _ in log)
+
+
+def test_commit_swaps_the_hold_for_actual_usage():
+    log = []
+    db = ScriptedSession(log, dropped=300)
+    reservation = TokenReservation("r1", "u1", current_period(), 300)
+    asyncio.run(commit_reservation(db, reservation, USER, "idea-1", 120))
+
+    statements = [sql for sql, _ in log]
+    assert statements[0].startswith("DELETE FROM token_reservations")
+    assert "reserved_tokens = GREATEST(reserved_tokens - :tokens, 0)" in statements[1]
+    assert log[1][1]["tokens"] == 300  # the amount actually held, from the reservation row
+    assert any(sql.startswith("INSERT INTO token_usage ") for sql in statements)
+    assert ("COMMIT", {}) not in log  # the caller commits
+
+
+def test_release_after_commit_is_a_no_op(monkeypatch):
+    log = _sessions(monkeypatch, dropped=None)  # row already gone
+    asyncio.run(release_reservation(TokenReservation("r1", "u1", current_period(), 300)))
+
+    assert [sql for sql, _ in log if sql != "COMMIT"] == [
+        "DELETE FROM token_reservations WHERE id = :id RETURNING tokens"
+    ]
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from app.services import usage_service  # noqa: E402
+from app.services.usage_service import current_period, get_tenant_usage, get_user_usage, record_token_usage  # noqa: E402
+
+
+class RecordingSession:
+    """Records each statement with its parameters; every query returns `scalar`."""
+
+    def __init__(self, scalar=None):
+        self.statements = []
+        self.scalar = scalar
+
+    async def execute(self, statement, params=None):
+        self.statements.append((" ".join(str(statement).split()), params or {}))
+        return SimpleNamespace(scalar=lambda: self.scalar)
+
+
+def test_current_period_is_first_of_month():
+    period = current_period()
+    assert isinstance(period, date)
+    assert period.day == 1
+
+
+def test_record_token_usage_writes_ledger_and_both_counters():
+    db = RecordingSession()
+    user = {"id": "u1", "tenant_id": "t1"}
+    asyncio.run(record_token_usage(db, user, "idea-1", 250))
+
+    (ledger, ledger_params), (counters, counter_params) = db.statements
+    assert ledger.startswith("INSERT INTO token_usage ")
+    assert ledger_params["tokens_used"] == 250
+    assert "('user', :user_id" in counters and "('tenant', :tenant_id" in counters
+    assert "ON CONFLICT (scope, scope_id, period) DO UPDATE" in counters
+    assert counter_params == {"user_id": "u1", "tenant_id": "t1", "period": current_period(), "tokens_used": 250}
+
+
+def test_usage_reads_one_counter_row_not_the_ledger():
+    db = RecordingSession(scalar=1200)
+    assert asyncio.run(get_user_usage(db, "u1")) == 1200
+    assert asyncio.run(get_tenant_usage(db, "t1", date(2026, 1, 1))) == 1200
+
+    (user_sql, user_params), (_, tenant_params) = db.statements
+    assert "FROM token_usage_counters" in user_sql and "SUM" not in user_sql
+    assert user_params == {"scope": "user", "scope_id": "u1", "period": current_period()}
+    assert tenant_params == {"scope": "tenant", "scope_id": "t1", "period": date(2026, 1, 1)}
+
+
+def test_usage_without_a_counter_row_is_zero():
+    assert asyncio.run(get_user_usage(RecordingSession(scalar=None), "u1")) == 0
+
+
+def test_reconcile_period_bounds_wrap_the_year(monkeypatch):
+    calls = []
+
+    class SyncSession:
+        def execute(self, statement, params=None):
+            calls.append(params or {})
+            return SimpleNamespace(scalar=lambda: 2)
+
+        def commit(self):
+            calls.append("commit")
+
+    assert usage_service.reconcile_usage_counters(SyncSession(), date(2025, 12, 1)) == 2
+    ledger = next(p for p in calls if isinstance(p, dict) and "start" in p)
+    assert (ledger["start"].date(), ledger["end"].date()) == (date(2025, 12, 1), date(2026, 1, 1))
+    assert calls[-1] == "commit"
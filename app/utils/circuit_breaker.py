@@ -0,0 +1,171 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# === Breaker settings (shared by every upstream)
+CB_WINDOW_SIZE = int(os.getenv("CB_WINDOW_SIZE", 20))
+CB_MIN_CALLS = int(os.getenv("CB_MIN_CALLS", 5))
+CB_ERROR_RATE = float(os.getenv("CB_ERROR_RATE", 0.5))
+CB_SLOW_CALL_SECONDS = float(os.getenv("CB_SLOW_CALL_SECONDS", 10))
+CB_SLOW_CALL_RATE = float(os.getenv("CB_SLOW_CALL_RATE", 0.8))
+CB_OPEN_SECONDS = float(os.getenv("CB_OPEN_SECONDS", 30))
+CB_HALF_OPEN_PROBES = int(os.getenv("CB_HALF_OPEN_PROBES", 1))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Rolling-window breaker for one upstream. Opens when the error rate or the
+    slow-call rate over the last CB_WINDOW_SIZE calls crosses its threshold,
+    then lets CB_HALF_OPEN_PROBES trial calls through after CB_OPEN_SECONDS.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.window = deque(maxlen=CB_WINDOW_SIZE)  # (ok, latency)
+        self.rejected_total = 0
+
+    def allow_request(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < CB_OPEN_SECONDS:
+                self.rejected_total += 1
+                return False
+            self.state = HALF_OPEN
+            logger.info(f"🟡 Circuit half-open: {self.name}")
+
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= CB_HALF_OPEN_PROBES:
+                self.rejected_total += 1
+                return False
+            self.probes_in_flight += 1
+        return True
+
+    def record(self, ok: bool, latency: float):
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+            if ok and latency < CB_SLOW_CALL_SECONDS:
+                self._close()
+            else:
+                self._open()
+            return
+
+        self.window.append((ok, latency))
+        if self.state == CLOSED and len(self.window) >= CB_MIN_CALLS:
+            if self.error_rate() >= CB_ERROR_RATE or self.slow_call_rate() >= CB_SLOW_CALL_RATE:
+                self._open()
+
+    def release(self):
+        # The call never reached the upstream (e.g. its limiter slot was refused).
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+
+    def abandon(self, latency: float):
+        # The caller gave up (e.g. a hedged loser). Not a failure, but keep the
+        # elapsed time as a lower bound so latency percentiles don't drift down.
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+        else:
+            self.window.append((True, latency))
+
+    def latency_percentile(self, q: float) -> float | None:
+        latencies = sorted(latency for ok, latency in self.window if ok)
+        if len(latencies) < CB_MIN_CALLS:
+            return None
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+
+    def error_rate(self) -> float:
+        if not self.window:
+            return 0.0
+        return sum(1 for ok, _ in self.window if not ok) / len(self.window)
+
+    def slow_call_rate(self) -> float:
+        if not self.window:
+            return 0.0
+        return sum(1 for _, latency in self.window if latency >= CB_SLOW_CALL_SECONDS) / len(self.window)
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(f"🔴 Circuit opened: {self.name} (error rate {self.error_rate():.0%})")
+
+    def _close(self):
+        self.state = CLOSED
+        self.window.clear()
+        logger.info(f"🟢 Circuit closed: {self.name}")
+
+    @asynccontextmanager
+    async def guard(self, slot=None):
+        """
+        Wraps one upstream call; raises CircuitOpenError without calling when open.
+
+        `slot` (e.g. an llm_slot(...)) is entered only once the breaker allows the
+        call, so an open circuit never queues for capacity. Time spent waiting for
+        the slot, or the limiter refusing it, doesn't count against the upstream.
+
+        Usage:
+            async with get_breaker("gpu").guard(slot=llm_slot("gpu", tenant_id)):
+                res = await client.post(...)
+                res.raise_for_status()
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit open for upstream '{self.name}'")
+        async with AsyncExitStack() as stack:
+            if slot is not None:
+                try:
+                    await stack.enter_async_context(slot)
+                except BaseException:
+                    self.release()
+                    raise
+            started = time.perf_counter()
+            try:
+                yield
+            except asyncio.CancelledError:
+                self.abandon(time.perf_counter() - started)
+                raise
+            except BaseException:
+                self.record(False, time.perf_counter() - started)
+                raise
+            self.record(True, time.perf_counter() - started)
+
+    def status(self) -> dict:
+        latencies = sorted(latency for _, latency in self.window)
+        return {
+            "state": self.state,
+            "calls_in_window": len(self.window),
+            "error_rate": round(self.error_rate(), 3),
+            "slow_call_rate": round(self.slow_call_rate(), 3),
+            "p50_latency": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "max_latency": round(latencies[-1], 3) if latencies else None,
+            "rejected_total": self.rejected_total,
+            "retry_in_seconds": (
+                round(max(CB_OPEN_SECONDS - (time.monotonic() - self.opened_at), 0), 1)
+                if self.state == OPEN else 0
+            ),
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    if upstream not in _breakers:
+        _breakers[upstream] = CircuitBreaker(upstream)
+    return _breakers[upstream]
+
+
+def breaker_status() -> dict:
+    return {name: breaker.status() for name, breaker in _breakers.items()}
@@ -0,0 +1,85 @@
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Tuple
+
+from app.utils.circuit_breaker import get_breaker
+
+logger = logging.getLogger(__name__)
+
+# === Hedging settings
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 0.95))
+HEDGE_DELAY_SECONDS = float(os.getenv("HEDGE_DELAY_SECONDS", 4))  # until the breaker has enough samples
+
+
+@dataclass
+class Arm:
+    source: str                                      # usage_log source, e.g. "gpu" / "openai"
+    call: Callable[[], Awaitable[Tuple[str, int]]]   # returns (content, tokens_used)
+
+
+def hedge_delay(upstream: str) -> Optional[float]:
+    """
+    How long to give the primary before racing the secondary: the upstream's
+    observed p95 latency, or HEDGE_DELAY_SECONDS while it is still warming up.
+    None when hedging is off, which makes hedge() a plain sequential fallback.
+    """
+    if not HEDGE_ENABLED:
+        return None
+    observed = get_breaker(upstream).latency_percentile(HEDGE_PERCENTILE)
+    return observed if observed is not None else HEDGE_DELAY_SECONDS
+
+
+async def hedge(
+    primary: Arm,
+    secondary: Arm,
+    delay: Optional[float],
+    log_usage: Callable[[int, str], Awaitable[None]],
+    prompt_tokens: int = 0
+) -> str:
+    """
+    Runs `primary`; starts `secondary` if the primary fails, or is still running
+    after `delay` seconds. The first successful arm wins and the other is cancelled.
+
+    Every arm that was started is logged through `log_usage`: finished arms with
+    their reported tokens, cancelled arms with `prompt_tokens` under "<source>_cancelled",
+    since the prompt was already sent upstream.
+    """
+    primary_task = asyncio.create_task(primary.call())
+    pending = {primary_task: primary}
+
+    done, _ = await asyncio.wait({primary_task}, timeout=delay)
+    if not done or primary_task.exception() is not None:
+        if not done:
+            logger.info(f"⏱️ {primary.source} slower than {delay:.2f}s, hedging with {secondary.source}")
+        pending[asyncio.create_task(secondary.call())] = secondary
+
+    errors = []
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = None
+            for task in done:
+                arm = pending.pop(task)
+                if task.exception() is not None:
+                    logger.warning("%s failed: %s", arm.source, task.exception())
+                    errors.append(task.exception())
+                    continue
+                content, tokens = task.result()
+                await log_usage(tokens, arm.source)
+                if winner is None:
+                    winner = content
+
+            if winner is not None:
+                for task, arm in pending.items():
+                    task.cancel()
+                    await log_usage(prompt_tokens, f"{arm.source}_cancelled")
+                pending.clear()
+                return winner
+
+        raise errors[-1]
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+
+import httpx
+import jwt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# === Connection pool settings (per upstream, per worker)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1"
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 60))
+
+# === Service token settings
+SERVICE_TOKEN_SUBJECT = os.getenv("SERVICE_TOKEN_SUBJECT", "founderhub")
+SERVICE_TOKEN_TTL = int(os.getenv("SERVICE_TOKEN_TTL_SECONDS", 12 * 3600))
+SERVICE_TOKEN_REFRESH_MARGIN = int(os.getenv("SERVICE_TOKEN_REFRESH_MARGIN_SECONDS", 60))
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_tokens: Dict[Tuple[str, str], Tuple[str, float]] = {}
+
+
+def get_http_client(upstream: str) -> httpx.AsyncClient:
+    """
+    Returns the shared keep-alive client for an upstream ("gpu", "ollama", "openai", ...).
+    Callers pass their own per-request `timeout=` where it differs from the default.
+    """
+    client = _clients.get(upstream)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        _clients[upstream] = client
+        logger.info(f"✅ HTTP client ready for upstream: {upstream}")
+    return client
+
+
+async def close_http_clients():
+    for upstream, client in list(_clients.items()):
+        await client.aclose()
+        _clients.pop(upstream, None)
+        logger.info(f"🛑 HTTP client closed: {upstream}")
+
+
+def get_service_token(secret: str, subject: str = SERVICE_TOKEN_SUBJECT) -> str:
+    """
+    HS256 token for the GPU/Ollama gateways, minted once per (secret, subject) and
+    reused until it is within the refresh margin of expiring. Calls made for a user
+    pass their user id as the subject, so upstreams still see who the call is for.
+    """
+    key = (secret, subject)
+    now = time.time()
+    cached = _tokens.get(key)
+    if cached and cached[1] - now > SERVICE_TOKEN_REFRESH_MARGIN:
+        return cached[0]
+    for stale in [k for k, (_, expires) in _tokens.items() if expires <= now]:
+        _tokens.pop(stale, None)
+
+    issued = datetime.utcnow()
+    token = jwt.encode({
+        "sub": subject,
+        "scope": "founderhub",
+        "iat": issued,
+        "exp": issued + timedelta(seconds=SERVICE_TOKEN_TTL)
+    }, secret, algorithm="HS256")
+    _tokens[key] = (token, now + SERVICE_TOKEN_TTL)
+    return token
+
+
+def bearer_headers(secret: str, user_id: str = None) -> dict:
+    return {
+        "Authorization": f"Bearer {get_service_token(secret, user_id or SERVICE_TOKEN_SUBJECT)}",
+        "Content-Type": "application/json"
+    }
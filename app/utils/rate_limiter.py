@@ -0,0 +1,234 @@
+import os
+import json
+import math
+import time
+import heapq
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from itertools import count
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# === Limiter settings
+# Per provider or provider:model, e.g.
+#   LLM_RATE_LIMITS='{"openai": {"rpm": 500, "tpm": 150000, "concurrency": 32},
+#                     "openai:gpt-4": {"rpm": 200, "tpm": 40000}, "gpu": {"rpm": 120, "concurrency": 4}}'
+DEFAULT_LIMITS = {
+    "openai": {"rpm": 500, "tpm": 150000, "concurrency": 32},
+    "gpu": {"rpm": 120, "tpm": None, "concurrency": 4},
+    "ollama": {"rpm": 120, "tpm": None, "concurrency": 4},
+}
+LLM_RATE_LIMITS = {**DEFAULT_LIMITS, **json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))}
+TENANT_WEIGHTS: Dict[str, float] = json.loads(os.getenv("LLM_TENANT_WEIGHTS", "{}"))
+LLM_QUEUE_DEADLINE = float(os.getenv("LLM_QUEUE_DEADLINE_SECONDS", 20))
+
+
+class LimiterRejected(HTTPException):
+    """503 with Retry-After once a queued call has waited past LLM_QUEUE_DEADLINE."""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail=f"LLM capacity for {lane} exhausted; retry later",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        # Positive delta returns over-estimated tokens; negative charges the shortfall.
+        self._refill()
+        self.level = min(self.capacity, self.level + delta)
+
+
+class _Waiter:
+    def __init__(self, tenant: str, tokens: int):
+        self.tenant = tenant
+        self.tokens = tokens
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+
+
+class Lane:
+    """
+    One provider/model: request and token buckets, a concurrency cap and a
+    weighted-fair queue across tenants (virtual finish tags, cost = tokens / weight).
+    """
+
+    def __init__(self, name: str, rpm: Optional[float], tpm: Optional[float], concurrency: Optional[int]):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = concurrency or math.inf
+        self.in_flight = 0
+        self.queue = []  # (finish_tag, seq, waiter)
+        self.seq = count()
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.granted_total = 0
+        self.rejected_total = 0
+        self.wait_seconds_total = 0.0
+
+    def enqueue(self, tenant: str, tokens: int) -> _Waiter:
+        waiter = _Waiter(tenant, tokens)
+        weight = float(TENANT_WEIGHTS.get(tenant, 1.0))
+        start = max(self.virtual_time, self.last_finish.get(tenant, 0.0))
+        finish = start + max(tokens, 1) / weight
+        self.last_finish[tenant] = finish
+        heapq.heappush(self.queue, (finish, next(self.seq), waiter))
+        return waiter
+
+    def _wait_needed(self, tokens: int) -> float:
+        return max(
+            self.requests.wait_time(1) if self.requests else 0.0,
+            self.tokens.wait_time(tokens) if self.tokens else 0.0,
+        )
+
+    def dispatch(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        while self.queue:
+            finish, _, waiter = self.queue[0]
+            if waiter.future.done():  # timed out or cancelled while queued
+                heapq.heappop(self.queue)
+                continue
+            if self.in_flight >= self.concurrency:
+                return  # release() dispatches again
+            wait = self._wait_needed(waiter.tokens)
+            if wait > 0:
+                self.timer = asyncio.get_running_loop().call_later(wait, self.dispatch)
+                return
+
+            heapq.heappop(self.queue)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(waiter.tokens)
+            self.in_flight += 1
+            self.virtual_time = max(self.virtual_time, finish)
+            self.granted_total += 1
+            self.wait_seconds_total += time.monotonic() - waiter.enqueued
+            waiter.future.set_result(True)
+
+        # Idle: every tenant starts level again.
+        self.last_finish.clear()
+
+    def release(self):
+        self.in_flight -= 1
+        self.dispatch()
+
+    def retry_after(self) -> int:
+        depth = len(self.queue) + 1
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, depth / self.requests.rate)
+        if self.tokens:
+            queued = sum(w.tokens for _, _, w in self.queue)
+            wait = max(wait, queued / self.tokens.rate)
+        return max(1, math.ceil(wait))
+
+    def metrics(self) -> dict:
+        depth_by_tenant: Dict[str, int] = {}
+        for _, _, waiter in self.queue:
+            if not waiter.future.done():
+                depth_by_tenant[waiter.tenant] = depth_by_tenant.get(waiter.tenant, 0) + 1
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": sum(depth_by_tenant.values()),
+            "queue_depth_by_tenant": depth_by_tenant,
+            "granted_total": self.granted_total,
+            "rejected_total": self.rejected_total,
+            "avg_wait_seconds": round(self.wait_seconds_total / self.granted_total, 3) if self.granted_total else 0.0,
+            "requests_available": round(self.requests.level, 1) if self.requests else None,
+            "tokens_available": round(self.tokens.level) if self.tokens else None,
+        }
+
+
+class Permit:
+    def __init__(self, lane: Lane, tokens: int):
+        self.lane = lane
+        self.tokens = tokens
+
+    def settle(self, actual_tokens: int):
+        # Correct the token bucket once the real usage is known.
+        if self.lane.tokens and actual_tokens:
+            self.lane.tokens.adjust(self.tokens - actual_tokens)
+            self.tokens = actual_tokens
+
+
+_lanes: Dict[str, Lane] = {}
+
+
+def _lane(provider: str, model: Optional[str]) -> Lane:
+    name = f"{provider}:{model}" if model and f"{provider}:{model}" in LLM_RATE_LIMITS else provider
+    if name not in _lanes:
+        limits = LLM_RATE_LIMITS.get(name, {})
+        _lanes[name] = Lane(name, limits.get("rpm"), limits.get("tpm"), limits.get("concurrency"))
+    return _lanes[name]
+
+
+@asynccontextmanager
+async def llm_slot(provider: str, tenant_id: Optional[str], tokens: int = 0, model: Optional[str] = None):
+    """
+    Waits for a fair turn on the provider/model lane, then holds one slot for the call.
+
+    Usage:
+        async with llm_slot("openai", tenant_id, tokens=estimate, model="gpt-4") as permit:
+            response = await ...
+            permit.settle(response.usage.total_tokens)
+
+    Raises LimiterRejected (503 + Retry-After) if the turn doesn't come within LLM_QUEUE_DEADLINE.
+    """
+    lane = _lane(provider, model)
+    waiter = lane.enqueue(tenant_id or "system", tokens)
+    lane.dispatch()
+    try:
+        await asyncio.wait_for(asyncio.shield(waiter.future), timeout=LLM_QUEUE_DEADLINE)
+    except asyncio.TimeoutError:
+        if not waiter.future.done():
+            waiter.future.cancel()
+            lane.rejected_total += 1
+            logger.warning(f"🚦 LLM queue deadline hit on {lane.name} for tenant {waiter.tenant}")
+            raise LimiterRejected(lane.name, lane.retry_after())
+        # granted at the deadline; carry on
+    except asyncio.CancelledError:
+        if waiter.future.done() and not waiter.future.cancelled():
+            lane.release()  # granted just as the caller went away
+        else:
+            waiter.future.cancel()
+        raise
+
+    try:
+        yield Permit(lane, tokens)
+    finally:
+        lane.release()
+
+
+def limiter_metrics() -> dict:
+    return {name: lane.metrics() for name, lane in _lanes.items()}
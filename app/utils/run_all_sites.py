@@ -1,32 +1,24 @@
-import os
-import psycopg2
+import asyncio
 from dotenv import load_dotenv
 from google_analytics import GoogleAnalyticsFetcher
 
-load_dotenv()
+from app.db import get_db_connection, close_pool
 
-def get_db_connection():
-    return psycopg2.connect(
-        dbname=os.getenv("POSTGRES_DB"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        host=os.getenv("POSTGRES_HOST"),
-        port=os.getenv("POSTGRES_PORT", 5432)
-    )
+load_dotenv()
 
-def run_all_sites():
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT id FROM ga_sites")
-            rows = cur.fetchall()
+async def run_all_sites():
+    async with get_db_connection() as conn:
+        rows = await conn.fetch("SELECT id FROM ga_sites")
 
     for (site_id,) in rows:
         try:
             print(f"📊 Processing site: {site_id}")
-            fetcher = GoogleAnalyticsFetcher(site_id)
-            fetcher.save_kpis_to_db()
+            fetcher = await GoogleAnalyticsFetcher.create(site_id)
+            await fetcher.save_kpis_to_db()
         except Exception as e:
             print(f"❌ Failed for site {site_id}: {e}")
 
+    await close_pool()
+
 if __name__ == "__main__":
-    run_all_sites()
+    asyncio.run(run_all_sites())
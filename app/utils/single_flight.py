@@ -0,0 +1,155 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# === Single-flight settings
+SINGLE_FLIGHT_BACKEND = os.getenv("SINGLE_FLIGHT_BACKEND", "memory")  # "memory" or "postgres"
+SINGLE_FLIGHT_WAIT = float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", 180))
+
+Reuse = Callable[[Any], Awaitable[Optional[Any]]]
+
+
+def flight_key(endpoint: str, tenant_id: str, resource_id, payload: Any = None) -> str:
+    """
+    Key for one logical generation: (endpoint, tenant, resource, input hash).
+    """
+    digest = hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+    return f"{endpoint}:{tenant_id}:{resource_id}:{digest}"
+
+
+class SingleFlight:
+    """
+    In-process coalescing: while a call for `key` is running, identical calls
+    await its result instead of starting their own.
+
+    If the leading request is cancelled (client went away), one waiting
+    duplicate takes over rather than every waiter failing with it.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.leaders_total = 0
+        self.coalesced_total = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], reuse: Optional[Reuse] = None):
+        while key in self._inflight:
+            future = self._inflight[key]
+            self.coalesced_total += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # this caller was cancelled, not the leader
+                # leader gone; loop round and lead
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark exceptions as retrieved even when nobody else was waiting.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        self.leaders_total += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def metrics(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders_total": self.leaders_total,
+            "coalesced_total": self.coalesced_total,
+        }
+
+
+class PostgresSingleFlight(SingleFlight):
+    """
+    Cross-worker variant. Duplicates inside a worker still coalesce in memory;
+    across workers the leader holds a row in single_flight_leases while it runs.
+    A duplicate elsewhere polls until the lease is gone, then calls `reuse(since)`
+    to pick up what the leader stored (since = DB time it started waiting), and
+    only runs `fn` itself if that returns None.
+
+    Every lease operation is one short statement on a pooled connection, so no
+    connection is held while `fn` runs or while waiting. A lease left behind by
+    a crashed worker expires after SINGLE_FLIGHT_WAIT.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.holder = uuid4().hex
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], reuse: Optional[Reuse] = None):
+        return await super().do(key, lambda: self._leased(key, fn, reuse))
+
+    async def _acquire(self, key: str) -> bool:
+        async with get_db_connection() as conn:
+            holder = await conn.fetchval(
+                """
+                INSERT INTO single_flight_leases (key, holder, expires_at)
+                VALUES ($1, $2, NOW() + make_interval(secs => $3))
+                ON CONFLICT (key) DO UPDATE
+                    SET holder = EXCLUDED.holder, expires_at = EXCLUDED.expires_at
+                    WHERE single_flight_leases.expires_at < NOW()
+                RETURNING holder
+                """,
+                key, self.holder, SINGLE_FLIGHT_WAIT
+            )
+        return holder == self.holder
+
+    async def _release(self, key: str):
+        try:
+            async with get_db_connection() as conn:
+                await conn.execute(
+                    "DELETE FROM single_flight_leases WHERE key = $1 AND holder = $2", key, self.holder
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not release single-flight lease {key}: {e}")
+
+    async def _leased(self, key: str, fn, reuse: Optional[Reuse]):
+        async with get_db_connection() as conn:
+            since = await conn.fetchval("SELECT NOW()")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SINGLE_FLIGHT_WAIT
+        delay = 0.1
+        waited = False
+
+        while not await self._acquire(key):
+            waited = True
+            if loop.time() >= deadline:
+                logger.warning(f"⚠️ Single-flight wait for {key} timed out; running anyway")
+                return await fn()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+        try:
+            if waited and reuse is not None:
+                result = await reuse(since)
+                if result is not None:
+                    self.coalesced_total += 1
+                    return result
+            return await fn()
+        finally:
+            await asyncio.shield(self._release(key))
+
+
+single_flight: SingleFlight = (
+    PostgresSingleFlight() if SINGLE_FLIGHT_BACKEND == "postgres" else SingleFlight()
+)